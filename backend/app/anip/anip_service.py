@@ -1,15 +1,126 @@
+import hashlib
 import json
+import os
+import threading
+import time
 from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
 
 ANIP_FILE = Path(__file__).parent / "anip_data.json"
 
+# Intervalle minimal (secondes) entre deux vérifications du mtime du fichier ANIP
+ANIP_RELOAD_CHECK_SECONDS = float(os.getenv("ANIP_RELOAD_CHECK_SECONDS", 5))
+
+
 def load_anip_data():
     with open(ANIP_FILE, "r", encoding="utf-8") as f:
         return json.load(f)
 
+
+class AnipRegistry:
+    """
+    Registre ANIP indexé par NPI.
+
+    L'index NPI -> enregistrement est construit une seule fois en mémoire et
+    n'est revu que lorsque le mtime du fichier change. Les recherches sont en O(1).
+
+    Rechargement incrémental : si le fichier a seulement reçu de nouveaux
+    enregistrements en fin de tableau (cas des exports ANIP), seuls ceux-ci sont
+    décodés et ajoutés à l'index ; toute autre modification reconstruit l'index.
+    """
+
+    def __init__(self, path: Path = ANIP_FILE, check_interval: float = ANIP_RELOAD_CHECK_SECONDS):
+        self._path = Path(path)
+        self._check_interval = check_interval
+        self._index: Dict[str, dict] = {}
+        self._mtime: Optional[float] = None
+        # Fin du dernier enregistrement indexé et empreinte du fichier jusque-là
+        self._indexed_end = 0
+        self._indexed_digest: Optional[bytes] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _records_end(raw: bytes) -> int:
+        """Position juste après le dernier enregistrement (avant le ] final)."""
+        return len(raw.rstrip()[:-1].rstrip())
+
+    @staticmethod
+    def _index_records(records) -> Dict[str, dict]:
+        return {str(user["npi"]): user for user in records if user.get("npi")}
+
+    def _build_index(self, raw: bytes) -> Tuple[Dict[str, dict], int, bytes]:
+        end = self._records_end(raw)
+        return self._index_records(json.loads(raw)), end, hashlib.sha256(raw[:end]).digest()
+
+    def _appended_records(self, raw: bytes) -> Optional[list]:
+        """Enregistrements ajoutés en fin de tableau, ou None si le début du fichier a changé."""
+        end = self._indexed_end
+        if self._indexed_digest is None or len(raw) <= end:
+            return None
+        if hashlib.sha256(raw[:end]).digest() != self._indexed_digest:
+            return None
+        tail = raw[end:].lstrip()
+        if tail.rstrip() == b"]":
+            return []
+        if tail.startswith(b","):
+            tail = tail[1:]
+        elif end > 1:
+            return None
+        try:
+            records = json.loads(b"[" + tail)
+        except ValueError:
+            return None
+        return records if isinstance(records, list) else None
+
+    def _reload(self):
+        with open(self._path, "rb") as f:
+            raw = f.read()
+        appended = self._appended_records(raw)
+        if appended is not None:
+            self._index.update(self._index_records(appended))
+            self._indexed_end = self._records_end(raw)
+            self._indexed_digest = hashlib.sha256(raw[:self._indexed_end]).digest()
+            return
+        # L'ancien index reste servi jusqu'à ce que le nouveau soit prêt
+        self._index, self._indexed_end, self._indexed_digest = self._build_index(raw)
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._mtime is not None and now - self._last_check < self._check_interval:
+            return
+
+        with self._lock:
+            if self._mtime is not None and now - self._last_check < self._check_interval:
+                return
+            self._last_check = now
+            mtime = os.stat(self._path).st_mtime
+            if mtime == self._mtime:
+                return
+            self._reload()
+            self._mtime = mtime
+
+    def get(self, npi: str) -> Optional[dict]:
+        self._refresh()
+        return self._index.get(npi)
+
+    def get_many(self, npis: Iterable[str]) -> Dict[str, Optional[dict]]:
+        self._refresh()
+        index = self._index
+        return {npi: index.get(npi) for npi in npis}
+
+    def __len__(self):
+        self._refresh()
+        return len(self._index)
+
+
+anip_registry = AnipRegistry()
+
+
 def get_user_from_anip(npi: str):
-    data = load_anip_data()
-    for user in data:
-        if user["npi"] == npi:
-            return user
-    return None
+    return anip_registry.get(npi)
+
+
+def get_users_from_anip(npis: Iterable[str]) -> Dict[str, Optional[dict]]:
+    """Recherche groupée : retourne un dict NPI -> utilisateur (ou None)."""
+    return anip_registry.get_many(npis)
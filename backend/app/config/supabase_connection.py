@@ -1,6 +1,10 @@
+import asyncio
 import os
-from supabase import create_client, Client
+import time
+from supabase import create_client, acreate_client, Client, AsyncClient
+from supabase.lib.client_options import AsyncClientOptions
 from dotenv import load_dotenv
+from ..utils.metrics import SUPABASE_REQUEST_SECONDS
 
 # Charger le fichier .env du dossier app
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
@@ -11,4 +15,51 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 
-db = supabase
\ No newline at end of file
+db = supabase
+
+# Client asynchrone partagé : une seule instance par processus, donc une seule
+# session HTTP (keep-alive) réutilisée par toutes les requêtes.
+SUPABASE_TIMEOUT = float(os.getenv("SUPABASE_TIMEOUT", 10))
+
+_async_supabase: AsyncClient = None
+_async_supabase_lock = asyncio.Lock()
+
+
+async def get_async_supabase() -> AsyncClient:
+    global _async_supabase
+    if _async_supabase is None:
+        async with _async_supabase_lock:
+            if _async_supabase is None:
+                _async_supabase = await acreate_client(
+                    SUPABASE_URL,
+                    SUPABASE_KEY,
+                    options=AsyncClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT),
+                )
+                _instrument_postgrest(_async_supabase.postgrest.session)
+    return _async_supabase
+
+
+def _postgrest_table(path: str) -> str:
+    # /rest/v1/images -> images ; /rest/v1/rpc/pdf_job_pages_done -> rpc/pdf_job_pages_done
+    return path.split("/rest/v1/", 1)[-1].strip("/") or "unknown"
+
+
+async def _on_request(request):
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+async def _on_response(response):
+    request = response.request
+    start = request.extensions.get("metrics_start")
+    if start is not None:
+        SUPABASE_REQUEST_SECONDS.labels(
+            _postgrest_table(request.url.path), request.method, str(response.status_code)
+        ).observe(time.perf_counter() - start)
+
+
+def _instrument_postgrest(session):
+    """Nombre et latence (jusqu'aux en-têtes de réponse) des appels PostgREST, par table."""
+    session.event_hooks = {
+        "request": [*session.event_hooks["request"], _on_request],
+        "response": [*session.event_hooks["response"], _on_response],
+    }
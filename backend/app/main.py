@@ -3,8 +3,25 @@ from app.routes import routes_auth
 from app.routes import routes_user
 from app.routes import routes_result
 from app.routes.routes_image import router as image_router
+from app.routes.routes_upload import router as upload_router
 from app.routes.routes_notification import router as notification_router
+from app.routes.routes_events import router as events_router
+from app.routes.routes_metrics import router as metrics_router
 from fastapi.middleware.cors import CORSMiddleware
+from app.utils.workers import shutdown_process_pool
+from app.repositories.storage_repository import storage_repository
+from app.utils.mailer import email_dispatcher
+from app.utils.events import EVENT_BUS_BACKEND, event_bus
+from app.utils.cache_invalidation import listen_invalidations
+from app.utils.inference import inference_engine, inference_batcher
+from app.worker import JOB_WORKER_EMBEDDED, run_workers
+from app.utils.logs import configure_logging
+from app.utils.metrics import RequestMetricsMiddleware
+import asyncio
+import logging
+
+# Logs JSON structurés (LOG_FORMAT=text pour un affichage lisible en local)
+configure_logging()
 
 app = FastAPI(title="ANDF BJ", version="1.0.0")
 
@@ -12,8 +29,11 @@ app.include_router(routes_auth.router)
 app.include_router(routes_user.router)
 #app.include_router(routes_admin.router)
 app.include_router(image_router)
+app.include_router(upload_router)
 app.include_router(routes_result.router)
 app.include_router(notification_router)
+app.include_router(events_router)
+app.include_router(metrics_router)
 
 
 # CONFIGURATION CORS - Ajoutez ça
@@ -28,8 +48,55 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # En-têtes des uploads reprenables (routes_upload) lisibles par le navigateur
+    expose_headers=["Location", "Upload-Offset", "Upload-Length", "Tus-Resumable"],
 )
 
+# Latence par route, exposée sur GET /metrics
+app.add_middleware(RequestMetricsMiddleware)
+
+# Worker de traitement des PDF intégré à l'API (JOB_WORKER_EMBEDDED, voir app/worker.py) ;
+# sinon les PDF sont traités par python -m app.worker
+worker_stop_event = asyncio.Event()
+worker_task = None
+# Invalidations des caches publiées par les autres processus (app/utils/cache_invalidation.py)
+invalidation_task = None
+
+@app.on_event("startup")
+async def startup():
+    global worker_task, invalidation_task
+    email_dispatcher.start()
+    invalidation_task = asyncio.create_task(listen_invalidations())
+
+    if JOB_WORKER_EMBEDDED:
+        # Charger les modèles une fois au démarrage plutôt qu'à la première page
+        await asyncio.to_thread(inference_engine.load)
+        inference_batcher.start()
+        worker_task = asyncio.create_task(run_workers(stop_event=worker_stop_event))
+    elif EVENT_BUS_BACKEND != "redis":
+        logging.error(
+            "JOB_WORKER_EMBEDDED=false sans EVENT_BUS_BACKEND=redis : aucun worker ne peut "
+            "démarrer (python -m app.worker l'exige), les PDF reçus resteront en file"
+        )
+
+@app.on_event("shutdown")
+async def shutdown():
+    if worker_task is not None:
+        # Laisser finir la tâche en cours ; sinon son bail expirera et elle sera reprise
+        worker_stop_event.set()
+        try:
+            await asyncio.wait_for(worker_task, timeout=30)
+        except asyncio.TimeoutError:
+            pass
+    if invalidation_task is not None:
+        invalidation_task.cancel()
+        await asyncio.gather(invalidation_task, return_exceptions=True)
+    await email_dispatcher.stop()
+    await inference_batcher.stop()
+    await event_bus.close()
+    await storage_repository.close()
+    shutdown_process_pool()
+
 # Vos routes existantes...
 @app.get("/")
 def root():
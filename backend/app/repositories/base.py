@@ -0,0 +1,12 @@
+# app/repositories/base.py
+from ..config.supabase_connection import get_async_supabase
+
+
+class BaseRepository:
+    """Accès asynchrone à une table Supabase (PostgREST)."""
+
+    table_name: str = ""
+
+    async def _table(self):
+        client = await get_async_supabase()
+        return client.table(self.table_name)
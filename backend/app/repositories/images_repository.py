@@ -0,0 +1,120 @@
+# app/repositories/images_repository.py
+from typing import List, Optional, Tuple
+
+from ..utils.pagination import keyset_filter
+from .base import BaseRepository
+
+
+class ImagesRepository(BaseRepository):
+    table_name = "images"
+
+    async def insert(self, image_data: dict) -> Optional[dict]:
+        table = await self._table()
+        result = await table.insert(image_data).execute()
+        return result.data[0] if result.data else None
+
+    async def insert_many(self, rows: List[dict]) -> List[dict]:
+        if not rows:
+            return []
+        table = await self._table()
+        result = await table.insert(rows).execute()
+        return result.data or []
+
+    async def upsert_many(self, rows: List[dict]) -> List[dict]:
+        """Insertion ou mise à jour (par id) de plusieurs lignes ayant les mêmes colonnes, en une requête."""
+        if not rows:
+            return []
+        table = await self._table()
+        result = await table.upsert(rows, on_conflict="id", returning="minimal").execute()
+        return result.data or []
+
+    async def find_completed_by_hash(self, user_id: str, content_hash: str, columns: str = "*") -> Optional[dict]:
+        """Page déjà traitée avec le même contenu pour cet utilisateur."""
+        table = await self._table()
+        result = await table.select(columns)\
+            .eq("user_id", user_id)\
+            .eq("content_hash", content_hash)\
+            .eq("processing_status", "completed")\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+
+    async def update(self, image_id: str, update_data: dict) -> Optional[dict]:
+        table = await self._table()
+        result = await table.update(update_data).eq("id", image_id).execute()
+        return result.data[0] if result.data else None
+
+    async def claim_for_retry(self, image_id: str, user_id: str) -> Optional[dict]:
+        """Passe une page en échec à processing ; None si elle n'est pas (ou plus) en échec."""
+        table = await self._table()
+        result = await table.update({"processing_status": "processing"})\
+            .eq("id", image_id)\
+            .eq("user_id", user_id)\
+            .eq("processing_status", "failed")\
+            .execute()
+        return result.data[0] if result.data else None
+
+    async def update_for_pdf(self, pdf_id: str, update_data: dict) -> List[dict]:
+        """Même mise à jour pour toutes les pages d'un PDF, en une requête."""
+        table = await self._table()
+        result = await table.update(update_data).eq("pdf_id", pdf_id).execute()
+        return result.data or []
+
+    async def update_many(self, image_ids: List[str], update_data: dict) -> List[dict]:
+        """Même mise à jour pour plusieurs pages, en une requête."""
+        if not image_ids:
+            return []
+        table = await self._table()
+        result = await table.update(update_data).in_("id", image_ids).execute()
+        return result.data or []
+
+    async def get(self, image_id: str, user_id: Optional[str] = None, columns: str = "*") -> Optional[dict]:
+        table = await self._table()
+        query = table.select(columns).eq("id", image_id)
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        result = await query.limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def list_for_user(self, user_id: str, columns: str = "*") -> List[dict]:
+        """Toutes les lignes de l'utilisateur, dans l'ordre de list_page_for_user."""
+        table = await self._table()
+        result = await table.select(columns)\
+            .eq("user_id", user_id)\
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .execute()
+        return result.data or []
+
+    async def list_for_pdf(self, pdf_id: str, user_id: Optional[str] = None, columns: str = "*") -> List[dict]:
+        table = await self._table()
+        query = table.select(columns).eq("pdf_id", pdf_id)
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        result = await query.order("page_number").execute()
+        return result.data or []
+
+    async def list_page_for_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: int = 50,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> List[dict]:
+        """
+        Pagination par clé sur (created_at, id), du plus récent au plus ancien.
+        after est le couple (created_at, id) de la dernière ligne de la page précédente.
+        """
+        table = await self._table()
+        query = table.select(columns).eq("user_id", user_id)
+        if after:
+            query = query.or_(keyset_filter(*after))
+        result = await query\
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit)\
+            .execute()
+        return result.data or []
+
+
+images_repository = ImagesRepository()
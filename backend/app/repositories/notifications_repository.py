@@ -0,0 +1,101 @@
+# app/repositories/notifications_repository.py
+from typing import List, Optional, Tuple
+
+from ..utils.pagination import keyset_filter
+from .base import BaseRepository
+
+
+class NotificationsRepository(BaseRepository):
+    table_name = "notifications"
+
+    async def list_page_for_user(
+        self,
+        user_id: str,
+        columns: str = "*",
+        limit: int = 50,
+        after: Optional[Tuple[str, str]] = None,
+        unread_only: bool = False,
+    ) -> List[dict]:
+        """Pagination par clé sur (created_at, id), du plus récent au plus ancien."""
+        table = await self._table()
+        query = table.select(columns).eq("user_id", user_id)
+        if unread_only:
+            query = query.eq("read", False)
+        if after:
+            query = query.or_(keyset_filter(*after))
+        result = await query\
+            .order("created_at", desc=True)\
+            .order("id", desc=True)\
+            .limit(limit)\
+            .execute()
+        return result.data or []
+
+    async def list_for_user(self, user_id: str, columns: str = "*", unread_only: bool = False) -> List[dict]:
+        """Toutes les notifications, de la plus récente à la plus ancienne (ancien GET /notifications/)."""
+        table = await self._table()
+        query = table.select(columns).eq("user_id", user_id)
+        if unread_only:
+            query = query.eq("read", False)
+        result = await query.order("created_at", desc=True).order("id", desc=True).execute()
+        return result.data or []
+
+    async def count_unread(self, user_id: str) -> int:
+        """Nombre de notifications non lues (index partiel, sans lire les lignes)."""
+        table = await self._table()
+        result = await table.select("id", count="exact", head=True)\
+            .eq("user_id", user_id)\
+            .eq("read", False)\
+            .execute()
+        return result.count or 0
+
+    async def insert(self, notification_data: dict) -> Optional[dict]:
+        table = await self._table()
+        result = await table.insert(notification_data).execute()
+        return result.data[0] if result.data else None
+
+    async def mark_read(self, notification_id: str, user_id: str) -> bool:
+        table = await self._table()
+        result = await table.update({"read": True})\
+            .eq("id", notification_id)\
+            .eq("user_id", user_id)\
+            .execute()
+        return bool(result.data)
+
+    async def mark_read_many(self, user_id: str, ids: Optional[List[str]] = None,
+                             up_to: Optional[Tuple[str, str]] = None) -> int:
+        """
+        Marque comme lues les notifications listées (ids), celles situées au niveau
+        du curseur ou plus anciennes (up_to), ou toutes. Retourne le nombre modifié.
+        """
+        table = await self._table()
+        query = table.update({"read": True}, count="exact", returning="minimal")\
+            .eq("user_id", user_id)\
+            .eq("read", False)
+        if ids is not None:
+            query = query.in_("id", ids)
+        if up_to:
+            query = query.or_(keyset_filter(*up_to, inclusive=True))
+        result = await query.execute()
+        return result.count or 0
+
+    async def delete_many(self, user_id: str, ids: Optional[List[str]] = None,
+                          up_to: Optional[Tuple[str, str]] = None) -> int:
+        table = await self._table()
+        query = table.delete(count="exact", returning="minimal").eq("user_id", user_id)
+        if ids is not None:
+            query = query.in_("id", ids)
+        if up_to:
+            query = query.or_(keyset_filter(*up_to, inclusive=True))
+        result = await query.execute()
+        return result.count or 0
+
+    async def delete(self, notification_id: str, user_id: str) -> bool:
+        table = await self._table()
+        result = await table.delete()\
+            .eq("id", notification_id)\
+            .eq("user_id", user_id)\
+            .execute()
+        return bool(result.data)
+
+
+notifications_repository = NotificationsRepository()
@@ -0,0 +1,132 @@
+# app/repositories/page_writer.py
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+
+from ..utils.events import event_bus
+from ..utils.metrics import stage_timer
+from .images_repository import images_repository
+from .pdf_jobs_repository import pdf_jobs_repository
+
+# Écritures regroupées : au plus WRITE_BATCH_SIZE pages par upsert, ou toutes les WRITE_BATCH_INTERVAL secondes
+WRITE_BATCH_SIZE = int(os.getenv("WRITE_BATCH_SIZE", 16))
+WRITE_BATCH_INTERVAL = float(os.getenv("WRITE_BATCH_INTERVAL", 1.0))
+
+
+def page_image_id(pdf_id: str, page_number: int) -> str:
+    """Identifiant stable de la page : une relance du job réécrit les mêmes lignes."""
+    return str(uuid.uuid5(uuid.UUID(pdf_id), f"page-{page_number}"))
+
+
+class PageWriteBatcher:
+    """
+    Écritures en base des pages d'un PDF :
+    - toutes les lignes images sont créées en une insertion au démarrage ;
+    - les résultats des pages sont accumulés puis écrits par un seul upsert ;
+    - l'avancement du job est compté localement et envoyé avec chaque lot.
+    """
+
+    def __init__(self, user_id: str, pdf_id: str, batch_size: int = WRITE_BATCH_SIZE,
+                 interval: float = WRITE_BATCH_INTERVAL):
+        self.user_id = user_id
+        self.pdf_id = pdf_id
+        self._batch_size = batch_size
+        self._interval = interval
+        self._rows: Dict[int, dict] = {}
+        self._pending: Dict[int, dict] = {}
+        self._completed = 0
+        self._failed = 0
+        self._lock = asyncio.Lock()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def image_id(self, page_number: int) -> str:
+        return page_image_id(self.pdf_id, page_number)
+
+    async def insert_pages(self, total_pages: int):
+        """Crée les lignes de toutes les pages (statut pending) en une seule requête."""
+        now = datetime.utcnow().isoformat()
+        self._rows = {
+            page_number: {
+                "id": self.image_id(page_number),
+                "filename": f"{self.pdf_id}_page_{page_number}",
+                "upload_date": now,
+                "user_id": self.user_id,
+                "pdf_id": self.pdf_id,
+                "page_number": page_number,
+                "processing_status": "pending",
+            }
+            for page_number in range(1, total_pages + 1)
+        }
+        await images_repository.upsert_many(list(self._rows.values()))
+        if self._flusher is None:
+            self._flusher = asyncio.create_task(self._flush_periodically())
+
+    async def update(self, page_number: int, data: dict):
+        self._pending.setdefault(page_number, {}).update(data)
+        if len(self._pending) >= self._batch_size:
+            await self.flush()
+
+    def page_done(self, succeeded: bool):
+        if succeeded:
+            self._completed += 1
+        else:
+            self._failed += 1
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self._interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logging.warning(f"Écriture groupée des pages du PDF {self.pdf_id} reportée : {e}")
+
+    async def flush(self):
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            completed, failed = self._completed, self._failed
+            self._completed = self._failed = 0
+            try:
+                if pending:
+                    with stage_timer("db_write"):
+                        await self._upsert(pending)
+                if completed or failed:
+                    job = await pdf_jobs_repository.pages_done(self.pdf_id, completed, failed)
+                    if job:
+                        await event_bus.publish(self.user_id, "pdf_progress", {
+                            "pdf_id": self.pdf_id,
+                            "status": job["status"],
+                            "total_pages": job["total_pages"],
+                            "processed_pages": job["completed_pages"],
+                            "failed_pages": job["failed_pages"]
+                        })
+            except Exception:
+                # Remettre le lot en attente pour la prochaine écriture
+                for page_number, data in pending.items():
+                    self._pending[page_number] = {**data, **self._pending.get(page_number, {})}
+                self._completed += completed
+                self._failed += failed
+                raise
+
+    async def _upsert(self, pending: Dict[int, dict]):
+        # L'upsert envoie la ligne complète (colonnes NOT NULL de l'insertion) : la ligne
+        # de base garde les valeurs déjà écrites, sans quoi un lot suivant remettrait
+        # celles de la création (filename sans extension, statut pending)
+        rows = {page_number: {**self._rows.get(page_number, {}), **data} for page_number, data in pending.items()}
+        # PostgREST exige les mêmes colonnes dans tout le lot : un upsert par jeu de colonnes
+        groups: Dict[frozenset, list] = {}
+        for row in rows.values():
+            groups.setdefault(frozenset(row), []).append(row)
+        for group in groups.values():
+            await images_repository.upsert_many(group)
+        self._rows.update(rows)
+
+    async def close(self):
+        """Dernière écriture ; les erreurs remontent pour que le job soit réessayé."""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
@@ -0,0 +1,77 @@
+# app/repositories/pdf_jobs_repository.py
+from datetime import datetime
+from typing import Optional
+
+from ..config.supabase_connection import get_async_supabase
+from .base import BaseRepository
+
+
+class PdfJobsRepository(BaseRepository):
+    """Un enregistrement par PDF uploadé : nombre de pages, avancement, horodatages."""
+
+    table_name = "pdf_jobs"
+
+    async def create(self, job_data: dict) -> Optional[dict]:
+        table = await self._table()
+        result = await table.insert(job_data).execute()
+        return result.data[0] if result.data else None
+
+    async def get(self, job_id: str, user_id: Optional[str] = None, columns: str = "*") -> Optional[dict]:
+        table = await self._table()
+        query = table.select(columns).eq("id", job_id)
+        if user_id is not None:
+            query = query.eq("user_id", user_id)
+        result = await query.limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def find_completed_by_hash(self, user_id: str, content_hash: str, columns: str = "*") -> Optional[dict]:
+        """Dernier PDF identique de l'utilisateur dont toutes les pages ont réussi."""
+        table = await self._table()
+        result = await table.select(columns)\
+            .eq("user_id", user_id)\
+            .eq("content_hash", content_hash)\
+            .eq("status", "completed")\
+            .order("created_at", desc=True)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+
+    async def update(self, job_id: str, update_data: dict) -> Optional[dict]:
+        table = await self._table()
+        update_data = {**update_data, "updated_at": datetime.utcnow().isoformat()}
+        result = await table.update(update_data).eq("id", job_id).execute()
+        return result.data[0] if result.data else None
+
+    async def start(self, job_id: str, total_pages: int) -> Optional[dict]:
+        now = datetime.utcnow().isoformat()
+        # Remise à zéro des compteurs : le job peut être relancé par la file de tâches
+        data = {
+            "status": "processing",
+            "total_pages": total_pages,
+            "completed_pages": 0,
+            "failed_pages": 0,
+            "error": None,
+            "started_at": now,
+            "finished_at": None
+        }
+        if total_pages == 0:
+            data.update({"status": "completed", "finished_at": now})
+        return await self.update(job_id, data)
+
+    async def pages_done(self, job_id: str, completed: int, failed: int) -> Optional[dict]:
+        """Comptabilise un lot de pages terminées en un seul appel."""
+        client = await get_async_supabase()
+        result = await client.rpc(
+            "pdf_job_pages_done", {"p_job_id": job_id, "p_completed": completed, "p_failed": failed}
+        ).execute()
+        return result.data[0] if result.data else None
+
+    async def mark_failed(self, job_id: str, error: str) -> Optional[dict]:
+        return await self.update(job_id, {
+            "status": "failed",
+            "error": error,
+            "finished_at": datetime.utcnow().isoformat()
+        })
+
+
+pdf_jobs_repository = PdfJobsRepository()
@@ -0,0 +1,175 @@
+# app/repositories/storage_repository.py
+import asyncio
+import logging
+import os
+import random
+from typing import AsyncIterator, Callable, Iterable, List, Optional, Tuple
+
+import httpx
+
+from ..config.supabase_connection import SUPABASE_KEY, SUPABASE_URL
+
+BUCKET_NAME = "files"
+
+# API de stockage (Supabase Storage ou un service compatible local pour les tests)
+STORAGE_URL = os.getenv("STORAGE_URL", f"{(SUPABASE_URL or '').rstrip('/')}/storage/v1")
+# Base des URLs publiques ; par défaut celle de STORAGE_URL
+STORAGE_PUBLIC_URL = os.getenv("STORAGE_PUBLIC_URL", f"{STORAGE_URL.rstrip('/')}/object/public")
+# Transferts simultanés (= connexions keep-alive gardées ouvertes)
+STORAGE_CONCURRENCY = int(os.getenv("STORAGE_CONCURRENCY", 8))
+STORAGE_MAX_RETRIES = int(os.getenv("STORAGE_MAX_RETRIES", 4))
+STORAGE_RETRY_BASE_DELAY = float(os.getenv("STORAGE_RETRY_BASE_DELAY", 0.5))
+STORAGE_TIMEOUT = float(os.getenv("STORAGE_TIMEOUT", 30))
+
+# Taille des blocs lus / écrits lors des transferts depuis ou vers un fichier
+STORAGE_CHUNK_SIZE = int(os.getenv("STORAGE_CHUNK_SIZE", 1024 * 1024))
+
+# Réponses pour lesquelles une nouvelle tentative a un sens
+_RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+async def _file_chunks(local_path: str) -> AsyncIterator[bytes]:
+    with open(local_path, "rb") as f:
+        while True:
+            chunk = await asyncio.to_thread(f.read, STORAGE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+class StorageError(Exception):
+    pass
+
+
+class StorageRepository:
+    """
+    Accès asynchrone au bucket de stockage, directement sur l'API HTTP :
+    un client httpx partagé (keep-alive), au plus STORAGE_CONCURRENCY transferts
+    simultanés, et des nouvelles tentatives avec attente exponentielle.
+    Les uploads utilisent x-upsert : réessayer un upload déjà arrivé est sans effet.
+    """
+
+    def __init__(self, bucket_name: str = BUCKET_NAME, base_url: str = STORAGE_URL,
+                 public_url: str = STORAGE_PUBLIC_URL, api_key: str = SUPABASE_KEY,
+                 concurrency: int = STORAGE_CONCURRENCY):
+        self.bucket_name = bucket_name
+        self.base_url = base_url.rstrip("/")
+        self._api_key = api_key
+        self._concurrency = concurrency
+        # Préfixe des URLs publiques, calculé une seule fois
+        self.public_url_prefix = f"{public_url.rstrip('/')}/{bucket_name}/"
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.stats = {"uploads": 0, "downloads": 0, "retries": 0, "failures": 0, "bytes_uploaded": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            headers = {"Authorization": f"Bearer {self._api_key}", "apikey": self._api_key or ""}
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                timeout=STORAGE_TIMEOUT,
+                limits=httpx.Limits(max_connections=self._concurrency,
+                                    max_keepalive_connections=self._concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self._concurrency)
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    def _object_url(self, path: str) -> str:
+        return f"/object/{self.bucket_name}/{path.lstrip('/')}"
+
+    async def _request(self, method: str, path: str, body: Callable = None, stream: bool = False,
+                       **kwargs) -> httpx.Response:
+        """
+        Requête avec nouvelles tentatives sur erreur réseau, 429 et 5xx.
+        body fournit un nouveau corps (itérateur de blocs) à chaque tentative ;
+        avec stream, la réponse est rendue ouverte et l'appelant doit la fermer.
+        """
+        client = self._get_client()
+        for attempt in range(STORAGE_MAX_RETRIES + 1):
+            delay = STORAGE_RETRY_BASE_DELAY * (2 ** attempt) * (0.5 + random.random())
+            if body is not None:
+                kwargs["content"] = body()
+            try:
+                async with self._semaphore:
+                    request = client.build_request(method, self._object_url(path), **kwargs)
+                    response = await client.send(request, stream=stream)
+                if response.status_code < 400:
+                    return response
+                if stream:
+                    await response.aread()
+                    await response.aclose()
+                if response.status_code not in _RETRY_STATUS:
+                    self.stats["failures"] += 1
+                    raise StorageError(f"{method} {path} : HTTP {response.status_code} {response.text[:200]}")
+                retry_after = response.headers.get("Retry-After")
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                error = StorageError(f"{method} {path} : HTTP {response.status_code}")
+            except httpx.TransportError as e:
+                error = StorageError(f"{method} {path} : {e!r}")
+
+            if attempt == STORAGE_MAX_RETRIES:
+                self.stats["failures"] += 1
+                raise error
+            self.stats["retries"] += 1
+            logging.warning(f"Stockage : {error}, nouvel essai dans {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def upload(self, path: str, content: bytes, content_type: str = None) -> str:
+        """Upload le contenu et retourne son URL publique."""
+        headers = {"x-upsert": "true", "Content-Type": content_type or "application/octet-stream"}
+        await self._request("POST", path, content=content, headers=headers)
+        self.stats["uploads"] += 1
+        self.stats["bytes_uploaded"] += len(content)
+        return self.public_url(path)
+
+    async def upload_file(self, path: str, local_path: str, content_type: str = None) -> str:
+        """Upload d'un fichier local par blocs, sans le charger en mémoire."""
+        size = os.path.getsize(local_path)
+        headers = {
+            "x-upsert": "true",
+            "Content-Type": content_type or "application/octet-stream",
+            "Content-Length": str(size),
+        }
+        await self._request("POST", path, body=lambda: _file_chunks(local_path), headers=headers)
+        self.stats["uploads"] += 1
+        self.stats["bytes_uploaded"] += size
+        return self.public_url(path)
+
+    async def upload_many(self, items: Iterable[Tuple[str, bytes, Optional[str]]]) -> List[str]:
+        """Uploads en parallèle (bornés par le pool) ; URLs publiques dans l'ordre des éléments."""
+        return list(await asyncio.gather(*[
+            self.upload(path, content, content_type) for path, content, content_type in items
+        ]))
+
+    async def download(self, path: str) -> bytes:
+        response = await self._request("GET", path)
+        self.stats["downloads"] += 1
+        return response.content
+
+    async def download_to_file(self, path: str, local_path: str):
+        """Téléchargement par blocs vers un fichier local."""
+        response = await self._request("GET", path, stream=True)
+        try:
+            with open(local_path, "wb") as f:
+                async for chunk in response.aiter_bytes(STORAGE_CHUNK_SIZE):
+                    await asyncio.to_thread(f.write, chunk)
+        finally:
+            await response.aclose()
+        self.stats["downloads"] += 1
+
+    def public_url(self, path: str) -> str:
+        """URL publique construite localement, sans appel au client. Les URLs complètes sont retournées telles quelles."""
+        if not path or path.startswith(("http://", "https://")):
+            return path
+        return self.public_url_prefix + path.lstrip("/")
+
+
+storage_repository = StorageRepository()
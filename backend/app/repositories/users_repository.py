@@ -0,0 +1,39 @@
+# app/repositories/users_repository.py
+from typing import Optional
+
+from ..utils.cache_invalidation import invalidate_cache
+from .base import BaseRepository
+
+
+class UsersRepository(BaseRepository):
+    table_name = "users"
+
+    async def get_by_id(self, user_id: str, columns: str = "*") -> Optional[dict]:
+        table = await self._table()
+        result = await table.select(columns).eq("id", user_id).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def get_by_npi(self, npi: str, columns: str = "*") -> Optional[dict]:
+        table = await self._table()
+        result = await table.select(columns).eq("npi", npi).limit(1).execute()
+        return result.data[0] if result.data else None
+
+    async def insert(self, user_data: dict) -> Optional[dict]:
+        table = await self._table()
+        result = await table.insert(user_data).execute()
+        return result.data[0] if result.data else None
+
+    async def update(self, user_id: str, update_data: dict) -> Optional[dict]:
+        table = await self._table()
+        result = await table.update(update_data).eq("id", user_id).execute()
+        await invalidate_cache("principal", user_id)
+        return result.data[0] if result.data else None
+
+    async def delete(self, user_id: str) -> bool:
+        table = await self._table()
+        result = await table.delete().eq("id", user_id).execute()
+        await invalidate_cache("principal", user_id)
+        return bool(result.data)
+
+
+users_repository = UsersRepository()
@@ -1,3 +1,4 @@
+import asyncio
 import time
 import random
 import os
@@ -5,13 +6,15 @@ from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from datetime import datetime, timedelta
 from jose import jwt
-from app.config.supabase_connection import db
+from app.repositories.users_repository import users_repository
 from app.anip.anip_service import get_user_from_anip
 from app.utils.user import create_user_if_not_exists
 from dotenv import load_dotenv
 import os
 from passlib.context import CryptContext
-from app.utils.otp import send_otp_email
+from app.utils.otp import enqueue_otp_email
+from app.utils.otp_store import get_otp_store
+from app.utils.auth_cache import JWT_EMBED_CLAIMS, build_token_claims
 
 # Charger le fichier .env du dossier app
 env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
@@ -24,61 +27,21 @@ if not SECRET_KEY:
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
 
-# Pour le logging des erreurs
+# Pour le logging des erreurs (configuré par app/utils/logs.py)
 import logging
-logging.basicConfig(level=logging.INFO)
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
-# Temporary OTP storage with better structure
-class OTPData:
-    def __init__(self):
-        self._store = {}
-    
-    def add(self, npi: str, otp: str, email: str):
-        self._store[npi] = {
-            "otp": otp,
-            "expires": time.time() + 300,  # 5 minutes
-            "email": email,
-            "attempts": 0
-        }
-        logging.info(f"OTP stocké pour NPI {npi}")
-    
-    def verify(self, npi: str, otp: str) -> bool:
-        data = self._store.get(npi)
-        if not data:
-            logging.warning(f"Aucun OTP trouvé pour NPI {npi}")
-            return False
-        
-        if time.time() > data["expires"]:
-            logging.warning(f"OTP expiré pour NPI {npi}")
-            self.remove(npi)
-            return False
-        
-        data["attempts"] += 1
-        if data["attempts"] > 3:
-            logging.warning(f"Trop de tentatives pour NPI {npi}")
-            self.remove(npi)
-            return False
-            
-        return data["otp"] == otp
-    
-    def get_email(self, npi: str) -> str:
-        data = self._store.get(npi)
-        return data["email"] if data else None
-    
-    def remove(self, npi: str):
-        if npi in self._store:
-            del self._store[npi]
-            logging.info(f"OTP supprimé pour NPI {npi}")
-    
-    def cleanup_expired(self):
-        current_time = time.time()
-        expired = [npi for npi, data in self._store.items() if current_time > data["expires"]]
-        for npi in expired:
-            self.remove(npi)
+def create_access_token(user_id: str, user: dict = None) -> str:
+    """Génère le token JWT ; inclut les informations minimales de l'utilisateur si JWT_EMBED_CLAIMS."""
+    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    token_payload = {"sub": str(user_id), "exp": expire}
+    if JWT_EMBED_CLAIMS and user:
+        token_payload["claims"] = build_token_claims(user)
+    return jwt.encode(token_payload, SECRET_KEY, algorithm=ALGORITHM)
 
-otp_store = OTPData()
+# Stockage des OTP (mémoire ou SQLite partagé selon OTP_BACKEND)
+otp_store = get_otp_store()
 
 class RequestOTP(BaseModel):
     npi: str
@@ -93,15 +56,15 @@ class AdminLogin(BaseModel):
     password: str
 
 @router.post("/request-otp")
-def request_otp_email(data: RequestOTP):
+async def request_otp_email(data: RequestOTP):
     try:
         logging.info(f"Demande d'OTP pour NPI: {data.npi}, email: {data.email}")
         
         # Nettoyer les OTP expirés
-        otp_store.cleanup_expired()
+        await asyncio.to_thread(otp_store.cleanup_expired)
         
         # Vérifier que l'email correspond à celui attaché au NPI
-        user = get_user_from_anip(data.npi)
+        user = await asyncio.to_thread(get_user_from_anip, data.npi)
         
         if not user:
             logging.error(f"Utilisateur non trouvé dans ANIP pour NPI: {data.npi}")
@@ -120,16 +83,18 @@ def request_otp_email(data: RequestOTP):
         logging.info(f"OTP généré pour NPI: {data.npi}")
 
         # Stocker l'OTP
-        otp_store.add(data.npi, otp, data.email)
+        await asyncio.to_thread(otp_store.add, data.npi, otp, data.email)
         
-        # Envoyer l'email
-        success = send_otp_email(data.email, otp)
+        # Envoyer l'email en arrière-plan ; l'OTP est invalidé si l'envoi échoue définitivement,
+        # sauf si un nouveau code a été demandé entre-temps
+        npi = data.npi
+        success = enqueue_otp_email(data.email, otp, on_failure=lambda: otp_store.remove(npi, otp))
         if not success:
-            logging.error(f"Échec de l'envoi d'email pour NPI: {data.npi}")
-            otp_store.remove(data.npi)
-            raise HTTPException(status_code=500, detail="Impossible d'envoyer l'OTP")
+            logging.error(f"File d'envoi d'email pleine pour NPI: {data.npi}")
+            await asyncio.to_thread(otp_store.remove, data.npi, otp)
+            raise HTTPException(status_code=503, detail="Impossible d'envoyer l'OTP, réessayez plus tard")
 
-        logging.info(f"OTP envoyé avec succès à {data.email}")
+        logging.info(f"OTP mis en file d'envoi pour {data.email}")
         return {"message": "OTP envoyé par email"}
         
     except HTTPException:
@@ -144,30 +109,29 @@ async def verify_otp(data: VerifyOTP):
         logging.info(f"Tentative de vérification OTP pour NPI: {data.npi}")
         
         # Vérifier l'OTP
-        if not otp_store.verify(data.npi, data.otp):
+        if not await asyncio.to_thread(otp_store.verify, data.npi, data.otp):
             raise HTTPException(status_code=400, detail="Code OTP invalide ou expiré")
             
         logging.info(f"OTP validé avec succès pour NPI: {data.npi}")
         
         # Récupérer l'email avant de supprimer l'OTP
-        email = otp_store.get_email(data.npi)
+        email = await asyncio.to_thread(otp_store.get_email, data.npi)
         
         # Supprimer l'OTP après validation réussie
-        otp_store.remove(data.npi)
+        await asyncio.to_thread(otp_store.remove, data.npi, data.otp)
         
         # Procéder à la création/récupération de l'utilisateur et génération du token
         try:
             # Check if user exists in Supabase
-            users_response = db.table("users").select("*").eq("npi", data.npi).limit(1).execute()
-            users_data = users_response.data
+            user_data = await users_repository.get_by_npi(data.npi)
 
-            if not users_data:
+            if not user_data:
                 # Fetch user info from ANIP and create Supabase account
-                user_anip = get_user_from_anip(data.npi)
+                user_anip = await asyncio.to_thread(get_user_from_anip, data.npi)
                 if not user_anip:
                     raise HTTPException(status_code=404, detail="Utilisateur non trouvé dans ANIP")
 
-                user_id = create_user_if_not_exists(
+                user_id = await create_user_if_not_exists(
                     npi=data.npi,
                     phone_number=user_anip.get("phone_number"),
                     first_name=user_anip["first_name"],
@@ -178,14 +142,12 @@ async def verify_otp(data: VerifyOTP):
                     address=user_anip.get("address"),
                     profession=user_anip.get("profession")
                 )
+                user_data = {**user_anip, "npi": data.npi}
             else:
-                user_data = users_data[0]
                 user_id = user_data["id"]
 
             # Générer le token JWT
-            expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-            token_payload = {"sub": str(user_id), "exp": expire}
-            token = jwt.encode(token_payload, SECRET_KEY, algorithm=ALGORITHM)
+            token = create_access_token(user_id, user_data)
 
             return {"access_token": token, "token_type": "bearer", "user_id": user_id}
 
@@ -202,8 +164,7 @@ async def verify_otp(data: VerifyOTP):
     # Check if user exists in Supabase
     try:
         logging.info(f"Recherche de l'utilisateur dans Supabase avec NPI: {data.npi}")
-        users_response = db.table("users").select("*").eq("npi", data.npi).limit(1).execute()
-        users_data = users_response.data
+        users_data = await users_repository.get_by_npi(data.npi)
     except Exception as e:
         logging.error(f"Erreur lors de la recherche dans Supabase: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur de base de données: {str(e)}")
@@ -212,13 +173,13 @@ async def verify_otp(data: VerifyOTP):
         if not users_data:
             logging.info(f"Utilisateur non trouvé dans Supabase, vérification ANIP pour NPI: {data.npi}")
             # Fetch user info from ANIP and create Supabase account
-            user_anip = get_user_from_anip(data.npi)
+            user_anip = await asyncio.to_thread(get_user_from_anip, data.npi)
             if not user_anip:
                 logging.error(f"Utilisateur non trouvé dans ANIP pour NPI: {data.npi}")
                 raise HTTPException(status_code=404, detail="Utilisateur non trouvé dans ANIP")
 
             logging.info(f"Création d'un nouvel utilisateur pour NPI: {data.npi}")
-            user_id = create_user_if_not_exists(
+            user_id = await create_user_if_not_exists(
                 npi=data.npi,
                 phone_number=user_anip.get("phone_number"),
                 first_name=user_anip["first_name"],
@@ -236,8 +197,7 @@ async def verify_otp(data: VerifyOTP):
                 
             logging.info(f"Nouvel utilisateur créé avec succès, ID: {user_id}")
         else:
-            user_data = users_data[0]
-            user_id = user_data.get("id")
+            user_id = users_data.get("id")
             if not user_id:
                 logging.error(f"ID utilisateur manquant pour NPI: {data.npi}")
                 raise HTTPException(status_code=500, detail="ID utilisateur manquant")
@@ -249,9 +209,7 @@ async def verify_otp(data: VerifyOTP):
         logging.error(f"Erreur inattendue lors du traitement de l'utilisateur: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur inattendue: {str(e)}")
 
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    token_payload = {"sub": str(user_id), "exp": expire}
-    token = jwt.encode(token_payload, SECRET_KEY, algorithm=ALGORITHM)
+    token = create_access_token(user_id, users_data or user_anip)
 
     return {"access_token": token, "token_type": "bearer", "user_id": user_id}
 
@@ -0,0 +1,69 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from ..utils.user import authenticate_token, get_current_user_from_query
+from ..utils.events import event_bus
+import asyncio
+import json
+import os
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+# Intervalle des messages de maintien de connexion (secondes)
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+
+
+@router.get("/stream")
+async def stream_events(request: Request, current_user: dict = Depends(get_current_user_from_query)):
+    """
+    Flux Server-Sent Events de l'utilisateur : page_completed, page_failed,
+    pdf_progress et notification. Le token peut être passé en ?token=
+    """
+    user_id = current_user["user_id"]
+
+    async def event_stream():
+        async with event_bus.subscribe(user_id) as events:
+            events = events.__aiter__()
+            next_event = asyncio.ensure_future(events.__anext__())
+            try:
+                while not await request.is_disconnected():
+                    done, _ = await asyncio.wait({next_event}, timeout=EVENTS_HEARTBEAT_SECONDS)
+                    if not done:
+                        yield ": keep-alive\n\n"
+                        continue
+                    event = next_event.result()
+                    next_event = asyncio.ensure_future(events.__anext__())
+                    yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            finally:
+                next_event.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.websocket("/ws")
+async def websocket_events(websocket: WebSocket, token: str):
+    """Même flux d'événements via WebSocket (/events/ws?token=...)."""
+    try:
+        current_user = await authenticate_token(token)
+    except HTTPException:
+        await websocket.close(code=4401)
+        return
+
+    await websocket.accept()
+    async with event_bus.subscribe(current_user["user_id"]) as events:
+        async def forward():
+            async for event in events:
+                await websocket.send_json(event)
+
+        forward_task = asyncio.create_task(forward())
+        try:
+            # Les messages du client sont ignorés ; la lecture sert à détecter la déconnexion
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            forward_task.cancel()
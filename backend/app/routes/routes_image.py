@@ -1,106 +1,381 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi import BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, Request
 from fastapi.responses import JSONResponse
-from ..config.supabase_connection import supabase
+from ..repositories.images_repository import images_repository
+from ..repositories.pdf_jobs_repository import pdf_jobs_repository
+from ..repositories.page_writer import PageWriteBatcher
+from ..repositories.storage_repository import storage_repository
 from ..utils.user import get_current_user
+from ..utils.events import event_bus
 import asyncio
 from functools import partial
-from ..utils.ai_services import extract_parcelles_coordinates, determine_zone_layers, generate_pdf_summary
-from ..routes.routes_notification import create_notification
+from ..utils.pdf import SUMMARY_MODE, SummaryCollector, render_page_summary, render_summary, zones_from_row
+from ..utils.inference import inference_batcher, inference_engine
+from ..utils.geometry import ParcelSet
+from ..utils.page_pipeline import PIPELINE_STAGES, is_done, load_state, mark_done, mark_failed, next_stage
+from ..routes.routes_notification import NOTIFICATION_MODE, create_notification
 from datetime import datetime
-from pdf2image import convert_from_bytes
-from io import BytesIO
+from ..utils.pdf_raster import iter_pdf_pages_from_path
+from ..utils.upload_ingest import SpooledPdf, check_request_size, spool_upload
+from ..utils.page_encoding import EncodedPage, encode_page_with_thumbnail
+from ..utils.workers import PAGE_CONCURRENCY, run_cpu
+from ..utils.job_queue import job_queue, JOB_QUEUE_MAX_DEPTH, JOB_SPOOL_DIR
+from ..utils.content_cache import cache_stats, hash_page
+from ..utils.metrics import PDF_PROCESSING_SECONDS, stage_timer
+import logging
+import os
+import time
 import uuid
 import json
 
-async def process_pdf_upload(user_id: str, pdf_id: str, file_content: bytes, pdf_url: str):
-    """Traitement asynchrone du PDF uploadé"""
+logger = logging.getLogger(__name__)
+
+async def process_pdf_upload(user_id: str, pdf_id: str, pdf_path: str, pdf_url: str):
+    """
+    Traitement asynchrone du PDF uploadé, rasterisé depuis le fichier local pdf_path.
+    Une erreur au niveau du PDF (rasterisation, base) est enregistrée puis relancée
+    pour que la file de tâches puisse réessayer.
+    """
+    semaphore = asyncio.Semaphore(PAGE_CONCURRENCY)
+    summary = SummaryCollector(pdf_id) if SUMMARY_MODE == "combined" else None
+    writer = PageWriteBatcher(user_id, pdf_id)
+    tasks = []
+    log = {"pdf_id": pdf_id, "user_id": user_id}
+    started_at = time.perf_counter()
     try:
-        # Conversion PDF en images
-        loop = asyncio.get_event_loop()
-        images = await loop.run_in_executor(None, convert_from_bytes, file_content, 100)
-        print(f"Conversion PDF terminée : {len(images)} pages trouvées")
-        
-        for i, image in enumerate(images):
-            # Conversion et compression de l'image
-            img_byte_arr = BytesIO()
-            image.save(img_byte_arr, format="PNG", optimize=True, quality=50)
-            img_bytes = img_byte_arr.getvalue()
-
-            # Upload image
-            image_filename = f"{pdf_id}_page_{i+1}.png"
-            img_path = f"images/{user_id}/{image_filename}"
-            supabase.storage.from_(BUCKET_NAME).upload(img_path, img_bytes)
-            img_url = supabase.storage.from_(BUCKET_NAME).get_public_url(img_path)
-
-            # Créer l'enregistrement image
-            image_id = str(uuid.uuid4())
-            # CORRECT
-            image_data = {
-                "id": image_id,
-                "filename": image_filename,
-                "upload_date": datetime.utcnow().isoformat(),
-                "user_id": user_id,
-                "file_path": img_url,
-                "processing_status": "processing"
-            }
-            supabase.table("images").insert(image_data).execute()
+        # Conversion PDF en images, une page à la fois
+        started = False
+        async for page_number, total_pages, image in iter_pdf_pages_from_path(pdf_path):
+            if not started:
+                await pdf_jobs_repository.start(pdf_id, total_pages)
+                await writer.insert_pages(total_pages)
+                started = True
+            logger.debug(f"Conversion page {page_number}/{total_pages} terminée", extra={**log, "page_number": page_number})
+
+            # Limite le nombre de pages en cours : la rasterisation attend qu'une place se libère
+            await semaphore.acquire()
+            try:
+                # Page déjà traitée à l'identique pour cet utilisateur ?
+                with stage_timer("hash"):
+                    page_hash = await asyncio.to_thread(hash_page, image)
+                cached_page = await images_repository.find_completed_by_hash(
+                    user_id, page_hash, columns="file_path, thumbnail_path, zones_result, parcels_data, result_summary_pdf"
+                )
+                encoded_page = thumbnail = None
+                if cached_page is None:
+                    # Encodage de la page et de sa vignette dans le pool de processus
+                    with stage_timer("encode"):
+                        encoded_page, thumbnail = await run_cpu(encode_page_with_thumbnail, image)
+            except Exception:
+                semaphore.release()
+                raise
+
+            tasks.append(asyncio.create_task(
+                process_pdf_page(user_id, pdf_id, page_number, encoded_page, pdf_url, semaphore, writer,
+                                 page_hash=page_hash, cached_page=cached_page, thumbnail=thumbnail,
+                                 summary=summary)
+            ))
+
+        if not started:
+            # PDF sans aucune page
+            await pdf_jobs_repository.start(pdf_id, 0)
+
+        await asyncio.gather(*tasks)
+        await writer.close()
+        logger.info("Traitement de toutes les pages terminé", extra={**log, "pages": len(tasks)})
+
+        summary_url = None
+        if summary is not None and len(summary):
+            summary_url = await publish_combined_summary(user_id, pdf_id, summary)
+        if started and NOTIFICATION_MODE == "per_pdf":
+            await notify_pdf_done(user_id, pdf_id, summary_url)
+        PDF_PROCESSING_SECONDS.labels("completed").observe(time.perf_counter() - started_at)
 
-            # Lancer l'analyse pour cette image
-            await process_full_analysis(
-                user_id=user_id,
-                image_id=image_id,
-                image_url=img_url,
-                original_pdf_url=pdf_url,
-                image_data=img_bytes
-            )
+    except Exception as e:
+        PDF_PROCESSING_SECONDS.labels("failed").observe(time.perf_counter() - started_at)
+        logger.error(f"Erreur traitement PDF {pdf_id}: {str(e)}", extra=log)
+        # Laisser finir les pages déjà lancées
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await writer.close()
+        except Exception as write_error:
+            logger.error(f"Erreur écriture des pages du PDF {pdf_id}: {str(write_error)}", extra=log)
+        try:
+            await pdf_jobs_repository.mark_failed(pdf_id, str(e))
+        except Exception as job_error:
+            logger.error(f"Erreur mise à jour du job {pdf_id}: {str(job_error)}", extra=log)
+        raise
+    finally:
+        if summary is not None:
+            summary.cleanup()
 
-        print(f"Traitement de toutes les pages terminé")
 
+async def publish_combined_summary(user_id: str, pdf_id: str, summary: SummaryCollector) -> str:
+    """
+    Un seul résumé multi-pages pour tout le PDF : un rendu, un upload, une mise à jour.
+    L'étape summary des pages n'est marquée terminée qu'une fois le résumé enregistré ;
+    en cas d'échec l'erreur remonte et la file relance le PDF, qui régénère le résumé.
+    """
+    try:
+        with stage_timer("combined_summary"):
+            pdf_bytes = await run_cpu(render_summary, summary.pages())
+        pdf_filename = f"summary_{pdf_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+        summary_url = await storage_repository.upload(
+            f"results/{user_id}/{pdf_id}/{pdf_filename}", pdf_bytes, "application/pdf"
+        )
+        await pdf_jobs_repository.update(pdf_id, {"summary_pdf": summary_url})
+        await images_repository.update_many(summary.image_ids(), {
+            "result_summary_pdf": summary_url,
+            "pipeline_state": mark_done(load_state(None), *PIPELINE_STAGES),
+        })
     except Exception as e:
-        print(f"Erreur traitement PDF {pdf_id}: {str(e)}")
-        # Ne plus mettre à jour le statut du PDF puisqu'il n'est plus en base
+        logger.error(f"Erreur génération du résumé du PDF {pdf_id}: {str(e)}", extra={"pdf_id": pdf_id})
+        raise
+    logger.info(f"Résumé combiné du PDF {pdf_id} ({len(summary)} pages)",
+                extra={"pdf_id": pdf_id, "result_pdf": summary_url})
+    await event_bus.publish(user_id, "pdf_summary_ready", {"pdf_id": pdf_id, "result_pdf": summary_url})
+    return summary_url
+
+
+async def notify_pdf_done(user_id: str, pdf_id: str, summary_url: str = None):
+    """Une seule notification pour tout le PDF (NOTIFICATION_MODE=per_pdf)."""
+    job = await pdf_jobs_repository.get(pdf_id, columns="completed_pages, failed_pages")
+    completed = job["completed_pages"] if job else 0
+    failed = job["failed_pages"] if job else 0
+    if failed == 0:
+        await create_notification(
+            user_id=user_id,
+            title="Traitement terminé",
+            message=f"Le traitement de votre levé topographique est terminé avec succès ({completed} page(s)).",
+            type="success",
+            result_id=pdf_id,
+            pdf_url=summary_url
+        )
+    else:
+        await create_notification(
+            user_id=user_id,
+            title="Traitement terminé avec erreurs" if completed else "Erreur de traitement",
+            message=f"{completed} page(s) traitée(s), {failed} page(s) en erreur.",
+            type="warning" if completed else "error",
+            result_id=pdf_id,
+            pdf_url=summary_url
+        )
+
+
+async def process_pdf_page(user_id: str, pdf_id: str, page_number: int, encoded_page: EncodedPage, pdf_url: str,
+                           semaphore: asyncio.Semaphore, writer: PageWriteBatcher, page_hash: str = None,
+                           cached_page: dict = None, thumbnail: EncodedPage = None,
+                           summary: SummaryCollector = None):
+    """
+    Upload et analyse d'une page ; libère sa place dans le sémaphore à la fin.
+    Si cached_page est fourni, les résultats existants sont réutilisés sans recalcul.
+    Les écritures en base passent par writer (regroupées avec celles des autres pages).
+    """
+    succeeded = False
+    image_id = writer.image_id(page_number)
+    try:
+        if cached_page is not None:
+            extension = os.path.splitext(cached_page["file_path"])[1] or ".png"
+            image_filename = f"{pdf_id}_page_{page_number}{extension}"
+            succeeded = await reuse_cached_page(user_id, pdf_id, page_number, image_id, image_filename,
+                                                page_hash, cached_page, writer, summary=summary)
+            return
+
+        cache_stats.record("page_misses")
+        image_filename = f"{pdf_id}_page_{page_number}.{encoded_page.extension}"
+
+        # Upload image (et vignette)
+        img_path = f"images/{user_id}/{image_filename}"
+        uploads = [(img_path, encoded_page.data, encoded_page.content_type)]
+        if thumbnail is not None:
+            thumbnail_path = f"thumbnails/{user_id}/{pdf_id}_page_{page_number}.{thumbnail.extension}"
+            uploads.append((thumbnail_path, thumbnail.data, thumbnail.content_type))
+        with stage_timer("upload"):
+            uploaded = await storage_repository.upload_many(uploads)
+        img_url = uploaded[0]
+        thumbnail_url = uploaded[1] if thumbnail is not None else None
+
+        # Compléter l'enregistrement image (écrit avec le résultat de l'analyse)
+        await writer.update(page_number, {
+            "filename": image_filename,
+            "file_path": img_url,
+            "thumbnail_path": thumbnail_url,
+            "content_hash": page_hash
+        })
+
+        # Lancer l'analyse pour cette image
+        succeeded = await process_full_analysis(
+            user_id=user_id,
+            image_id=image_id,
+            image_url=img_url,
+            original_pdf_url=pdf_url,
+            image_data=encoded_page.data,
+            pdf_id=pdf_id,
+            page_number=page_number,
+            summary=summary,
+            writer=writer
+        )
+    except Exception as e:
+        logger.error(f"Erreur page {page_number} du PDF {pdf_id}: {str(e)}",
+                     extra={"pdf_id": pdf_id, "page_number": page_number})
+        await writer.update(page_number, {
+            "processing_status": "failed",
+            "extraction_result": json.dumps({"error": str(e)})
+        })
+    finally:
+        semaphore.release()
+        writer.page_done(succeeded)
+
+
+async def reuse_cached_page(user_id: str, pdf_id: str, page_number: int, image_id: str, image_filename: str,
+                            page_hash: str, cached_page: dict, writer: PageWriteBatcher,
+                            summary: SummaryCollector = None) -> bool:
+    """Complète l'enregistrement de la page à partir d'un résultat identique déjà calculé."""
+    cache_stats.record("page_hits")
+    if summary is not None:
+        await summary.add(page_number, image_id, zones_from_row(cached_page["zones_result"]))
+    await writer.update(page_number, {
+        "filename": image_filename,
+        "file_path": cached_page["file_path"],
+        "thumbnail_path": cached_page.get("thumbnail_path"),
+        "processing_status": "completed",
+        "zones_result": cached_page["zones_result"],
+        "parcels_data": cached_page.get("parcels_data"),
+        "result_summary_pdf": cached_page["result_summary_pdf"],
+        "content_hash": page_hash
+    })
+    logger.info(f"Page {page_number} du PDF {pdf_id} déjà traitée, résultat réutilisé",
+                extra={"pdf_id": pdf_id, "page_number": page_number, "image_id": image_id})
+    await event_bus.publish(user_id, "page_completed", {
+        "pdf_id": pdf_id,
+        "image_id": image_id,
+        "result_pdf": cached_page["result_summary_pdf"],
+        "cached": True
+    })
+    return True
+
+
+async def reuse_previous_pdf(user_id: str, pdf_id: str, previous_job: dict) -> int:
+    """
+    PDF identique déjà traité : copie les enregistrements de ses pages sous le
+    nouveau pdf_id, sans rasterisation, inférence ni upload. Retourne le nombre de pages.
+    """
+    pages = await images_repository.list_for_pdf(
+        previous_job["id"],
+        user_id=user_id,
+        columns="file_path, thumbnail_path, zones_result, parcels_data, result_summary_pdf, page_number, content_hash"
+    )
+    now = datetime.utcnow().isoformat()
+    await images_repository.insert_many([
+        {
+            "id": str(uuid.uuid4()),
+            "filename": f"{pdf_id}_page_{page['page_number']}{os.path.splitext(page['file_path'])[1] or '.png'}",
+            "upload_date": now,
+            "user_id": user_id,
+            "file_path": page["file_path"],
+            "thumbnail_path": page.get("thumbnail_path"),
+            "processing_status": "completed",
+            "zones_result": page["zones_result"],
+            "parcels_data": page.get("parcels_data"),
+            "result_summary_pdf": page["result_summary_pdf"],
+            "pdf_id": pdf_id,
+            "page_number": page["page_number"],
+            "content_hash": page["content_hash"]
+        }
+        for page in pages
+    ])
+    return len(pages)
 
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 BUCKET_NAME = "files"
 
-@router.post("/upload-pdf")
-async def upload_pdf(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
-    current_user: dict = Depends(get_current_user)
-):
-    """Upload PDF et démarrage du traitement en arrière-plan"""
-    if file.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail="Le fichier doit être un PDF")
+# Délai conseillé au client quand la file est pleine (secondes)
+UPLOAD_RETRY_AFTER = int(os.getenv("UPLOAD_RETRY_AFTER", 30))
 
-    user_id = current_user["user_id"]
-    pdf_id = str(uuid.uuid4())
 
-    try:
-        # Upload du PDF immédiat
-        content = await file.read()
-        pdf_path = f"pdfs/{user_id}/{pdf_id}.pdf"
-        supabase.storage.from_(BUCKET_NAME).upload(pdf_path, content)
-        pdf_url = supabase.storage.from_(BUCKET_NAME).get_public_url(pdf_path)
+def _remove_file(path: str):
+    if os.path.exists(path):
+        os.remove(path)
 
-        # Lancer directement le traitement en arrière-plan
-        background_tasks.add_task(
-            process_pdf_upload,
-            user_id=user_id,
-            pdf_id=pdf_id,
-            file_content=content,
-            pdf_url=pdf_url
+
+async def check_admission():
+    """Contrôle d'admission : refuser avant de lire le fichier si la file est trop longue."""
+    depth = await asyncio.to_thread(job_queue.depth)
+    if depth >= JOB_QUEUE_MAX_DEPTH:
+        raise HTTPException(
+            status_code=429,
+            detail="Trop de traitements en attente, réessayez plus tard",
+            headers={"Retry-After": str(UPLOAD_RETRY_AFTER)}
         )
 
+
+async def accept_spooled_pdf(user_id: str, pdf_id: str, spooled: SpooledPdf) -> JSONResponse:
+    """
+    Prend en charge un PDF déjà validé et écrit dans le spool : réutilise un
+    traitement identique, sinon l'envoie au stockage et met le traitement en file.
+    """
+    try:
+        # PDF identique déjà traité : réutiliser le fichier stocké et les résultats
+        previous_job = await pdf_jobs_repository.find_completed_by_hash(user_id, spooled.content_hash)
+        if previous_job:
+            await asyncio.to_thread(_remove_file, spooled.path)
+            cache_stats.record("pdf_hits")
+            cache_stats.record("bytes_saved", spooled.size)
+            total_pages = await reuse_previous_pdf(user_id, pdf_id, previous_job)
+            now = datetime.utcnow().isoformat()
+            await pdf_jobs_repository.create({
+                "id": pdf_id,
+                "user_id": user_id,
+                "pdf_url": previous_job["pdf_url"],
+                "summary_pdf": previous_job.get("summary_pdf"),
+                "content_hash": spooled.content_hash,
+                "status": "completed",
+                "total_pages": total_pages,
+                "completed_pages": total_pages,
+                "started_at": now,
+                "finished_at": now
+            })
+            return JSONResponse(
+                content={
+                    "message": "PDF déjà traité, résultats réutilisés",
+                    "pdf_id": pdf_id,
+                    "status": "completed",
+                    "total_pages": total_pages,
+                    "note": "Utilisez GET /images/pdf-status/{pdf_id}?pages=true pour le détail"
+                },
+                status_code=200
+            )
+        cache_stats.record("pdf_misses")
+
+        # Upload du PDF depuis le spool, par blocs
+        pdf_path = f"pdfs/{user_id}/{pdf_id}.pdf"
+        pdf_url = await storage_repository.upload_file(pdf_path, spooled.path, "application/pdf")
+        await pdf_jobs_repository.create({
+            "id": pdf_id,
+            "user_id": user_id,
+            "pdf_url": pdf_url,
+            "content_hash": spooled.content_hash,
+            "status": "queued",
+            "total_pages": spooled.total_pages
+        })
+
+        # Mettre le traitement en file ; le PDF attend dans le spool local
+        await asyncio.to_thread(job_queue.enqueue, "process_pdf", {
+            "user_id": user_id,
+            "pdf_id": pdf_id,
+            "pdf_url": pdf_url,
+            "storage_path": pdf_path,
+            "spool_path": spooled.path
+        }, pdf_id)
+
         # Réponse immédiate
         return JSONResponse(
             content={
                 "message": "PDF reçu, traitement démarré",
                 "pdf_id": pdf_id,
                 "status": "uploading",
+                "total_pages": spooled.total_pages,
                 "images": [{
                     "image_id": pdf_id,
                     "status": "uploading",
@@ -111,109 +386,310 @@ async def upload_pdf(
             status_code=202  # 202 Accepted - indique que le traitement est en cours
         )
 
-
-
     except Exception as e:
+        await asyncio.to_thread(_remove_file, spooled.path)
         raise HTTPException(status_code=500, detail=f"Erreur upload: {str(e)}")
 
 
+# Corps lu par spool_upload et non par FastAPI : schéma du champ file décrit à la main
+UPLOAD_PDF_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": ["file"],
+            "properties": {"file": {"type": "string", "format": "binary"}}
+        }}}
+    }
+}
+
+
+@router.post("/upload-pdf", openapi_extra=UPLOAD_PDF_OPENAPI)
+async def upload_pdf(
+    request: Request,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Upload PDF (champ multipart file) et mise en file du traitement (voir app/worker.py).
+    Taille annoncée et file d'attente sont vérifiées avant de lire le corps, qui est
+    ensuite copié dans le spool au fil de sa réception (voir utils/upload_ingest).
+    """
+    check_request_size(request)
+    await check_admission()
+
+    user_id = current_user["user_id"]
+    pdf_id = str(uuid.uuid4())
+
+    spooled = await spool_upload(request, os.path.join(JOB_SPOOL_DIR, f"{pdf_id}.pdf"))
+    return await accept_spooled_pdf(user_id, pdf_id, spooled)
+
+
 # --- FONCTION DE TRAITEMENT COMPLET ---
-async def process_full_analysis(user_id: str, image_id: str, image_url: str, original_pdf_url: str, image_data: bytes = None):
-    print(f" Démarrage traitement complet pour image {image_id}")
+async def process_full_analysis(user_id: str, image_id: str, image_url: str, original_pdf_url: str, image_data: bytes = None,
+                                pdf_id: str = None, page_number: int = None, summary: SummaryCollector = None,
+                                writer: PageWriteBatcher = None, previous: dict = None) -> bool:
+    """
+    Analyse complète d'une image ; retourne True si le traitement a réussi.
+    Avec summary, la page est ajoutée au résumé combiné du PDF au lieu d'avoir son propre résumé.
+    Avec writer, le résultat est écrit par lot avec les autres pages du PDF.
+    Avec previous (ligne images d'une tentative précédente), les étapes déjà
+    terminées (voir utils/page_pipeline) sont reprises telles quelles.
+    """
+    async def save(data: dict):
+        if writer is not None:
+            await writer.update(page_number, data)
+        else:
+            await images_repository.update(image_id, data)
+
+    async def checkpoint(data: dict):
+        """
+        Sortie d'une étape et pipeline_state écrits ensemble, sans attendre le lot
+        suivant du writer : un arrêt du worker ne perd pas l'inférence déjà faite.
+        """
+        await save(data)
+        if writer is not None:
+            try:
+                await writer.flush()
+            except Exception as e:
+                # Le lot reste en attente et sera réécrit par le writer
+                logger.warning(f"Point de reprise de l'image {image_id} reporté : {e}", extra=log)
+
+    notify_page = writer is None or NOTIFICATION_MODE == "per_page"
+
+    previous = previous or {}
+    state = load_state(previous.get("pipeline_state"))
+    parcelles_result = ParcelSet.from_base64(previous["parcels_data"]) if is_done(state, "extract") else None
+    zones_result = zones_from_row(previous["zones_result"]) if is_done(state, "zones") else None
+    pdf_public_url = previous.get("result_summary_pdf")
+    stage = next_stage(state)
+    log = {"image_id": image_id, "pdf_id": pdf_id, "page_number": page_number}
+
+    logger.debug(f"Démarrage traitement complet pour image {image_id} (étape {stage})", extra=log)
     
     try:
-        # Télécharger l'image depuis Supabase seulement si pas déjà en mémoire
-        if not image_data:
+        # Télécharger l'image seulement si une étape restante en a besoin et qu'elle n'est pas en mémoire
+        needs_image = not is_done(state, "extract") or not is_done(state, "summary")
+        if needs_image and not image_data:
             storage_path = image_url.split(f'/{BUCKET_NAME}/')[-1]
-            image_data = supabase.storage.from_(BUCKET_NAME).download(storage_path)
+            with stage_timer("download"):
+                image_data = await storage_repository.download(storage_path)
             if not image_data:
                 raise Exception("Impossible de télécharger l'image")
-            print(f" Image téléchargée : {len(image_data)} bytes")
-
-        # Exécution parallèle des modèles
-        print(" Lancement des modèles en parallèle...")
-        loop = asyncio.get_event_loop()
-        
-        # Exécuter l'extraction des parcelles
-        parcelles_result = await loop.run_in_executor(None, extract_parcelles_coordinates, image_data)
-        print(f" Résultat Modèle 1 : {parcelles_result}")
-        
-        # Déterminer les zones directement avec le résultat des parcelles
-        zones_result = await loop.run_in_executor(None, determine_zone_layers, parcelles_result)
-        print(f" Résultat Modèle 2 : {zones_result}")
-
-        # Génération PDF de résumé en mémoire
-        print(" Génération PDF de résumé...")
-        pdf_bytes = generate_pdf_summary(
-            text_data=zones_result,
-            image_data=image_data,
-            image_id=image_id
-        )
-
-        # Upload PDF dans Supabase
-        pdf_filename = f"summary_{image_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf_storage_path = f"results/{user_id}/{image_id}/{pdf_filename}"
-        supabase.storage.from_(BUCKET_NAME).upload(pdf_storage_path, pdf_bytes)
-        pdf_public_url = supabase.storage.from_(BUCKET_NAME).get_public_url(pdf_storage_path)
-        print(f" PDF généré et uploadé : {pdf_public_url}")
+            logger.debug(f"Image téléchargée : {len(image_data)} bytes", extra=log)
+
+        if not is_done(state, "extract"):
+            # Extraction des parcelles puis détermination des zones, regroupées par lots
+            with stage_timer("inference"):
+                parcelles_result, zones_result = await inference_batcher.submit(image_data)
+            logger.debug(
+                f"Résultat Modèle 1 : {len(parcelles_result)} parcelle(s), {len(parcelles_result.coords)} sommets ; "
+                f"Modèle 2 : {zones_result}",
+                extra=log
+            )
+            # Un seul passage produit parcelles et zones : les deux étapes sont
+            # marquées dans la même écriture que leurs sorties
+            state = mark_done(state, "extract", "zones")
+            await checkpoint({
+                # Sommets et mesures des parcelles en binaire compact (décodé à la demande par l'API)
+                "parcels_data": parcelles_result.to_base64(),
+                "zones_result": json.dumps({**zones_result, "original_pdf_url": original_pdf_url}),
+                "pipeline_state": state,
+            })
+        elif not is_done(state, "zones"):
+            # Parcelles déjà extraites : seules les zones sont recalculées
+            with stage_timer("zones"):
+                zones_result = await asyncio.to_thread(inference_engine.infer_zones, parcelles_result)
+            state = mark_done(state, "zones")
+            await checkpoint({
+                "zones_result": json.dumps({**zones_result, "original_pdf_url": original_pdf_url}),
+                "pipeline_state": state,
+            })
+
+        stage = "summary"
+        if not is_done(state, "summary"):
+            if summary is not None:
+                # Résumé combiné généré à la fin du PDF : l'étape reste ouverte
+                # jusqu'à son enregistrement (voir publish_combined_summary)
+                await summary.add(
+                    page_number, image_id, zones_result, image_data,
+                    parcels_count=len(parcelles_result),
+                    parcels_area=float(parcelles_result.metrics["area"].sum())
+                )
+            else:
+                # Génération PDF de résumé en mémoire
+                with stage_timer("summary_render"):
+                    pdf_bytes = await run_cpu(
+                        render_page_summary,
+                        zones=zones_result,
+                        image_data=image_data,
+                        image_id=image_id
+                    )
+
+                # Upload PDF dans Supabase (chemin fixe : une reprise écrase le même fichier)
+                pdf_storage_path = f"results/{user_id}/{image_id}/summary_{image_id}.pdf"
+                with stage_timer("summary_upload"):
+                    pdf_public_url = await storage_repository.upload(pdf_storage_path, pdf_bytes, "application/pdf")
+                state = mark_done(state, "summary")
 
         # Mise à jour en base
+        stage = None
         update_data = {
             "processing_status": "completed",
-            "zones_result": json.dumps({
-                **zones_result,
-                "original_pdf_url": original_pdf_url
-            }),
-            "result_summary_pdf": pdf_public_url
+            "pipeline_state": state,
         }
-        result = supabase.table("images").update(update_data).eq("id", image_id).execute()
-        if not result.data:
-            raise Exception("Échec mise à jour en base")
-
-        print(f" Traitement TERMINÉ pour image {image_id}")
+        if pdf_public_url:
+            update_data["result_summary_pdf"] = pdf_public_url
+        if previous:
+            update_data["extraction_result"] = None
+        await save(update_data)
+
+        logger.info(f"Traitement terminé pour image {image_id}", extra=log)
+        await event_bus.publish(user_id, "page_completed", {
+            "pdf_id": pdf_id,
+            "image_id": image_id,
+            "result_pdf": pdf_public_url
+        })
         
-        # Créer une notification de succès
-        create_notification(
-            user_id=user_id,
-            title="Traitement terminé",
-            message="Le traitement de votre levé topographique est terminé avec succès.",
-            type="success",
-            result_id=image_id,
-            pdf_url=pdf_public_url
-        )
+        # Créer une notification de succès (sinon une seule notification pour tout le PDF)
+        if notify_page:
+            await create_notification(
+                user_id=user_id,
+                title="Traitement terminé",
+                message="Le traitement de votre levé topographique est terminé avec succès.",
+                type="success",
+                result_id=image_id,
+                pdf_url=pdf_public_url
+            )
+        return True
 
     except Exception as e:
-        print(f" ERREUR traitement image {image_id}: {str(e)}")
-        # Marquer l'image comme échouée
-        supabase.table("images").update({
+        logger.error(f"Erreur traitement image {image_id} (étape {stage}): {str(e)}", extra={**log, "stage": stage})
+        # Marquer l'image comme échouée ; les étapes terminées restent acquises
+        await save({
             "processing_status": "failed",
             "extraction_result": json.dumps({"error": str(e)}),  # ← extraction_result
-        }).eq("id", image_id).execute()
+            "pipeline_state": mark_failed(state, stage, str(e)),
+        })
+        await event_bus.publish(user_id, "page_failed", {
+            "pdf_id": pdf_id,
+            "image_id": image_id,
+            "stage": stage,
+            "error": str(e)
+        })
         
         # Créer une notification d'erreur
-        create_notification(
-            user_id=user_id,
-            title="Erreur de traitement",
-            message=f"Une erreur est survenue lors du traitement de votre levé : {str(e)}",
-            type="error",
-            result_id=image_id
-        )
+        if notify_page:
+            await create_notification(
+                user_id=user_id,
+                title="Erreur de traitement",
+                message=f"Une erreur est survenue lors du traitement de votre levé : {str(e)}",
+                type="error",
+                result_id=image_id
+            )
+        return False
+
+
+RETRY_COLUMNS = "id, user_id, pdf_id, page_number, file_path, processing_status, pipeline_state, " \
+                "parcels_data, zones_result, result_summary_pdf"
+
+
+async def resume_page_analysis(user_id: str, image_id: str) -> bool:
+    """
+    Reprend l'analyse d'une page à partir de sa première étape non terminée
+    (tâche "retry_page" du worker). Une page redevenue complète est comptée
+    comme réussie dans l'avancement de son PDF.
+    """
+    image = await images_repository.get(image_id, user_id=user_id, columns=RETRY_COLUMNS)
+    if not image:
+        raise Exception(f"Image {image_id} introuvable")
+    if image["processing_status"] == "completed":
+        return True
+
+    original_pdf_url = None
+    if isinstance(image.get("zones_result"), str):
+        original_pdf_url = json.loads(image["zones_result"]).get("original_pdf_url")
+    if original_pdf_url is None and image.get("pdf_id"):
+        job = await pdf_jobs_repository.get(image["pdf_id"], user_id=user_id, columns="pdf_url")
+        original_pdf_url = job["pdf_url"] if job else None
+
+    succeeded = await process_full_analysis(
+        user_id=user_id,
+        image_id=image_id,
+        image_url=image["file_path"],
+        original_pdf_url=original_pdf_url,
+        pdf_id=image.get("pdf_id"),
+        page_number=image.get("page_number"),
+        previous=image
+    )
+    if succeeded and image.get("pdf_id"):
+        # La page avait été comptée en échec par le traitement du PDF
+        job = await pdf_jobs_repository.pages_done(image["pdf_id"], 1, -1)
+        if job:
+            await event_bus.publish(user_id, "pdf_progress", {
+                "pdf_id": image["pdf_id"],
+                "status": job["status"],
+                "total_pages": job["total_pages"],
+                "processed_pages": job["completed_pages"],
+                "failed_pages": job["failed_pages"]
+            })
+    return succeeded
+
+
+@router.post("/{image_id}/retry")
+async def retry_image(image_id: str, current_user: dict = Depends(get_current_user)):
+    """
+    Relance l'analyse d'une page en échec. Seules les étapes non terminées sont
+    refaites (une erreur de stockage sur le résumé ne relance pas les modèles).
+    """
+    user_id = current_user["user_id"]
+    image = await images_repository.get(image_id, user_id=user_id, columns=RETRY_COLUMNS)
+    if not image:
+        raise HTTPException(status_code=404, detail="Image non trouvée")
+    if image["processing_status"] != "failed":
+        raise HTTPException(status_code=409, detail=f"Image non en échec (statut {image['processing_status']})")
+    if not image.get("file_path"):
+        raise HTTPException(status_code=409, detail="Image jamais stockée : relancez l'upload du PDF")
+    if image.get("pdf_id"):
+        job = await pdf_jobs_repository.get(image["pdf_id"], user_id=user_id, columns="status")
+        if job and job["status"] in ("queued", "processing"):
+            raise HTTPException(status_code=409, detail="Le PDF de cette page est encore en cours de traitement")
+
+    await check_admission()
+    # Passage failed -> processing conditionnel : deux relances simultanées ne lancent qu'une tâche
+    if not await images_repository.claim_for_retry(image_id, user_id):
+        raise HTTPException(status_code=409, detail="Relance déjà en cours")
+    await asyncio.to_thread(job_queue.enqueue, "retry_page", {"user_id": user_id, "image_id": image_id})
+
+    state = load_state(image.get("pipeline_state"))
+    return JSONResponse(
+        content={
+            "message": "Relance de l'analyse mise en file",
+            "image_id": image_id,
+            "status": "processing",
+            "resume_from": next_stage(state),
+            "completed_stages": state["completed"],
+            "note": "Utilisez GET /images/processing-status/{image_id} pour suivre le progrès"
+        },
+        status_code=202
+    )
 
 
 # --- Endpoint statut ---
 @router.get("/pdf-status/{pdf_id}")
 async def get_pdf_status(
     pdf_id: str,
+    pages: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Obtenir le statut de traitement des images extraites d'un PDF"""
+    """
+    Obtenir le statut de traitement d'un PDF.
+    pages=true ajoute le détail page par page.
+    """
     user_id = current_user["user_id"]
     try:
-        result = supabase.table("images").select(
-            "id, processing_status, extraction_result, filename"
-        ).eq("user_id", user_id).execute()
+        job = await pdf_jobs_repository.get(pdf_id, user_id=user_id)
         
-        if not result.data:
+        if not job:
             return {
                 "pdf_id": pdf_id,
                 "status": "not_found",
@@ -222,24 +698,29 @@ async def get_pdf_status(
                 "images": []
             }
 
-        all_records = result.data
-
-        
-        # Trouver le PDF principal (par filename ou autre logique)
-        pdf_record = next((item for item in all_records if pdf_id in item.get("filename", "")), None)
-        
-        # Ou plus simple : chercher par processing_status
-        images = [item for item in all_records if item.get("processing_status") in ["completed", "processing", "failed"]]
-        
-        completed_images = [img for img in images if img["processing_status"] == "completed"]
-        
-        return {
+        response = {
             "pdf_id": pdf_id,
-            "status": "completed" if completed_images else "processing",
-            "total_pages": len(images),
-            "processed_pages": len(completed_images),
-            "images": [{"id": img["id"], "status": img["processing_status"]} for img in images]
+            "status": job["status"],
+            "total_pages": job["total_pages"],
+            "processed_pages": job["completed_pages"],
+            "failed_pages": job["failed_pages"],
+            "error": job.get("error"),
+            "summary_pdf": job.get("summary_pdf"),
+            "created_at": job.get("created_at"),
+            "started_at": job.get("started_at"),
+            "finished_at": job.get("finished_at")
         }
+
+        if pages:
+            images = await images_repository.list_for_pdf(
+                pdf_id, user_id=user_id, columns="id, page_number, processing_status"
+            )
+            response["images"] = [
+                {"id": img["id"], "page": img["page_number"], "status": img["processing_status"]}
+                for img in images
+            ]
+
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur vérification statut: {str(e)}")
 
@@ -250,17 +731,17 @@ async def get_processing_status(
 ):
     user_id = current_user["user_id"]
     try:
-    
-        result = supabase.table("images").select(
-            "id, processing_status, extraction_result, result_summary_pdf"  # ← extraction_result
+        image = await images_repository.get(
+            image_id,
+            user_id=user_id,
+            columns="id, processing_status, extraction_result, result_summary_pdf, pipeline_state"  # ← extraction_result
         )
         # Vérifier si on trouve quelque chose
-        if not result.data or len(result.data) == 0:
+        if not image:
             raise HTTPException(status_code=404, detail="Image non trouvée")
         
-        image = result.data[0]  # Prendre le premier résultat
         status = image.get("processing_status", "unknown")
-        zones = json.loads(image["zones_result"]) if image["zones_result"] else {}
+        zones = json.loads(image["extraction_result"]) if image.get("extraction_result") else {}
         
         response = {
             "image_id": image_id,
@@ -269,6 +750,7 @@ async def get_processing_status(
             "is_processing": status == "processing",
             "is_failed": status == "failed",
             "error": zones.get("error"),
+            "failed_stage": load_state(image.get("pipeline_state"))["failed_stage"] if status == "failed" else None,
             "result_pdf": image.get("result_summary_pdf")  # AJOUT du lien PDF
         }
 
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from ..utils.component_metrics import register_component_metrics
+from ..utils.metrics import METRICS_CONTENT_TYPE, METRICS_TOKEN, registry
+from typing import Optional
+import asyncio
+
+router = APIRouter(tags=["metrics"])
+
+register_component_metrics()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Métriques au format texte Prometheus"""
+    if METRICS_TOKEN and authorization != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Jeton invalide")
+    # Rendu hors de la boucle : la profondeur de la file est lue dans SQLite
+    return PlainTextResponse(await asyncio.to_thread(registry.render), media_type=METRICS_CONTENT_TYPE)
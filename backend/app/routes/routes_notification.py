@@ -1,29 +1,138 @@
-from fastapi import APIRouter, Depends, HTTPException
-from ..config.supabase_connection import supabase
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from ..repositories.notifications_repository import notifications_repository
 from ..utils.user import get_current_user
+from ..utils.events import event_bus
+from ..utils.cache_invalidation import invalidate_cache
+from ..utils.notification_cache import unread_count_cache
+from ..utils.pagination import decode_cursor, encode_cursor
 from datetime import datetime
+from typing import List, Optional
+import logging
+import os
 
 router = APIRouter(prefix="/notifications", tags=["notifications"])
 
+# "per_pdf" : une notification par PDF traité ; "per_page" : une par page
+NOTIFICATION_MODE = os.getenv("NOTIFICATION_MODE", "per_pdf")
+DEFAULT_NOTIFICATIONS_LIMIT = 20
+MAX_NOTIFICATIONS_LIMIT = 100
+# Nombre maximal d'identifiants par requête groupée
+MAX_BULK_IDS = 500
+
+
+class BulkNotificationRequest(BaseModel):
+    """Notifications visées : liste d'ids, ou toutes jusqu'au curseur (inclus), ou toutes."""
+    ids: Optional[List[str]] = None
+    up_to: Optional[str] = None
+    all: bool = False
+
+
+def _bulk_target(request: BulkNotificationRequest):
+    if request.ids is not None:
+        if len(request.ids) > MAX_BULK_IDS:
+            raise HTTPException(status_code=400, detail=f"Au plus {MAX_BULK_IDS} identifiants")
+        return {"ids": request.ids}
+    if request.up_to:
+        return {"up_to": decode_cursor(request.up_to)}
+    if request.all:
+        return {}
+    raise HTTPException(status_code=400, detail="Indiquer ids, up_to ou all")
+
+
 @router.get("/")
-async def get_notifications(current_user: dict = Depends(get_current_user)):
-    """Récupère toutes les notifications de l'utilisateur"""
+async def get_notifications(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_NOTIFICATIONS_LIMIT),
+    cursor: Optional[str] = None,
+    unread_only: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Récupère les notifications de l'utilisateur, de la plus récente à la plus ancienne.
+    - sans limit ni cursor : liste complète, comme avant la pagination (clients existants)
+    - limit / cursor : {notifications, next_cursor, head_cursor}, pagination par clé ;
+      next_cursor vaut null sur la dernière page
+    - head_cursor : curseur de la première notification de la page, à passer à
+      POST /notifications/read {"up_to": ...} pour tout marquer comme lu jusque-là
+    """
     user_id = current_user["user_id"]
+    after = decode_cursor(cursor) if cursor else None
+    paginated = limit is not None or cursor is not None
+    limit = limit or DEFAULT_NOTIFICATIONS_LIMIT
     
     try:
-        result = supabase.table("notifications")\
-            .select("*")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .execute()
-            
-        return result.data
+        if not paginated:
+            return await notifications_repository.list_for_user(user_id, unread_only=unread_only)
+        notifications = await notifications_repository.list_page_for_user(
+            user_id, limit=limit, after=after, unread_only=unread_only
+        )
+        head_cursor = next_cursor = None
+        if notifications:
+            head_cursor = encode_cursor(notifications[0]["created_at"], notifications[0]["id"])
+        if len(notifications) == limit:
+            next_cursor = encode_cursor(notifications[-1]["created_at"], notifications[-1]["id"])
+        return {"notifications": notifications, "next_cursor": next_cursor, "head_cursor": head_cursor}
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors de la récupération des notifications: {str(e)}"
         )
 
+@router.get("/unread_count")
+async def get_unread_count(current_user: dict = Depends(get_current_user)):
+    """Nombre de notifications non lues (gardé en cache, invalidé à chaque changement)"""
+    user_id = current_user["user_id"]
+
+    count = unread_count_cache.get(user_id)
+    if count is None:
+        try:
+            count = await notifications_repository.count_unread(user_id)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Erreur lors du comptage des notifications: {str(e)}"
+            )
+        unread_count_cache.set(user_id, count)
+    return {"unread_count": count}
+
+@router.post("/read")
+async def mark_notifications_as_read(
+    request: BulkNotificationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Marque plusieurs notifications comme lues en une requête"""
+    user_id = current_user["user_id"]
+    target = _bulk_target(request)
+
+    try:
+        updated = await notifications_repository.mark_read_many(user_id, **target)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la mise à jour des notifications: {str(e)}"
+        )
+    await invalidate_cache("unread_count", user_id)
+    return {"updated": updated}
+
+@router.post("/delete")
+async def delete_notifications(
+    request: BulkNotificationRequest,
+    current_user: dict = Depends(get_current_user)
+):
+    """Supprime plusieurs notifications en une requête"""
+    user_id = current_user["user_id"]
+    target = _bulk_target(request)
+
+    try:
+        deleted = await notifications_repository.delete_many(user_id, **target)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la suppression des notifications: {str(e)}"
+        )
+    await invalidate_cache("unread_count", user_id)
+    return {"deleted": deleted}
+
 @router.post("/{notification_id}/read")
 async def mark_notification_as_read(
     notification_id: str,
@@ -33,16 +142,15 @@ async def mark_notification_as_read(
     user_id = current_user["user_id"]
     
     try:
-        result = supabase.table("notifications")\
-            .update({"read": True})\
-            .eq("id", notification_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        updated = await notifications_repository.mark_read(notification_id, user_id)
             
-        if not result.data:
+        if not updated:
             raise HTTPException(status_code=404, detail="Notification non trouvée")
             
+        await invalidate_cache("unread_count", user_id)
         return {"message": "Notification marquée comme lue"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -58,31 +166,25 @@ async def delete_notification(
     user_id = current_user["user_id"]
     
     try:
-        result = supabase.table("notifications")\
-            .delete()\
-            .eq("id", notification_id)\
-            .eq("user_id", user_id)\
-            .execute()
+        deleted = await notifications_repository.delete(notification_id, user_id)
             
-        if not result.data:
+        if not deleted:
             raise HTTPException(status_code=404, detail="Notification non trouvée")
             
+        await invalidate_cache("unread_count", user_id)
         return {"message": "Notification supprimée"}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Erreur lors de la suppression de la notification: {str(e)}"
         )
 
-def create_notification(user_id: str, title: str, message: str, type: str, result_id: str, pdf_url: str = None):
+async def create_notification(user_id: str, title: str, message: str, type: str, result_id: str, pdf_url: str = None):
+    # Pas de vérification préalable de l'utilisateur : la clé étrangère de
+    # notifications.user_id rejette l'insertion s'il n'existe pas (erreur journalisée ci-dessous)
     try:
-        # Vérification de l'existence de l'utilisateur
-        user_check = supabase.table("users").select("id").eq("id", user_id).execute()
-        if not user_check.data or len(user_check.data) == 0:
-            print(f"⚠️ Utilisateur {user_id} non trouvé dans la table users, notification ignorée")
-            return
-        print("\n\n\nL'id de l'utilisateur: ", user_id, " \n\n\n")
-        # Votre code existant pour créer la notification...
         notification_data = {
             "user_id": user_id,
             "title": title,
@@ -93,8 +195,10 @@ def create_notification(user_id: str, title: str, message: str, type: str, resul
             "created_at": datetime.utcnow().isoformat(),
             "read": False
         }
-        supabase.table("notifications").insert(notification_data).execute()
+        created = await notifications_repository.insert(notification_data)
+        await invalidate_cache("unread_count", user_id)
+        await event_bus.publish(user_id, "notification", created or notification_data)
         
     except Exception as e:
         # Erreur non critique, on continue
-        print(f"⚠️ Erreur notification (non critique): {e}")
\ No newline at end of file
+        logging.warning(f"Erreur notification (non critique): {e}", extra={"user_id": user_id})
\ No newline at end of file
@@ -1,51 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi.responses import JSONResponse
-from ..config.supabase_connection import supabase
+from ..repositories.images_repository import images_repository
+from ..repositories.storage_repository import storage_repository
+from ..utils.geometry import ParcelSet
+from ..utils.pagination import decode_cursor, encode_cursor
 from ..utils.user import get_current_user
  
 import os
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter(prefix="/results", tags=["results"])
 
+# Champs de l'API -> colonnes de la table images
+RESULT_FIELDS = {
+    "image_id": "id",
+    "filename": "filename",
+    "status": "processing_status",
+    "file_url": "file_path",
+    "thumbnail_url": "thumbnail_path",
+    "created_at": "created_at",
+    "zones_result": "zones_result",
+    "summary_pdf": "result_summary_pdf",
+    "parcels": "parcels_data",
+}
+# "parcels" (sommets + surface, périmètre, centroïde, emprise) n'est décodé que sur demande
+DEFAULT_RESULT_FIELDS = [f for f in RESULT_FIELDS if f != "parcels"]
+DEFAULT_RESULTS_LIMIT = 50
+MAX_RESULTS_LIMIT = 200
+
+
+def decode_parcels(parcels_data: Optional[str]) -> Optional[list]:
+    return ParcelSet.from_base64(parcels_data).to_api() if parcels_data else None
+
+
 @router.get("/user/all")
-async def get_all_user_results(current_user: dict = Depends(get_current_user)):
+async def get_all_user_results(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_RESULTS_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
     """
-    Récupère tous les résultats de traitement pour l'utilisateur connecté.
-    Retourne une liste de tous les traitements avec leur statut et résultats.
+    Récupère les résultats de traitement de l'utilisateur connecté, du plus récent au plus ancien.
+    - sans limit ni cursor : {results} avec tous les résultats, comme avant la pagination
+    - limit / cursor : {results, next_cursor}, pagination par clé ; next_cursor vaut
+      null sur la dernière page
+    - fields : liste de champs séparés par des virgules (ex. "image_id,status,summary_pdf")
+      pour ne pas charger zones_result ; "parcels" ajoute les parcelles décodées
     """
     user_id = current_user["user_id"]
 
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in RESULT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Champs inconnus: {', '.join(unknown)}")
+    else:
+        requested = list(DEFAULT_RESULT_FIELDS)
+
+    # id et created_at sont toujours lus pour construire le curseur
+    columns = {"id", "created_at"} | {RESULT_FIELDS[f] for f in requested}
+    after = decode_cursor(cursor) if cursor else None
+    paginated = limit is not None or cursor is not None
+    limit = limit or DEFAULT_RESULTS_LIMIT
+
     try:
-        results = supabase.table("images")\
-            .select("id, filename, file_path, processing_status, zones_result, result_summary_pdf, created_at")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .execute()
-
-        if not results.data:
-            return JSONResponse(
-                status_code=200,
-                content={"results": []}
+        if paginated:
+            results = await images_repository.list_page_for_user(
+                user_id,
+                columns=", ".join(sorted(columns)),
+                limit=limit,
+                after=after
             )
+        else:
+            results = await images_repository.list_for_user(user_id, columns=", ".join(sorted(columns)))
 
         # Formater les résultats
         formatted_results = []
-        for result in results.data:
-            formatted_result = {
-                "image_id": result["id"],
-                "filename": result["filename"],
-                "status": result["processing_status"],
-                "file_url": result["file_path"],
-                "created_at": result["created_at"],
-                "zones_result": result["zones_result"],
-                "summary_pdf": result["result_summary_pdf"] and supabase.storage.from_("files").get_public_url(result["result_summary_pdf"])
-            }
+        for result in results:
+            formatted_result = {}
+            for field in requested:
+                value = result.get(RESULT_FIELDS[field])
+                if field == "summary_pdf":
+                    value = value and storage_repository.public_url(value)
+                elif field == "parcels":
+                    value = decode_parcels(value)
+                formatted_result[field] = value
             formatted_results.append(formatted_result)
 
+        if not paginated:
+            return JSONResponse(status_code=200, content={"results": formatted_results})
+
+        next_cursor = None
+        if len(results) == limit:
+            last = results[-1]
+            next_cursor = encode_cursor(last["created_at"], last["id"])
+
         return JSONResponse(
             status_code=200,
-            content={"results": formatted_results}
+            content={"results": formatted_results, "next_cursor": next_cursor}
         )
 
     except Exception as e:
@@ -55,35 +109,38 @@ async def get_all_user_results(current_user: dict = Depends(get_current_user)):
         )
 
 @router.get("/{image_id}")
-async def get_result_for_image(image_id: str, current_user: dict = Depends(get_current_user)):
+async def get_result_for_image(
+    image_id: str,
+    include_parcels: bool = False,
+    current_user: dict = Depends(get_current_user)
+):
     """
     Récupère le résultat final pour une image traitée :
     - Vérifie que l'image appartient à l'utilisateur
     - Retourne les résultats IA + lien vers le PDF résumé
+    - include_parcels : ajoute les parcelles (sommets et mesures) décodées
     """
     user_id = current_user["user_id"]
 
+    columns = "id, file_path, extraction_result, zones_result, result_summary_pdf, processing_status"
+    if include_parcels:
+        columns += ", parcels_data"
+
     # Vérifier que l'image existe et appartient à l'utilisateur
-    image_record = supabase.table("images")\
-        .select("id, file_path, extraction_result, zones_result, result_summary_pdf, processing_status")\
-        .eq("id", image_id)\
-        .eq("user_id", user_id)\
-        .single()\
-        .execute()
+    image_data = await images_repository.get(image_id, user_id=user_id, columns=columns)
     
-    if not image_record.data:
+    if not image_data:
         raise HTTPException(status_code=404, detail="Image non trouvée")
-    
-    image_data = image_record.data
-
-    return JSONResponse(
-        status_code=200,
-        content={
-            "image_id": image_id,
-            "status": image_data.get("processing_status"),
-            "file_url": image_data.get("file_path"),
-            "extraction_result": image_data.get("extraction_result"),
-            "zones_result": image_data.get("zones_result"),
-            "summary_pdf": supabase.storage.from_("files").get_public_url(image_data.get("result_summary_pdf"))
-        }
-    )
+
+    content = {
+        "image_id": image_id,
+        "status": image_data.get("processing_status"),
+        "file_url": image_data.get("file_path"),
+        "extraction_result": image_data.get("extraction_result"),
+        "zones_result": image_data.get("zones_result"),
+        "summary_pdf": storage_repository.public_url(image_data.get("result_summary_pdf"))
+    }
+    if include_parcels:
+        content["parcels"] = decode_parcels(image_data.get("parcels_data"))
+
+    return JSONResponse(status_code=200, content=content)
@@ -0,0 +1,150 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from ..utils.user import get_current_user
+from ..utils.job_queue import JOB_SPOOL_DIR
+from ..utils.resumable_uploads import OffsetMismatch, resumable_uploads
+from ..utils.upload_ingest import SpooledPdf, check_pdf_header, check_pdf_pages, check_upload_size
+from .routes_image import accept_spooled_pdf, check_admission
+from typing import Optional
+import asyncio
+import os
+
+# Uploads reprenables (inspirés du protocole TUS) pour les gros PDF sur connexion instable :
+#   POST   /images/uploads                    crée l'upload (en-tête Upload-Length)
+#   PATCH  /images/uploads/{id}               envoie un bloc à l'offset Upload-Offset
+#   HEAD   /images/uploads/{id}               offset déjà reçu (reprise après coupure)
+#   POST   /images/uploads/{id}/finalize      vérifie le PDF et lance le traitement
+#   DELETE /images/uploads/{id}               abandonne l'upload
+router = APIRouter(prefix="/images/uploads", tags=["images"])
+
+TUS_RESUMABLE = "1.0.0"
+UPLOAD_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _progress_headers(upload: dict, offset: int) -> dict:
+    return {
+        "Tus-Resumable": TUS_RESUMABLE,
+        "Upload-Offset": str(offset),
+        "Upload-Length": str(upload["length"]),
+        "Cache-Control": "no-store",
+    }
+
+
+def _get_upload(upload_id: str, user_id: str) -> dict:
+    upload = resumable_uploads.get(upload_id, user_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload non trouvé ou expiré")
+    return upload
+
+
+@router.post("")
+async def create_upload(
+    upload_length: int = Header(..., alias="Upload-Length", ge=1),
+    filename: Optional[str] = Header(None, alias="Upload-Filename"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Crée un upload reprenable de Upload-Length octets"""
+    check_upload_size(upload_length)
+    await check_admission()
+
+    upload = await asyncio.to_thread(
+        resumable_uploads.create, current_user["user_id"], upload_length, filename
+    )
+    return JSONResponse(
+        status_code=201,
+        content={"upload_id": upload["id"], "offset": 0, "length": upload_length,
+                 "expires_at": upload["expires_at"]},
+        headers={
+            "Location": f"{router.prefix}/{upload['id']}",
+            **_progress_headers(upload, 0)
+        }
+    )
+
+
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Offset déjà reçu : le client reprend l'envoi à partir de là"""
+    upload = _get_upload(upload_id, current_user["user_id"])
+    return Response(status_code=200, headers=_progress_headers(upload, upload["offset"]))
+
+
+@router.patch("/{upload_id}")
+async def upload_chunk(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset", ge=0),
+    content_type: Optional[str] = Header(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Ajoute le corps de la requête à l'upload, lu par blocs sans être gardé en mémoire"""
+    if content_type != UPLOAD_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type attendu : {UPLOAD_CONTENT_TYPE}")
+
+    upload = _get_upload(upload_id, current_user["user_id"])
+    lock = resumable_uploads.lock(upload_id)
+    if lock.locked():
+        raise HTTPException(status_code=409, detail="Un envoi est déjà en cours pour cet upload")
+
+    async with lock:
+        try:
+            offset = await resumable_uploads.append(upload, upload_offset, request.stream())
+        except OffsetMismatch as e:
+            raise HTTPException(
+                status_code=409,
+                detail="Offset incorrect",
+                headers=_progress_headers(upload, e.args[0])
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+
+    if upload_offset == 0 and offset >= 1024:
+        # Rejet précoce si le début du fichier n'est pas un PDF
+        try:
+            check_pdf_header(await asyncio.to_thread(resumable_uploads.read_head, upload_id))
+        except HTTPException:
+            await asyncio.to_thread(resumable_uploads.remove, upload_id)
+            raise
+
+    return Response(status_code=204, headers=_progress_headers(upload, offset))
+
+
+@router.post("/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Vérifie le PDF complet puis lance le même traitement que POST /images/upload-pdf"""
+    user_id = current_user["user_id"]
+    upload = _get_upload(upload_id, user_id)
+    if upload["offset"] != upload["length"]:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplet ({upload['offset']}/{upload['length']} octets)",
+            headers=_progress_headers(upload, upload["offset"])
+        )
+
+    async with resumable_uploads.lock(upload_id):
+        try:
+            check_pdf_header(await asyncio.to_thread(resumable_uploads.read_head, upload_id))
+            content_hash = await asyncio.to_thread(resumable_uploads.sha256, upload_id)
+            spool_path = os.path.join(JOB_SPOOL_DIR, f"{upload_id}.pdf")
+            await asyncio.to_thread(resumable_uploads.move_data, upload_id, spool_path)
+        except HTTPException:
+            await asyncio.to_thread(resumable_uploads.remove, upload_id)
+            raise
+        await asyncio.to_thread(resumable_uploads.remove, upload_id)
+
+    try:
+        total_pages = await check_pdf_pages(spool_path)
+    except HTTPException:
+        os.remove(spool_path)
+        raise
+
+    # L'identifiant de l'upload devient celui du PDF
+    spooled = SpooledPdf(spool_path, upload["length"], content_hash, total_pages)
+    return await accept_spooled_pdf(user_id, upload_id, spooled)
+
+
+@router.delete("/{upload_id}")
+async def abort_upload(upload_id: str, current_user: dict = Depends(get_current_user)):
+    """Abandonne l'upload et supprime les données reçues"""
+    _get_upload(upload_id, current_user["user_id"])
+    await asyncio.to_thread(resumable_uploads.remove, upload_id)
+    return Response(status_code=204, headers={"Tus-Resumable": TUS_RESUMABLE})
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 from app.models.user import User
-from app.config.supabase_connection import db
+from app.repositories.users_repository import users_repository
 from app.utils.user import get_current_user
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -9,17 +9,15 @@ router = APIRouter(prefix="/users", tags=["users"])
 # Get a user by user_id (self only)
 # -------------------------------
 @router.get("/me")
-def get_current_user_profile(current_user: dict = Depends(get_current_user)):
+async def get_current_user_profile(current_user: dict = Depends(get_current_user)):
     user_id = current_user["user_id"]
 
     try:
-        # Syntaxe Supabase au lieu de Firestore
-        result = db.table("users").select("*").eq("id", user_id).limit(1).execute()
+        user_data = await users_repository.get_by_id(user_id)
         
-        if not result.data or len(result.data) == 0:
+        if not user_data:
             raise HTTPException(status_code=404, detail="User not found")
 
-        user_data = result.data[0]
         
         # Supprimer les champs sensibles s'ils existent
         user_data.pop("id", None)
@@ -1,23 +1,29 @@
 # app/utils/ai_services.py
+import numpy as np
 
-def extract_parcelles_coordinates(image_path: str) -> dict:
+from .geometry import ParcelSet
+from .zone_layers import layer_index, parcel_geometry, flags_to_result
+
+def extract_parcelles_coordinates(image_path: str) -> ParcelSet:
     """
-    Simule l'extraction des coordonnées de la parcelle depuis l'image.
-    En vrai ici tu mettras ton modèle OCR/computer vision.
+    Simule l'extraction des coordonnées des parcelles depuis l'image.
+    En vrai ici tu mettras ton modèle OCR/computer vision ; les sommets sont
+    rendus en tableaux float64 contigus (une entrée par parcelle de la page).
     """
-    return {
-        "coordonnees": [
-            {"x": 123, "y": 456},
-            {"x": 789, "y": 101},
-        ]
-    }
+    return ParcelSet.from_rings([
+        [(123, 456), (789, 101)],
+    ])
 
 
-def determine_zone_layers(coords: dict) -> dict:
+def determine_zone_layers(coords: ParcelSet) -> dict:
     """
-    Simule la détermination de la zone (litige, zone protégée, etc.)
-    À remplacer par ton vrai modèle IA.
+    Détermine les zones (litige, zone protégée, etc.) par intersection avec
+    les couches cadastrales ; valeurs simulées si aucune couche n'est installée.
     """
+    return determine_zone_layers_batch([coords])[0]
+
+
+def _simulated_zone_layers() -> dict:
     return {
         "air": "NON",
         "air_proteges": "NON",
@@ -35,34 +41,18 @@ def determine_zone_layers(coords: dict) -> dict:
     }
 
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import inch
-from io import BytesIO
-
-# app/utils/ai_services.py
-
-def generate_pdf_summary(text_data: dict, image_data: bytes, image_id: str) -> bytes:
+def extract_parcelles_coordinates_batch(images: list) -> list:
     """
-    Génère un PDF résumé directement en mémoire.
+    Version par lot de extract_parcelles_coordinates (un résultat par image).
+    Un vrai modèle traitera ici toutes les images en un seul appel.
     """
-    from reportlab.lib.pagesizes import A4
-    from reportlab.pdfgen import canvas
-    from io import BytesIO
-
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=A4)
-
-    c.drawString(100, 800, "Résumé de l'analyse IA")
-    c.drawString(100, 780, f"Image ID: {image_id}")
+    return [extract_parcelles_coordinates(image) for image in images]
 
-    # Afficher les résultats OCR/extraction
-    y = 750
-    for key, value in text_data.items():
-        c.drawString(100, y, f"{key}: {value}")
-        y -= 20
 
-    c.save()
-    buffer.seek(0)
-    return buffer.read()
+def determine_zone_layers_batch(coords_list: list) -> list:
+    """Version par lot de determine_zone_layers : une seule requête sur l'index spatial."""
+    if not layer_index.available:
+        return [_simulated_zone_layers() for _ in coords_list]
+    parcels = np.array([parcel_geometry(coords) for coords in coords_list], dtype=object)
+    # Une page est concernée par une couche si l'une de ses parcelles l'intersecte
+    return [flags_to_result(row) for row in layer_index.flags(parcels)]
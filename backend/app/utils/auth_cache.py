@@ -0,0 +1,47 @@
+# app/utils/auth_cache.py
+import os
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+
+# Durée de vie (secondes) et taille maximale du cache des utilisateurs authentifiés
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", 60))
+AUTH_CACHE_MAXSIZE = int(os.getenv("AUTH_CACHE_MAXSIZE", 10000))
+
+# Si activé, les informations minimales de l'utilisateur sont incluses dans le
+# token JWT et get_current_user n'interroge plus la base
+JWT_EMBED_CLAIMS = os.getenv("JWT_EMBED_CLAIMS", "false").lower() in ("1", "true", "yes")
+EMBEDDED_CLAIM_FIELDS = ("npi", "first_name", "last_name", "email")
+
+
+class PrincipalCache:
+    """Cache TTL + LRU des utilisateurs authentifiés, indexé par user_id."""
+
+    def __init__(self, maxsize: int = AUTH_CACHE_MAXSIZE, ttl: int = AUTH_CACHE_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[dict]:
+        with self._lock:
+            return self._cache.get(user_id)
+
+    def set(self, user_id: str, user: dict):
+        with self._lock:
+            self._cache[user_id] = user
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+principal_cache = PrincipalCache()
+
+
+def build_token_claims(user: dict) -> dict:
+    """Sous-ensemble des champs utilisateur à inclure dans le token."""
+    return {field: user.get(field) for field in EMBEDDED_CLAIM_FIELDS}
@@ -0,0 +1,49 @@
+# app/utils/cache_invalidation.py
+"""
+Invalidation des caches locaux (utilisateurs authentifiés, compteurs de
+notifications non lues) dans tous les processus : l'entrée est retirée
+localement puis l'invalidation est publiée sur le bus d'événements, que
+chaque processus de l'API écoute (listen_invalidations, lancé au démarrage).
+
+Avec EVENT_BUS_BACKEND=memory, seul le processus courant est concerné ; le TTL
+des caches reste la borne de l'écart entre processus si le bus est indisponible.
+"""
+import asyncio
+import logging
+
+from .auth_cache import principal_cache
+from .events import event_bus
+from .notification_cache import unread_count_cache
+
+# Délai avant de se réabonner après une coupure du bus
+INVALIDATION_RESUBSCRIBE_DELAY = 1.0
+
+CACHES = {
+    "principal": principal_cache,
+    "unread_count": unread_count_cache,
+}
+
+
+async def invalidate_cache(cache: str, key: str):
+    CACHES[cache].invalidate(key)
+    await event_bus.publish_invalidation(cache, key)
+
+
+def _apply(event: dict):
+    cache = CACHES.get(event.get("cache"))
+    if cache is not None and event.get("key"):
+        cache.invalidate(event["key"])
+
+
+async def listen_invalidations():
+    """Applique les invalidations publiées par les autres processus, jusqu'à annulation."""
+    while True:
+        try:
+            async with event_bus.subscribe_invalidations() as events:
+                async for event in events:
+                    _apply(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.warning(f"Écoute des invalidations de cache interrompue : {e}")
+        await asyncio.sleep(INVALIDATION_RESUBSCRIBE_DELAY)
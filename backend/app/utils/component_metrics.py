@@ -0,0 +1,42 @@
+# app/utils/component_metrics.py
+"""
+Compteurs tenus par les composants (cache, stockage, inférence, emails, file de
+tâches), exportés au moment du scrape par GET /metrics de l'API et par le
+serveur de métriques du worker : chacun expose ceux de son processus.
+"""
+from ..repositories.storage_repository import storage_repository
+from .content_cache import cache_stats
+from .inference import inference_batcher
+from .job_queue import job_queue
+from .mailer import email_dispatcher
+from .metrics import JOB_QUEUE_DEPTH, registry, stats_family
+
+
+def _component_stats():
+    """Compteurs déjà tenus par les composants, lus au moment du scrape."""
+    JOB_QUEUE_DEPTH.set(job_queue.depth())
+    yield stats_family("ayikungban_cache_total", "Réutilisation des résultats (PDF et pages identiques)",
+                       cache_stats.snapshot())
+    yield stats_family("ayikungban_storage_total", "Appels au stockage (uploads, téléchargements, réessais)",
+                       storage_repository.stats)
+    yield stats_family("ayikungban_inference_total", "Lots d'inférence et pages traitées",
+                       inference_batcher.stats)
+    email = email_dispatcher.metrics()
+    yield stats_family("ayikungban_email_total", "Emails mis en file, envoyés, réessayés ou abandonnés", {
+        key: value for key, value in email.items()
+        if key in ("enqueued", "sent", "failed", "retries", "rejected",
+                   "enqueue_seconds_total", "delivery_seconds_total")
+    })
+    yield stats_family("ayikungban_email_queue_depth", "Emails en attente d'envoi",
+                       {"email": email["queue_depth"]}, type="gauge", label="queue")
+
+
+_registered = False
+
+
+def register_component_metrics():
+    """Ajoute les compteurs des composants au registre (une seule fois par processus)."""
+    global _registered
+    if not _registered:
+        registry.register_collector(_component_stats)
+        _registered = True
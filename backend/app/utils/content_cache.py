@@ -0,0 +1,42 @@
+# app/utils/content_cache.py
+import hashlib
+import threading
+
+from PIL import Image as PILImage
+
+
+def hash_bytes(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def hash_page(image: PILImage.Image) -> str:
+    """Empreinte des pixels de la page rendue (indépendante de l'encodage)."""
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class CacheStats:
+    """Compteurs de réutilisation des résultats (succès / échecs du cache)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {
+            "pdf_hits": 0,
+            "pdf_misses": 0,
+            "page_hits": 0,
+            "page_misses": 0,
+            "bytes_saved": 0,
+        }
+
+    def record(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self._counters)
+
+
+cache_stats = CacheStats()
@@ -0,0 +1,150 @@
+# app/utils/events.py
+import asyncio
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import AsyncIterator, Dict, Set
+
+# "memory" (un seul processus, worker de traitement intégré à l'API) ou "redis"
+# (diffusion entre workers uvicorn, machines et workers séparés python -m app.worker)
+EVENT_BUS_BACKEND = os.getenv("EVENT_BUS_BACKEND", "memory")
+EVENT_BUS_REDIS_URL = os.getenv("EVENT_BUS_REDIS_URL", "redis://localhost:6379/0")
+# Nombre d'événements gardés par abonné lent avant d'abandonner les plus anciens
+EVENT_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", 100))
+# Canal commun à tous les processus pour l'invalidation des caches locaux
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class EventBackend(ABC):
+    """Transport des événements entre publieurs et abonnés."""
+
+    @abstractmethod
+    async def publish(self, channel: str, event: dict):
+        ...
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncIterator[dict]:
+        """Context manager asynchrone produisant un itérateur d'événements."""
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemoryEventBackend(EventBackend):
+    """Diffusion en mémoire du processus : une file par abonné."""
+
+    def __init__(self, queue_size: int = EVENT_SUBSCRIBER_QUEUE_SIZE):
+        self._queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    async def publish(self, channel: str, event: dict):
+        for queue in list(self._subscribers.get(channel, ())):
+            if queue.full():
+                # Abonné trop lent : on sacrifie l'événement le plus ancien
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        queue = asyncio.Queue(maxsize=self._queue_size)
+        self._subscribers.setdefault(channel, set()).add(queue)
+
+        async def iterator():
+            while True:
+                yield await queue.get()
+
+        try:
+            yield iterator()
+        finally:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+
+class RedisEventBackend(EventBackend):
+    """Diffusion via Redis pub/sub, partagée entre tous les workers."""
+
+    def __init__(self, url: str = EVENT_BUS_REDIS_URL):
+        try:
+            import redis.asyncio as aioredis
+        except ImportError:
+            raise RuntimeError("EVENT_BUS_BACKEND=redis nécessite le paquet 'redis'")
+        self._redis = aioredis.from_url(url)
+
+    async def publish(self, channel: str, event: dict):
+        await self._redis.publish(channel, json.dumps(event))
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(channel)
+
+        async def iterator():
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    yield json.loads(message["data"])
+
+        try:
+            yield iterator()
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.close()
+
+    async def close(self):
+        await self._redis.close()
+
+
+class EventBus:
+    """Publication d'événements par utilisateur (progression des pages, notifications)."""
+
+    def __init__(self, backend: EventBackend):
+        self.backend = backend
+
+    @staticmethod
+    def _channel(user_id: str) -> str:
+        return f"user:{user_id}"
+
+    async def publish(self, user_id: str, event_type: str, data: dict):
+        """Publie un événement ; une erreur de diffusion n'interrompt jamais l'appelant."""
+        event = {
+            "type": event_type,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        try:
+            await self.backend.publish(self._channel(user_id), event)
+        except Exception as e:
+            logging.warning(f"Publication de l'événement {event_type} impossible : {e}")
+
+    def subscribe(self, user_id: str):
+        return self.backend.subscribe(self._channel(user_id))
+
+    async def publish_invalidation(self, cache: str, key: str):
+        """Diffuse l'invalidation d'une entrée de cache à tous les processus."""
+        try:
+            await self.backend.publish(CACHE_INVALIDATION_CHANNEL, {"cache": cache, "key": key})
+        except Exception as e:
+            logging.warning(f"Diffusion de l'invalidation {cache}:{key} impossible : {e}")
+
+    def subscribe_invalidations(self):
+        return self.backend.subscribe(CACHE_INVALIDATION_CHANNEL)
+
+    async def close(self):
+        await self.backend.close()
+
+
+def get_event_bus(backend: str = EVENT_BUS_BACKEND) -> EventBus:
+    if backend == "redis":
+        return EventBus(RedisEventBackend())
+    if backend == "memory":
+        return EventBus(MemoryEventBackend())
+    raise RuntimeError(f"EVENT_BUS_BACKEND inconnu : {backend}")
+
+
+event_bus = get_event_bus()
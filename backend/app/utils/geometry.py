@@ -0,0 +1,147 @@
+# app/utils/geometry.py
+import base64
+import struct
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Mesures précalculées par parcelle
+PARCEL_METRICS_DTYPE = np.dtype([
+    ("area", "<f8"),
+    ("perimeter", "<f8"),
+    ("centroid_x", "<f8"),
+    ("centroid_y", "<f8"),
+    ("min_x", "<f8"),
+    ("min_y", "<f8"),
+    ("max_x", "<f8"),
+    ("max_y", "<f8"),
+])
+
+# Format binaire : magic, nombre de parcelles, nombre de sommets, puis
+# offsets (int64), coordonnées (float64 x,y) et mesures (PARCEL_METRICS_DTYPE)
+_MAGIC = b"PCL1"
+_HEADER = struct.Struct("<4sII")
+
+
+class ParcelSet:
+    """
+    Parcelles d'une page sous forme de tableaux contigus.
+
+    coords  : float64 (N, 2), sommets de toutes les parcelles bout à bout
+    offsets : int64 (P + 1,), la parcelle i occupe coords[offsets[i]:offsets[i+1]]
+    metrics : tableau structuré (P,) calculé une seule fois, de façon vectorisée
+    """
+
+    def __init__(self, coords: np.ndarray, offsets: np.ndarray, metrics: Optional[np.ndarray] = None):
+        self.coords = np.ascontiguousarray(coords, dtype="<f8").reshape(-1, 2)
+        self.offsets = np.ascontiguousarray(offsets, dtype="<i8")
+        self.metrics = compute_metrics(self.coords, self.offsets) if metrics is None else metrics
+
+    @classmethod
+    def from_rings(cls, rings: Iterable[Sequence[Tuple[float, float]]]) -> "ParcelSet":
+        # Les parcelles sans sommet sont ignorées
+        arrays = [np.asarray(ring, dtype="<f8").reshape(-1, 2) for ring in rings]
+        arrays = [array for array in arrays if len(array)]
+        lengths = [len(array) for array in arrays]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype("<i8")
+        coords = np.concatenate(arrays) if arrays else np.empty((0, 2), dtype="<f8")
+        return cls(coords, offsets)
+
+    @classmethod
+    def from_points(cls, points: List[dict]) -> "ParcelSet":
+        """Une parcelle à partir de l'ancien format [{"x":..,"y":..}, ...]."""
+        return cls.from_rings([[(point["x"], point["y"]) for point in points]])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def ring(self, index: int) -> np.ndarray:
+        return self.coords[self.offsets[index]:self.offsets[index + 1]]
+
+    def to_bytes(self) -> bytes:
+        return b"".join([
+            _HEADER.pack(_MAGIC, len(self), len(self.coords)),
+            self.offsets.tobytes(),
+            self.coords.tobytes(),
+            self.metrics.astype(PARCEL_METRICS_DTYPE, copy=False).tobytes(),
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "ParcelSet":
+        magic, parcel_count, vertex_count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Format de parcelles inconnu")
+        position = _HEADER.size
+        offsets = np.frombuffer(data, dtype="<i8", count=parcel_count + 1, offset=position)
+        position += offsets.nbytes
+        coords = np.frombuffer(data, dtype="<f8", count=vertex_count * 2, offset=position).reshape(-1, 2)
+        position += coords.nbytes
+        metrics = np.frombuffer(data, dtype=PARCEL_METRICS_DTYPE, count=parcel_count, offset=position)
+        return cls(coords, offsets, metrics)
+
+    def to_base64(self) -> str:
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def from_base64(cls, data: str) -> "ParcelSet":
+        return cls.from_bytes(base64.b64decode(data))
+
+    def to_api(self) -> List[dict]:
+        """Représentation JSON, construite seulement quand l'API la demande."""
+        parcels = []
+        for index in range(len(self)):
+            ring = self.ring(index)
+            metric = self.metrics[index]
+            parcels.append({
+                "coordonnees": [{"x": float(x), "y": float(y)} for x, y in ring],
+                "surface": float(metric["area"]),
+                "perimetre": float(metric["perimeter"]),
+                "centroide": {"x": float(metric["centroid_x"]), "y": float(metric["centroid_y"])},
+                "bbox": [float(metric["min_x"]), float(metric["min_y"]),
+                         float(metric["max_x"]), float(metric["max_y"])],
+            })
+        return parcels
+
+
+def compute_metrics(coords: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """
+    Surface, périmètre, centroïde et emprise de toutes les parcelles en une passe
+    (formule du lacet, chaque anneau étant refermé sur son premier sommet).
+    """
+    parcel_count = len(offsets) - 1
+    metrics = np.zeros(parcel_count, dtype=PARCEL_METRICS_DTYPE)
+    if parcel_count == 0 or len(coords) == 0:
+        return metrics
+
+    starts = offsets[:-1]
+    lengths = np.diff(offsets)
+
+    # Indice du sommet suivant dans le même anneau
+    next_index = np.arange(1, len(coords) + 1)
+    next_index[offsets[1:] - 1] = starts
+
+    x, y = coords[:, 0], coords[:, 1]
+    x_next, y_next = x[next_index], y[next_index]
+
+    cross = x * y_next - x_next * y
+    signed_area = np.add.reduceat(cross, starts) / 2
+    metrics["area"] = np.abs(signed_area)
+    metrics["perimeter"] = np.add.reduceat(np.hypot(x_next - x, y_next - y), starts)
+
+    centroid_x = np.add.reduceat((x + x_next) * cross, starts)
+    centroid_y = np.add.reduceat((y + y_next) * cross, starts)
+    degenerate = np.isclose(signed_area, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        centroid_x = centroid_x / (6 * signed_area)
+        centroid_y = centroid_y / (6 * signed_area)
+    # Anneau sans surface (point, segment) : moyenne des sommets
+    centroid_x[degenerate] = (np.add.reduceat(x, starts) / lengths)[degenerate]
+    centroid_y[degenerate] = (np.add.reduceat(y, starts) / lengths)[degenerate]
+    metrics["centroid_x"] = centroid_x
+    metrics["centroid_y"] = centroid_y
+
+    metrics["min_x"] = np.minimum.reduceat(x, starts)
+    metrics["min_y"] = np.minimum.reduceat(y, starts)
+    metrics["max_x"] = np.maximum.reduceat(x, starts)
+    metrics["max_y"] = np.maximum.reduceat(y, starts)
+    return metrics
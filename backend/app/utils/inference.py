@@ -0,0 +1,130 @@
+# app/utils/inference.py
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from .geometry import ParcelSet
+from .ai_services import extract_parcelles_coordinates_batch, determine_zone_layers_batch
+from .zone_layers import layer_index
+
+# Taille maximale d'un lot et attente maximale (ms) avant de lancer un lot incomplet
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", 8))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 20))
+# Threads d'inférence (les modèles gèrent eux-mêmes leur parallélisme interne)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 1))
+
+
+class InferenceEngine:
+    """
+    Modèles d'extraction des parcelles et de détermination des zones.
+    Les modèles sont chargés une seule fois par processus.
+    """
+
+    def __init__(self):
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            # Chargement des poids / sessions des modèles réels ici
+            layer_index.load()
+            self._loaded = True
+            logging.info("Modèles d'inférence chargés")
+
+    def infer_batch(self, images: List[bytes]) -> List[Tuple[ParcelSet, dict]]:
+        """Retourne (parcelles, zones) pour chaque image du lot, dans le même ordre."""
+        self.load()
+        parcelles_results = extract_parcelles_coordinates_batch(images)
+        zones_results = determine_zone_layers_batch(parcelles_results)
+        return list(zip(parcelles_results, zones_results))
+
+    def infer_zones(self, parcels: ParcelSet) -> dict:
+        """Zones seules, à partir de parcelles déjà extraites (reprise d'une page)."""
+        self.load()
+        return determine_zone_layers_batch([parcels])[0]
+
+
+class MicroBatcher:
+    """
+    Regroupe les pages soumises par les jobs concurrents en lots d'au plus
+    max_batch_size, ou après max_wait_ms, puis rend un futur par page.
+    """
+
+    def __init__(self, engine: InferenceEngine, max_batch_size: int = INFERENCE_MAX_BATCH_SIZE,
+                 max_wait_ms: float = INFERENCE_MAX_WAIT_MS, workers: int = INFERENCE_WORKERS):
+        self.engine = engine
+        self._max_batch_size = max_batch_size
+        self._max_wait = max_wait_ms / 1000
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.stats = {"batches": 0, "items": 0}
+
+    def start(self):
+        if self._tasks:
+            return
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="inference")
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self._workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def submit(self, image: bytes) -> Tuple[ParcelSet, dict]:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self._max_wait
+        while len(batch) < self._max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            # Ignorer les demandes abandonnées entre-temps
+            batch = [(image, future) for image, future in batch if not future.done()]
+            if not batch:
+                continue
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.engine.infer_batch, [image for image, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.stats["batches"] += 1
+            self.stats["items"] += len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+inference_engine = InferenceEngine()
+inference_batcher = MicroBatcher(inference_engine)
@@ -0,0 +1,180 @@
+# app/utils/job_queue.py
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(tempfile.gettempdir(), "ayikungban_jobs.sqlite3"))
+# Dossier où les PDF reçus attendent d'être traités par un worker
+JOB_SPOOL_DIR = os.getenv("JOB_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "ayikungban_spool"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_RETRY_BASE_DELAY = float(os.getenv("JOB_RETRY_BASE_DELAY", 10))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", 300))
+# Au-delà de cette profondeur, les nouveaux uploads sont refusés (429)
+JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", 100))
+
+
+class SQLiteJobQueue:
+    """
+    File de tâches durable dans un fichier SQLite (mode WAL).
+
+    Cycle de vie : queued -> leased (claim) -> supprimée (ack)
+                                           -> queued avec délai (nack) -> dead
+    Un bail expiré (worker arrêté brutalement) rend la tâche à nouveau disponible,
+    ou l'envoie en dead-letter si elle a épuisé ses essais. ack et nack ne
+    s'appliquent qu'au worker qui détient encore le bail.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH):
+        self._path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL,
+                available_at REAL NOT NULL,
+                lease_expires REAL,
+                worker TEXT,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS jobs_status_available_idx ON jobs (status, available_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> dict:
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+    def enqueue(self, kind: str, payload: dict, job_id: str = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> str:
+        job_id = job_id or str(uuid.uuid4())
+        now = time.time()
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, payload, max_attempts, available_at, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, json.dumps(payload), max_attempts, now, now, now)
+        )
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> Optional[dict]:
+        """Prend la prochaine tâche disponible (ou dont le bail a expiré)."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Bail expiré sur le dernier essai : la tâche a fait tomber son worker
+            # (OOM, crash du rasteriseur) et ne doit pas être reprise indéfiniment
+            conn.execute(
+                "UPDATE jobs SET status = 'dead', lease_expires = NULL, worker = NULL, "
+                "last_error = 'Bail expiré au dernier essai', updated_at = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT * FROM jobs "
+                "WHERE (status = 'queued' AND available_at <= ?) "
+                "   OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY available_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, worker = ?, "
+                "lease_expires = ?, updated_at = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            job = self._to_dict(row)
+            job["attempts"] += 1
+            return job
+        finally:
+            conn.execute("COMMIT")
+
+    def extend_lease(self, job_id: str, worker_id: str, lease_seconds: float = JOB_LEASE_SECONDS) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+            (now + lease_seconds, now, job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def ack(self, job_id: str, worker_id: str) -> bool:
+        """Supprime la tâche terminée ; False si le bail a été perdu entre-temps."""
+        cursor = self._connect().execute(
+            "DELETE FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'", (job_id, worker_id)
+        )
+        return cursor.rowcount > 0
+
+    def nack(self, job_id: str, worker_id: str, error: str, base_delay: float = JOB_RETRY_BASE_DELAY) -> str:
+        """
+        Replanifie la tâche avec un délai exponentiel, ou l'envoie en dead-letter.
+        Retourne le nouveau statut, ou "lost" si le bail a été perdu entre-temps.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND worker = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return "lost"
+            if row["attempts"] >= row["max_attempts"]:
+                status, available_at = "dead", now
+            else:
+                status, available_at = "queued", now + base_delay * (2 ** (row["attempts"] - 1))
+            conn.execute(
+                "UPDATE jobs SET status = ?, available_at = ?, lease_expires = NULL, worker = NULL, "
+                "last_error = ?, updated_at = ? WHERE id = ?",
+                (status, available_at, error, now, job_id)
+            )
+            return status
+        finally:
+            conn.execute("COMMIT")
+
+    def depth(self) -> int:
+        """Nombre de tâches en attente ou en cours."""
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')"
+        ).fetchone()
+        return row[0]
+
+    def dead_letters(self, limit: int = 100) -> List[dict]:
+        rows = self._connect().execute(
+            "SELECT * FROM jobs WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def requeue_dead(self, job_id: str) -> bool:
+        now = time.time()
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, updated_at = ? "
+            "WHERE id = ? AND status = 'dead'",
+            (now, now, job_id)
+        )
+        return cursor.rowcount > 0
+
+
+job_queue = SQLiteJobQueue()
@@ -0,0 +1,228 @@
+# app/utils/mailer.py
+import asyncio
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from contextlib import contextmanager
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+# Charger le fichier .env du dossier app
+env_path = os.path.join(os.path.dirname(__file__), '..', '.env')
+load_dotenv(env_path)
+
+smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
+smtp_port = int(os.getenv("SMTP_PORT", 587))
+smtp_starttls = os.getenv("SMTP_STARTTLS", "true").lower() in ("1", "true", "yes")
+sender_email = os.getenv("SENDER_EMAIL")
+sender_password = os.getenv("SENDER_PASSWORD")
+
+# Connexions SMTP gardées ouvertes, workers d'envoi et politique de réessai
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2))
+EMAIL_WORKERS = int(os.getenv("EMAIL_WORKERS", 2))
+EMAIL_QUEUE_MAXSIZE = int(os.getenv("EMAIL_QUEUE_MAXSIZE", 1000))
+EMAIL_MAX_RETRIES = int(os.getenv("EMAIL_MAX_RETRIES", 3))
+EMAIL_RETRY_BASE_DELAY = float(os.getenv("EMAIL_RETRY_BASE_DELAY", 1.0))
+
+
+class SMTPConnectionPool:
+    """
+    Pool de connexions SMTP authentifiées et persistantes.
+
+    Une connexion est vérifiée (NOOP) avant réutilisation et recréée si le
+    serveur l'a fermée. Sans identifiants, l'authentification est ignorée
+    (utile contre un serveur local comme aiosmtpd).
+    """
+
+    def __init__(self, size: int = SMTP_POOL_SIZE, host: str = smtp_server, port: int = smtp_port,
+                 starttls: bool = smtp_starttls, username: str = sender_email, password: str = sender_password):
+        self._host = host
+        self._port = port
+        self._starttls = starttls
+        self._username = username
+        self._password = password
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self._host, self._port, timeout=30)
+        if self._starttls:
+            server.starttls()  # sécurise la connexion
+        if self._username and self._password:
+            server.login(self._username, self._password)
+        return server
+
+    def _get(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            try:
+                if server.noop()[0] == 250:
+                    return server
+            except smtplib.SMTPException:
+                pass
+            except OSError:
+                pass
+            self._close(server)
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._get()
+            yield server
+        except Exception:
+            # Connexion potentiellement dans un état incohérent : on la jette
+            if server is not None:
+                self._close(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                self._idle.put(server)
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+def build_message(recipient_email: str, subject: str, body: str) -> MIMEMultipart:
+    message = MIMEMultipart()
+    message["From"] = sender_email
+    message["To"] = recipient_email
+    message["Subject"] = subject
+    message.attach(MIMEText(body, "plain"))
+    return message
+
+
+class EmailDispatcher:
+    """
+    File d'envoi d'emails en mémoire, vidée par des workers en arrière-plan.
+
+    enqueue() rend la main immédiatement ; l'envoi SMTP se fait dans un thread
+    avec réessais (backoff exponentiel). on_failure est appelé (dans un thread)
+    si l'email n'a pas pu être envoyé après tous les essais.
+    """
+
+    def __init__(self, pool: SMTPConnectionPool = None, workers: int = EMAIL_WORKERS,
+                 maxsize: int = EMAIL_QUEUE_MAXSIZE, max_retries: int = EMAIL_MAX_RETRIES,
+                 retry_base_delay: float = EMAIL_RETRY_BASE_DELAY):
+        self.pool = pool or SMTPConnectionPool()
+        self._workers = workers
+        self._maxsize = maxsize
+        self._max_retries = max_retries
+        self._retry_base_delay = retry_base_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self._stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retries": 0,
+            "rejected": 0,
+            "enqueue_seconds_total": 0.0,
+            "delivery_seconds_total": 0.0,
+        }
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self._maxsize)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self._workers)]
+
+    async def stop(self, timeout: float = 10):
+        """Vide la file (dans la limite de timeout) puis arrête les workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logging.warning(f"{self._queue.qsize()} email(s) non envoyé(s) à l'arrêt")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.pool.close)
+
+    def enqueue(self, recipient_email: str, subject: str, body: str,
+                on_failure: Callable[[], None] = None) -> bool:
+        """Ajoute un email à la file. Retourne False si la file est pleine."""
+        start = time.perf_counter()
+        self.start()
+        try:
+            self._queue.put_nowait((recipient_email, subject, body, on_failure, time.perf_counter()))
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            return False
+        self._stats["enqueued"] += 1
+        self._stats["enqueue_seconds_total"] += time.perf_counter() - start
+        return True
+
+    def send(self, recipient_email: str, subject: str, body: str):
+        """Envoi synchrone via le pool de connexions."""
+        message = build_message(recipient_email, subject, body)
+        with self.pool.connection() as server:
+            server.sendmail(sender_email, recipient_email, message.as_string())
+
+    async def _worker(self):
+        while True:
+            recipient_email, subject, body, on_failure, enqueued_at = await self._queue.get()
+            try:
+                await self._deliver(recipient_email, subject, body, on_failure)
+                self._stats["delivery_seconds_total"] += time.perf_counter() - enqueued_at
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, recipient_email: str, subject: str, body: str, on_failure):
+        for attempt in range(self._max_retries + 1):
+            try:
+                await asyncio.to_thread(self.send, recipient_email, subject, body)
+                self._stats["sent"] += 1
+                logging.info(f"Email envoyé à {recipient_email}")
+                return
+            except Exception as e:
+                logging.warning(f"Échec d'envoi à {recipient_email} (essai {attempt + 1}) : {e}")
+                if attempt < self._max_retries:
+                    self._stats["retries"] += 1
+                    await asyncio.sleep(self._retry_base_delay * (2 ** attempt))
+
+        self._stats["failed"] += 1
+        logging.error(f"Email abandonné pour {recipient_email}")
+        if on_failure:
+            try:
+                await asyncio.to_thread(on_failure)
+            except Exception as e:
+                logging.error(f"Erreur callback d'échec d'email : {e}")
+
+    def metrics(self) -> dict:
+        enqueued = self._stats["enqueued"]
+        delivered = self._stats["sent"] + self._stats["failed"]
+        return {
+            **self._stats,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "avg_enqueue_seconds": self._stats["enqueue_seconds_total"] / enqueued if enqueued else 0.0,
+            "avg_delivery_seconds": self._stats["delivery_seconds_total"] / delivered if delivered else 0.0,
+        }
+
+
+email_dispatcher = EmailDispatcher()
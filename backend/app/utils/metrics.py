@@ -0,0 +1,349 @@
+# app/utils/metrics.py
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Registre de métriques maison exposé au format texte Prometheus (GET /metrics).
+# Une mesure coûte un accès dictionnaire et une recherche dichotomique : les
+# compteurs peuvent rester sur le chemin critique du traitement des pages.
+
+# Jeton optionnel attendu par /metrics (Authorization: Bearer <jeton>) ; vide = accès libre
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class Sample(NamedTuple):
+    labels: Dict[str, str]
+    value: float
+
+
+class MetricFamily(NamedTuple):
+    name: str
+    type: str
+    help: str
+    samples: List[Sample]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Timer:
+    __slots__ = ("_child", "_start")
+
+    def __init__(self, child: "_HistogramChild"):
+        self._child = child
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._child.observe(time.perf_counter() - self._start)
+        return False
+
+
+class _HistogramChild:
+    __slots__ = ("_buckets", "_counts", "_sum", "_lock")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def time(self) -> _Timer:
+        """with histogram.labels(...).time(): ... mesure la durée du bloc (secondes)."""
+        return _Timer(self)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class _ValueChild:
+    __slots__ = ("_value", "_lock")
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        self._value = value
+
+    def get(self) -> float:
+        return self._value
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._unlabelled = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """Série correspondant aux valeurs des labels (dans l'ordre de labelnames)."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} attend les labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _series(self):
+        return [(dict(zip(self.labelnames, values)), child) for values, child in list(self._children.items())]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _ValueChild()
+
+    def inc(self, amount: float = 1):
+        self._unlabelled.inc(amount)
+
+    def collect(self) -> MetricFamily:
+        return MetricFamily(self.name, self.type, self.help,
+                            [Sample(labels, child.get()) for labels, child in self._series()])
+
+
+class Gauge(Counter):
+    type = "gauge"
+
+    def dec(self, amount: float = 1):
+        self._unlabelled.dec(amount)
+
+    def set(self, value: float):
+        self._unlabelled.set(value)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._unlabelled.observe(value)
+
+    def time(self) -> _Timer:
+        return self._unlabelled.time()
+
+    def collect(self) -> MetricFamily:
+        samples = []
+        for labels, child in self._series():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append(Sample({**labels, "le": _format_value(bound)}, cumulative))
+            samples.append(Sample({**labels, "__suffix__": "_sum"}, total))
+            samples.append(Sample({**labels, "__suffix__": "_count"}, cumulative))
+        return MetricFamily(self.name, self.type, self.help, samples)
+
+
+class MetricsRegistry:
+    """
+    Métriques déclarées (compteurs, jauges, histogrammes) et collecteurs appelés
+    au moment du scrape pour exporter des compteurs existants (cache, emails, stockage...).
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        # Collecteurs d'abord : ils peuvent mettre à jour des jauges déclarées (profondeur de file)
+        collected = []
+        for collector in self._collectors:
+            collected.extend(collector())
+        return [metric.collect() for metric in self._metrics.values()] + collected
+
+    def render(self) -> str:
+        """Format d'exposition texte Prometheus (version 0.0.4)."""
+        lines = []
+        for family in self.collect():
+            lines.append(f"# HELP {family.name} {_escape(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for labels, value in family.samples:
+                labels = dict(labels)
+                suffix = labels.pop("__suffix__", "_bucket" if "le" in labels else "")
+                lines.append(f"{family.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# Durée de chaque étape du traitement d'une page (rasterisation, encodage, upload,
+# inférence, résumé, écritures en base...)
+STAGE_SECONDS = registry.histogram(
+    "ayikungban_pipeline_stage_seconds", "Durée des étapes du traitement des PDF", ("stage",)
+)
+PDF_PROCESSING_SECONDS = registry.histogram(
+    "ayikungban_pdf_processing_seconds", "Durée totale du traitement d'un PDF", ("outcome",),
+    buckets=(1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+)
+HTTP_REQUEST_SECONDS = registry.histogram(
+    "ayikungban_http_request_seconds", "Latence des requêtes HTTP par route", ("method", "route", "status")
+)
+SUPABASE_REQUEST_SECONDS = registry.histogram(
+    "ayikungban_supabase_request_seconds", "Appels PostgREST par table (ou fonction rpc)", ("table", "method", "status")
+)
+JOBS_IN_FLIGHT = registry.gauge(
+    "ayikungban_jobs_in_flight", "Tâches de la file en cours d'exécution dans ce processus", ("kind",)
+)
+JOBS_TOTAL = registry.counter(
+    "ayikungban_jobs_total", "Tâches de la file terminées", ("kind", "outcome")
+)
+JOB_QUEUE_DEPTH = registry.gauge(
+    "ayikungban_job_queue_depth", "Tâches en attente ou en cours dans la file"
+)
+
+
+def stage_timer(stage: str) -> _Timer:
+    """with stage_timer("inference"): ... ajoute la durée du bloc à l'histogramme des étapes."""
+    return STAGE_SECONDS.labels(stage).time()
+
+
+def stats_family(name: str, help: str, values: dict, type: str = "counter",
+                 label: str = "name") -> MetricFamily:
+    """Exporte un dictionnaire de compteurs existant (stats d'un composant) en une famille."""
+    return MetricFamily(name, type, help, [
+        Sample({label: key}, float(value)) for key, value in values.items()
+        if isinstance(value, (int, float))
+    ])
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0", metrics_registry: MetricsRegistry = None,
+                         token: str = METRICS_TOKEN) -> ThreadingHTTPServer:
+    """
+    Expose GET /metrics hors de l'API (processus worker) : serveur HTTP minimal dans
+    un thread, le rendu ne passe donc jamais par la boucle asyncio des tâches.
+    """
+    metrics_registry = metrics_registry or registry
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            if token and self.headers.get("Authorization") != f"Bearer {token}":
+                self.send_error(401)
+                return
+            body = metrics_registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", METRICS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logging.info(f"Métriques exposées sur http://{host}:{server.server_port}/metrics")
+    return server
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware ASGI : latence par (méthode, route, statut). La route est le
+    chemin déclaré (/images/{image_id}/retry), pas l'URL, pour borner le nombre de séries.
+    """
+
+    def __init__(self, app, histogram: Histogram = HTTP_REQUEST_SECONDS):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            path: Optional[str] = getattr(route, "path", None) or "unmatched"
+            self.histogram.labels(scope["method"], path, str(status)).observe(time.perf_counter() - start)
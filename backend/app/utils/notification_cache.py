@@ -0,0 +1,37 @@
+# app/utils/notification_cache.py
+import os
+import threading
+from typing import Optional
+
+from cachetools import TTLCache
+
+# Compteur de notifications non lues gardé en mémoire (interrogé en continu par l'icône de cloche)
+UNREAD_COUNT_TTL = int(os.getenv("UNREAD_COUNT_TTL", 30))
+UNREAD_COUNT_MAXSIZE = int(os.getenv("UNREAD_COUNT_MAXSIZE", 10000))
+
+
+class UnreadCountCache:
+    """
+    Nombre de notifications non lues par user_id. Invalidé à chaque création,
+    lecture ou suppression, dans tous les processus via utils/cache_invalidation ;
+    le TTL borne l'écart si le bus d'événements est indisponible.
+    """
+
+    def __init__(self, maxsize: int = UNREAD_COUNT_MAXSIZE, ttl: int = UNREAD_COUNT_TTL):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str) -> Optional[int]:
+        with self._lock:
+            return self._cache.get(user_id)
+
+    def set(self, user_id: str, count: int):
+        with self._lock:
+            self._cache[user_id] = count
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._cache.pop(user_id, None)
+
+
+unread_count_cache = UnreadCountCache()
@@ -0,0 +1,206 @@
+# app/utils/otp_store.py
+import heapq
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+# Durée de validité d'un OTP et nombre maximal de tentatives
+OTP_TTL_SECONDS = int(os.getenv("OTP_TTL_SECONDS", 300))  # 5 minutes
+OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 3))
+
+# "memory" (un seul worker) ou "sqlite" (partagé entre workers d'une même machine)
+OTP_BACKEND = os.getenv("OTP_BACKEND", "memory")
+OTP_SQLITE_PATH = os.getenv("OTP_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "ayikungban_otp.sqlite3"))
+
+
+class OTPBackend(ABC):
+    """Interface commune des stockages d'OTP."""
+
+    @abstractmethod
+    def add(self, npi: str, otp: str, email: str):
+        ...
+
+    @abstractmethod
+    def verify(self, npi: str, otp: str) -> bool:
+        ...
+
+    @abstractmethod
+    def get_email(self, npi: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def remove(self, npi: str, otp: Optional[str] = None):
+        """Supprime l'OTP du NPI ; si otp est fourni, seulement s'il est encore celui stocké."""
+        ...
+
+    @abstractmethod
+    def cleanup_expired(self):
+        ...
+
+
+class MemoryOTPBackend(OTPBackend):
+    """
+    Stockage en mémoire du processus.
+
+    Les expirations sont gardées dans un tas trié par date : le nettoyage ne
+    parcourt que les OTP réellement expirés (O(1) amorti par OTP).
+    """
+
+    def __init__(self):
+        self._store = {}
+        self._expiry_heap = []
+        self._lock = threading.Lock()
+
+    def add(self, npi: str, otp: str, email: str):
+        expires = time.time() + OTP_TTL_SECONDS
+        with self._lock:
+            self._store[npi] = {
+                "otp": otp,
+                "expires": expires,
+                "email": email,
+                "attempts": 0
+            }
+            heapq.heappush(self._expiry_heap, (expires, npi))
+        logging.info(f"OTP stocké pour NPI {npi}")
+
+    def verify(self, npi: str, otp: str) -> bool:
+        with self._lock:
+            data = self._store.get(npi)
+            if not data:
+                logging.warning(f"Aucun OTP trouvé pour NPI {npi}")
+                return False
+
+            if time.time() > data["expires"]:
+                logging.warning(f"OTP expiré pour NPI {npi}")
+                self._store.pop(npi, None)
+                return False
+
+            data["attempts"] += 1
+            if data["attempts"] > OTP_MAX_ATTEMPTS:
+                logging.warning(f"Trop de tentatives pour NPI {npi}")
+                self._store.pop(npi, None)
+                return False
+
+            return data["otp"] == otp
+
+    def get_email(self, npi: str) -> Optional[str]:
+        data = self._store.get(npi)
+        return data["email"] if data else None
+
+    def remove(self, npi: str, otp: Optional[str] = None):
+        with self._lock:
+            data = self._store.get(npi)
+            removed = data is not None and (otp is None or data["otp"] == otp)
+            if removed:
+                del self._store[npi]
+        if removed:
+            logging.info(f"OTP supprimé pour NPI {npi}")
+
+    def cleanup_expired(self):
+        current_time = time.time()
+        with self._lock:
+            heap = self._expiry_heap
+            while heap and heap[0][0] < current_time:
+                expires, npi = heapq.heappop(heap)
+                data = self._store.get(npi)
+                # L'entrée du tas peut concerner un OTP déjà remplacé ou supprimé
+                if data and data["expires"] == expires:
+                    del self._store[npi]
+
+
+class SQLiteOTPBackend(OTPBackend):
+    """
+    Stockage partagé dans un fichier SQLite en mode WAL.
+
+    Tous les workers uvicorn d'une même machine voient les mêmes OTP, la
+    vérification fonctionne donc quel que soit le worker qui la reçoit.
+    """
+
+    def __init__(self, path: str = OTP_SQLITE_PATH):
+        self._path = path
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS otp (
+                npi TEXT PRIMARY KEY,
+                otp TEXT NOT NULL,
+                email TEXT,
+                expires REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS otp_expires_idx ON otp (expires)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, npi: str, otp: str, email: str):
+        self._connect().execute(
+            "INSERT OR REPLACE INTO otp (npi, otp, email, expires, attempts) VALUES (?, ?, ?, ?, 0)",
+            (npi, otp, email, time.time() + OTP_TTL_SECONDS)
+        )
+        logging.info(f"OTP stocké pour NPI {npi}")
+
+    def verify(self, npi: str, otp: str) -> bool:
+        conn = self._connect()
+        # Transaction en écriture : les tentatives sont comptées de façon atomique entre workers
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT otp, expires, attempts FROM otp WHERE npi = ?", (npi,)
+            ).fetchone()
+            if not row:
+                logging.warning(f"Aucun OTP trouvé pour NPI {npi}")
+                return False
+
+            stored_otp, expires, attempts = row
+            if time.time() > expires:
+                logging.warning(f"OTP expiré pour NPI {npi}")
+                conn.execute("DELETE FROM otp WHERE npi = ?", (npi,))
+                return False
+
+            attempts += 1
+            if attempts > OTP_MAX_ATTEMPTS:
+                logging.warning(f"Trop de tentatives pour NPI {npi}")
+                conn.execute("DELETE FROM otp WHERE npi = ?", (npi,))
+                return False
+
+            conn.execute("UPDATE otp SET attempts = ? WHERE npi = ?", (attempts, npi))
+            return stored_otp == otp
+        finally:
+            conn.execute("COMMIT")
+
+    def get_email(self, npi: str) -> Optional[str]:
+        row = self._connect().execute("SELECT email FROM otp WHERE npi = ?", (npi,)).fetchone()
+        return row[0] if row else None
+
+    def remove(self, npi: str, otp: Optional[str] = None):
+        if otp is None:
+            cursor = self._connect().execute("DELETE FROM otp WHERE npi = ?", (npi,))
+        else:
+            cursor = self._connect().execute("DELETE FROM otp WHERE npi = ? AND otp = ?", (npi, otp))
+        if cursor.rowcount:
+            logging.info(f"OTP supprimé pour NPI {npi}")
+
+    def cleanup_expired(self):
+        # Parcours de l'index sur expires : seules les lignes expirées sont lues
+        self._connect().execute("DELETE FROM otp WHERE expires < ?", (time.time(),))
+
+
+def get_otp_store(backend: str = OTP_BACKEND) -> OTPBackend:
+    if backend == "sqlite":
+        return SQLiteOTPBackend()
+    if backend == "memory":
+        return MemoryOTPBackend()
+    raise RuntimeError(f"OTP_BACKEND inconnu : {backend}")
@@ -0,0 +1,95 @@
+# app/utils/page_encoding.py
+import os
+from io import BytesIO
+from typing import Dict, NamedTuple, Optional
+
+from PIL import Image as PILImage
+
+# Format des pages envoyées au stockage et aux modèles :
+# png, png_gray, webp_lossless, webp, jpeg
+PAGE_ENCODING_FORMAT = os.getenv("PAGE_ENCODING_FORMAT", "png")
+# Niveau zlib du PNG (1 = rapide, 9 = compact) ; optimize=True est beaucoup plus lent pour peu de gain
+PAGE_PNG_COMPRESS_LEVEL = int(os.getenv("PAGE_PNG_COMPRESS_LEVEL", 6))
+PAGE_WEBP_QUALITY = int(os.getenv("PAGE_WEBP_QUALITY", 80))
+# method WebP : 0 = rapide, 6 = compact
+PAGE_WEBP_METHOD = int(os.getenv("PAGE_WEBP_METHOD", 4))
+PAGE_JPEG_QUALITY = int(os.getenv("PAGE_JPEG_QUALITY", 75))
+# Vignettes : plus grand côté en pixels (0 pour désactiver)
+PAGE_THUMBNAIL_SIZE = int(os.getenv("PAGE_THUMBNAIL_SIZE", 320))
+PAGE_THUMBNAIL_QUALITY = int(os.getenv("PAGE_THUMBNAIL_QUALITY", 70))
+
+
+class EncodedPage(NamedTuple):
+    data: bytes
+    extension: str
+    content_type: str
+
+
+def _rgb(image: PILImage.Image) -> PILImage.Image:
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def _encode_png(image: PILImage.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", compress_level=PAGE_PNG_COMPRESS_LEVEL)
+    return buffer.getvalue()
+
+
+def _encode_png_gray(image: PILImage.Image) -> bytes:
+    return _encode_png(image.convert("L"))
+
+
+def _encode_webp_lossless(image: PILImage.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="WEBP", lossless=True, quality=PAGE_WEBP_QUALITY, method=PAGE_WEBP_METHOD)
+    return buffer.getvalue()
+
+
+def _encode_webp(image: PILImage.Image) -> bytes:
+    buffer = BytesIO()
+    image.save(buffer, format="WEBP", quality=PAGE_WEBP_QUALITY, method=PAGE_WEBP_METHOD)
+    return buffer.getvalue()
+
+
+def _encode_jpeg(image: PILImage.Image) -> bytes:
+    buffer = BytesIO()
+    _rgb(image).save(buffer, format="JPEG", quality=PAGE_JPEG_QUALITY, optimize=False)
+    return buffer.getvalue()
+
+
+# format -> (encodeur, extension, type MIME)
+PAGE_ENCODERS: Dict[str, tuple] = {
+    "png": (_encode_png, "png", "image/png"),
+    "png_gray": (_encode_png_gray, "png", "image/png"),
+    "webp_lossless": (_encode_webp_lossless, "webp", "image/webp"),
+    "webp": (_encode_webp, "webp", "image/webp"),
+    "jpeg": (_encode_jpeg, "jpg", "image/jpeg"),
+}
+
+
+def encode_page(image: PILImage.Image, fmt: str = PAGE_ENCODING_FORMAT) -> EncodedPage:
+    """Encode une page rasterisée dans le format demandé."""
+    if fmt not in PAGE_ENCODERS:
+        raise ValueError(f"Format d'encodage inconnu : {fmt}")
+    encoder, extension, content_type = PAGE_ENCODERS[fmt]
+    return EncodedPage(encoder(image), extension, content_type)
+
+
+def encode_thumbnail(image: PILImage.Image, size: int = PAGE_THUMBNAIL_SIZE) -> Optional[EncodedPage]:
+    """Vignette JPEG dont le plus grand côté mesure au plus size pixels."""
+    if size <= 0:
+        return None
+    thumbnail = _rgb(image).copy()
+    thumbnail.thumbnail((size, size), PILImage.Resampling.LANCZOS)
+    buffer = BytesIO()
+    thumbnail.save(buffer, format="JPEG", quality=PAGE_THUMBNAIL_QUALITY)
+    return EncodedPage(buffer.getvalue(), "jpg", "image/jpeg")
+
+
+def encode_page_with_thumbnail(image: PILImage.Image, fmt: str = PAGE_ENCODING_FORMAT,
+                               thumbnail_size: int = PAGE_THUMBNAIL_SIZE):
+    """
+    Page encodée + vignette en un seul appel (exécuté dans le pool de processus :
+    l'image n'est transférée qu'une fois au processus).
+    """
+    return encode_page(image, fmt), encode_thumbnail(image, thumbnail_size)
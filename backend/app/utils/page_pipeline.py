@@ -0,0 +1,47 @@
+# app/utils/page_pipeline.py
+import json
+from typing import Optional
+
+# Étapes de l'analyse d'une page, dans l'ordre. Chacune persiste sa sortie en base
+# dès qu'elle est terminée, pour qu'une reprise ne refasse que ce qui manque :
+#   extract  -> images.parcels_data
+#   zones    -> images.zones_result
+#   summary  -> images.result_summary_pdf (en mode résumé combiné, marquée une fois
+#               le résumé du PDF enregistré)
+PIPELINE_STAGES = ("extract", "zones", "summary")
+
+
+def load_state(raw) -> dict:
+    """images.pipeline_state (jsonb, ou texte JSON) -> {"completed": [...], "failed_stage": ...}"""
+    if isinstance(raw, str):
+        raw = json.loads(raw) if raw else None
+    state = dict(raw or {})
+    state["completed"] = [stage for stage in PIPELINE_STAGES if stage in (state.get("completed") or [])]
+    state.setdefault("failed_stage", None)
+    return state
+
+
+def is_done(state: dict, stage: str) -> bool:
+    return stage in state["completed"]
+
+
+def mark_done(state: dict, *stages: str) -> dict:
+    done = set(state["completed"]).union(stages)
+    return {
+        **state,
+        "completed": [stage for stage in PIPELINE_STAGES if stage in done],
+        "failed_stage": None,
+        "error": None,
+    }
+
+
+def mark_failed(state: dict, stage: Optional[str], error: str) -> dict:
+    return {**state, "failed_stage": stage, "error": error}
+
+
+def next_stage(state: dict) -> Optional[str]:
+    """Première étape non terminée (None si la page est complète)."""
+    for stage in PIPELINE_STAGES:
+        if not is_done(state, stage):
+            return stage
+    return None
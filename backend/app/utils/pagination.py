@@ -0,0 +1,28 @@
+# app/utils/pagination.py
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: str, row_id: str) -> str:
+    """Curseur opaque de pagination par clé sur (created_at, id)."""
+    raw = json.dumps([created_at, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return str(created_at), str(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+
+def keyset_filter(created_at: str, row_id: str, inclusive: bool = False) -> str:
+    """
+    Filtre PostgREST (or_) des lignes situées après le curseur dans l'ordre
+    created_at DESC, id DESC ; inclusive garde aussi la ligne du curseur.
+    """
+    id_operator = "lte" if inclusive else "lt"
+    return f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.{id_operator}."{row_id}")'
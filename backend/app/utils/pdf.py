@@ -1,70 +1,229 @@
-# app/utils/pdf_utils.py
+# app/utils/pdf.py
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from functools import lru_cache
+from io import BytesIO
+from typing import Iterable, List, NamedTuple, Optional
+
+from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
 from reportlab.lib.units import cm
-from reportlab.lib import colors
-from reportlab.platypus import Table, TableStyle
-import requests
-from io import BytesIO
-from PIL import Image as PILImage
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase.pdfdoc import PDFFormXObject
+from reportlab.pdfgen import canvas
 
-def generate_summary_pdf(image_url: str, ai_results: dict, output_path: str):
-    """
-    Génère un PDF résumé avec :
-    - l'image du levé topographique
-    - les résultats IA sous forme de tableau
-    """
-    # Créer le canvas
-    c = canvas.Canvas(output_path, pagesize=A4)
+from .zone_layers import ZONE_LAYERS
+
+# "combined" : un seul résumé multi-pages par PDF uploadé ; "per_page" : un résumé par page
+SUMMARY_MODE = os.getenv("SUMMARY_MODE", "combined")
+# Dossier temporaire des pages en attente du résumé combiné
+SUMMARY_SPOOL_DIR = os.getenv("SUMMARY_SPOOL_DIR", os.path.join(tempfile.gettempdir(), "ayikungban_summaries"))
+
+_TEMPLATE_FORM = "summary_template"
+
+
+class SummaryPage(NamedTuple):
+    """Une page du résumé : l'image est fournie en mémoire ou via un fichier local."""
+    page_number: Optional[int]
+    image_id: str
+    zones: dict
+    image_data: Optional[bytes] = None
+    image_path: Optional[str] = None
+    parcels_count: int = 0
+    parcels_area: float = 0.0
+
+
+class SummaryLayout(NamedTuple):
+    width: float
+    height: float
+    image_box: tuple          # x, y, largeur, hauteur
+    table_left: float
+    table_top: float
+    row_height: float
+    col_widths: tuple
+    value_x: float
+
+
+@lru_cache(maxsize=1)
+def summary_layout() -> SummaryLayout:
+    """Géométrie de la page, calculée une fois par processus."""
     width, height = A4
+    margin = 2 * cm
+    image_box = (margin, height / 2 - 1 * cm, width - 2 * margin, height / 2 - 2.5 * cm)
+    table_left = margin
+    table_top = height / 2 - 1.8 * cm
+    col_widths = ((width - 2 * margin) * 0.6, (width - 2 * margin) * 0.4)
+    return SummaryLayout(
+        width=width,
+        height=height,
+        image_box=image_box,
+        table_left=table_left,
+        table_top=table_top,
+        row_height=0.6 * cm,
+        col_widths=col_widths,
+        value_x=table_left + col_widths[0] + col_widths[1] / 2,
+    )
+
 
-    # Titre
+def _draw_template(c: canvas.Canvas, layout: SummaryLayout):
+    """
+    Partie statique (titre, squelette du tableau et noms des couches), enregistrée
+    comme formulaire PDF référencé par chaque page.
+    """
+    c.beginForm(_TEMPLATE_FORM)
     c.setFont("Helvetica-Bold", 16)
-    c.drawCentredString(width / 2, height - 2*cm, "Résumé de l'analyse de l'image")
-
-    # Télécharger l'image depuis l'URL
-    response = requests.get(image_url)
-    if response.status_code != 200:
-        raise Exception(f"Impossible de récupérer l'image depuis {image_url}")
-    
-    img_bytes = BytesIO(response.content)
-    img = PILImage.open(img_bytes)
-
-    # Redimensionner l'image si elle est trop grande
-    max_width = width - 4*cm
-    max_height = height / 2
-    img_width, img_height = img.size
-    ratio = min(max_width / img_width, max_height / img_height)
-    img_width = img_width * ratio
-    img_height = img_height * ratio
-
-    # Placer l'image dans le PDF
-    c.drawInlineImage(img, (width - img_width)/2, height - img_height - 4*cm, img_width, img_height)
-
-    # Préparer le tableau des résultats IA
-    table_data = [["Champ", "Résultat"]]
-    for key, value in ai_results.items():
-        table_data.append([key, value])
-
-    # Créer le tableau
-    table = Table(table_data, colWidths=[width/2 - 2*cm]*2)
-    style = TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.gray),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.white),
-        ("GRID", (0,0), (-1,-1), 0.5, colors.black),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("ALIGN", (0,0), (-1,-1), "CENTER"),
-        ("VALIGN", (0,0), (-1,-1), "MIDDLE"),
-    ])
-    table.setStyle(style)
-
-    # Placer le tableau
-    table.wrapOn(c, width - 4*cm, height)
-    table.drawOn(c, 2*cm, height - img_height - 8*cm)
-
-    # Footer
+    c.drawCentredString(layout.width / 2, layout.height - 1.5 * cm, "Résumé de l'analyse du levé")
+
+    rows = len(ZONE_LAYERS) + 1
+    left, top, row_height = layout.table_left, layout.table_top, layout.row_height
+    table_width = sum(layout.col_widths)
+
+    c.setFillColor(colors.gray)
+    c.rect(left, top - row_height, table_width, row_height, stroke=0, fill=1)
+    c.setFillColor(colors.white)
+    c.setFont("Helvetica-Bold", 10)
+    c.drawCentredString(left + layout.col_widths[0] / 2, top - row_height + 0.18 * cm, "Couche")
+    c.drawCentredString(layout.value_x, top - row_height + 0.18 * cm, "Résultat")
+
+    c.setFillColor(colors.black)
+    c.setFont("Helvetica", 10)
+    for index, name in enumerate(ZONE_LAYERS, start=1):
+        c.drawString(left + 0.2 * cm, top - (index + 1) * row_height + 0.18 * cm, name)
+
+    c.setLineWidth(0.5)
+    for row in range(rows + 1):
+        c.line(left, top - row * row_height, left + table_width, top - row * row_height)
+    for x in (left, left + layout.col_widths[0], left + table_width):
+        c.line(x, top, x, top - rows * row_height)
+    c.endForm()
+
+
+@lru_cache(maxsize=1)
+def _template_form(layout: SummaryLayout):
+    """
+    Flux du formulaire rendu une fois par processus sur un canevas de travail,
+    avec la correspondance police -> nom interne (/F1...) qu'il utilise.
+    """
+    c = canvas.Canvas(BytesIO(), pagesize=A4)
+    _draw_template(c, layout)
+    form = c._doc.idToObject[f"FormXob.{_TEMPLATE_FORM}"]
+    return form.stream, tuple(c._doc.fontMapping.items())
+
+
+def _add_template(c: canvas.Canvas, layout: SummaryLayout):
+    """Ajoute le formulaire au document à partir du flux en cache."""
+    stream, fonts = _template_form(layout)
+    for font, internal_name in fonts:
+        if c._doc.getInternalFontName(font) != internal_name:
+            # Polices déjà numérotées autrement dans ce document : flux inutilisable
+            _draw_template(c, layout)
+            return
+    width, height = c._pagesize
+    form = PDFFormXObject(lowerx=0, lowery=0, upperx=width, uppery=height)
+    form.compression = c._pageCompression
+    form.stream = stream
+    c._doc.addForm(_TEMPLATE_FORM, form)
+
+
+def _draw_page(c: canvas.Canvas, layout: SummaryLayout, page: SummaryPage, generated_at: str):
+    c.doForm(_TEMPLATE_FORM)
+
+    c.setFont("Helvetica", 10)
+    label = f"Page {page.page_number} - " if page.page_number else ""
+    c.drawCentredString(layout.width / 2, layout.height - 2.2 * cm, f"{label}Image {page.image_id}")
+
+    x, y, box_width, box_height = layout.image_box
+    image_source = BytesIO(page.image_data) if page.image_data else page.image_path
+    if image_source:
+        c.drawImage(ImageReader(image_source), x, y, box_width, box_height,
+                    preserveAspectRatio=True, anchor="c")
+    else:
+        c.drawCentredString(layout.width / 2, y + box_height / 2, "Page déjà analysée (image non reproduite)")
+
+    c.setFont("Helvetica-Bold", 10)
+    for index, name in enumerate(ZONE_LAYERS, start=1):
+        value = page.zones.get(name, "-")
+        c.setFillColor(colors.red if value == "OUI" else colors.black)
+        c.drawCentredString(layout.value_x, layout.table_top - (index + 1) * layout.row_height + 0.18 * cm, str(value))
+    c.setFillColor(colors.black)
+
     c.setFont("Helvetica", 10)
-    c.drawString(2*cm, 1*cm, f"PDF généré le : {datetime.utcnow().isoformat()} UTC")
+    bottom = layout.table_top - (len(ZONE_LAYERS) + 2) * layout.row_height
+    if page.parcels_count:
+        c.drawString(layout.table_left, bottom - 0.4 * cm,
+                     f"Parcelles : {page.parcels_count} - surface totale : {page.parcels_area:.2f}")
+    c.drawString(layout.table_left, 1 * cm, f"PDF généré le : {generated_at} UTC")
+    c.showPage()
+
 
-    # Sauvegarder le PDF
+def render_summary(pages: Iterable[SummaryPage]) -> bytes:
+    """
+    Résumé PDF d'une ou plusieurs pages, généré en mémoire.
+    Les pages sont dessinées une à une : les images lues depuis un fichier ne
+    sont chargées qu'au moment de leur page.
+    """
+    layout = summary_layout()
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4, pageCompression=1)
+    _add_template(c, layout)
+    generated_at = datetime.utcnow().replace(microsecond=0).isoformat()
+    for page in pages:
+        _draw_page(c, layout, page, generated_at)
     c.save()
+    return buffer.getvalue()
+
+
+def render_page_summary(zones: dict, image_data: bytes, image_id: str) -> bytes:
+    """Résumé d'une seule page (mode per_page)."""
+    return render_summary([SummaryPage(None, image_id, zones, image_data=image_data)])
+
+
+class SummaryCollector:
+    """
+    Pages d'un PDF en attente du résumé combiné : les images sont écrites dans
+    un dossier temporaire au fil de l'eau, le rendu final les relit une à une.
+    """
+
+    def __init__(self, pdf_id: str, spool_dir: str = SUMMARY_SPOOL_DIR):
+        self.pdf_id = pdf_id
+        self.directory = os.path.join(spool_dir, pdf_id)
+        self._pages: List[SummaryPage] = []
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    async def add(self, page_number: int, image_id: str, zones: dict, image_data: Optional[bytes] = None,
+                  parcels_count: int = 0, parcels_area: float = 0.0):
+        image_path = None
+        if image_data:
+            image_path = os.path.join(self.directory, f"{page_number}_{image_id}")
+            await asyncio.to_thread(self._write, image_path, image_data)
+        self._pages.append(SummaryPage(
+            page_number, image_id, zones, image_path=image_path,
+            parcels_count=parcels_count, parcels_area=parcels_area
+        ))
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def pages(self) -> List[SummaryPage]:
+        return sorted(self._pages, key=lambda page: page.page_number or 0)
+
+    def image_ids(self) -> List[str]:
+        return [page.image_id for page in self._pages]
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def zones_from_row(zones_result) -> dict:
+    """zones_result tel que stocké en base (JSON avec original_pdf_url) -> indicateurs des couches."""
+    zones = json.loads(zones_result) if isinstance(zones_result, str) else dict(zones_result or {})
+    zones.pop("original_pdf_url", None)
+    return zones
@@ -0,0 +1,88 @@
+# app/utils/pdf_raster.py
+import asyncio
+import os
+import re
+import tempfile
+from typing import AsyncIterator, Optional, Tuple
+
+from pdf2image import convert_from_path, pdfinfo_from_path
+from PIL import Image as PILImage
+
+from .metrics import stage_timer
+
+# Résolution de rendu par défaut et taille maximale (en pixels) du plus grand côté d'une page
+PDF_RASTER_DPI = int(os.getenv("PDF_RASTER_DPI", 100))
+PDF_RASTER_MAX_SIZE = int(os.getenv("PDF_RASTER_MAX_SIZE", 4000))
+
+
+def get_pdf_info(pdf_path: str) -> dict:
+    """Lit le nombre de pages et la taille de page (en points) sans rasteriser."""
+    return pdfinfo_from_path(pdf_path)
+
+
+def effective_dpi(info: dict, dpi: int = PDF_RASTER_DPI, max_size: Optional[int] = PDF_RASTER_MAX_SIZE) -> int:
+    """
+    Réduit le DPI pour que le plus grand côté de la page ne dépasse pas max_size pixels.
+    La taille de page provient de pdfinfo ("612 x 792 pts").
+    """
+    if not max_size:
+        return dpi
+    match = re.match(r"([\d.]+) x ([\d.]+)", str(info.get("Page size", "")))
+    if not match:
+        return dpi
+    longest_pts = max(float(match.group(1)), float(match.group(2)))
+    if longest_pts <= 0:
+        return dpi
+    max_dpi = int(max_size * 72 / longest_pts)
+    return max(1, min(dpi, max_dpi))
+
+
+def render_page(pdf_path: str, page_number: int, dpi: int) -> PILImage.Image:
+    """Rasterise une seule page (numérotée à partir de 1)."""
+    pages = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    return pages[0]
+
+
+async def iter_pdf_pages_from_path(
+    pdf_path: str,
+    dpi: int = PDF_RASTER_DPI,
+    max_size: Optional[int] = PDF_RASTER_MAX_SIZE,
+) -> AsyncIterator[Tuple[int, int, PILImage.Image]]:
+    """
+    Rasterise le PDF page par page et produit (numéro de page, nombre total de pages, image).
+
+    Une seule page est en mémoire à la fois : l'image est fermée dès que
+    l'appelant demande la suivante, la mémoire reste donc constante quel que
+    soit le nombre de pages.
+    """
+    loop = asyncio.get_running_loop()
+    info = await loop.run_in_executor(None, get_pdf_info, pdf_path)
+    total_pages = int(info.get("Pages", 0))
+    dpi = effective_dpi(info, dpi, max_size)
+
+    for page_number in range(1, total_pages + 1):
+        with stage_timer("rasterize"):
+            image = await loop.run_in_executor(None, render_page, pdf_path, page_number, dpi)
+        try:
+            yield page_number, total_pages, image
+        finally:
+            image.close()
+
+
+async def iter_pdf_pages(
+    file_content: bytes,
+    dpi: int = PDF_RASTER_DPI,
+    max_size: Optional[int] = PDF_RASTER_MAX_SIZE,
+) -> AsyncIterator[Tuple[int, int, PILImage.Image]]:
+    """
+    Variante à partir des octets du PDF : le fichier est écrit une seule fois
+    sur disque puis rasterisé page par page.
+    """
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(file_content)
+        async for page in iter_pdf_pages_from_path(pdf_path, dpi, max_size):
+            yield page
+    finally:
+        os.remove(pdf_path)
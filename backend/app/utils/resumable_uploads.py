@@ -0,0 +1,164 @@
+# app/utils/resumable_uploads.py
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+# Uploads reprenables (style TUS) : données partielles et métadonnées sur disque local
+RESUMABLE_UPLOAD_DIR = os.getenv(
+    "RESUMABLE_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "ayikungban_uploads")
+)
+# Durée de vie d'un upload non finalisé (secondes)
+RESUMABLE_UPLOAD_TTL = int(os.getenv("RESUMABLE_UPLOAD_TTL", 24 * 3600))
+
+
+class OffsetMismatch(Exception):
+    """Le client envoie un bloc à un offset différent de celui reçu par le serveur."""
+
+
+class ResumableUploadStore:
+    """
+    Un upload = <id>.part (octets reçus) + <id>.json (propriétaire, taille annoncée,
+    expiration). L'offset courant est la taille de <id>.part : un bloc interrompu
+    garde ce qui a été écrit et le client reprend à partir de là.
+
+    Le SHA-256 est calculé au fil des blocs ; il n'est recalculé en relisant le
+    fichier que si le processus a redémarré entre-temps.
+    """
+
+    def __init__(self, directory: str = RESUMABLE_UPLOAD_DIR, ttl: int = RESUMABLE_UPLOAD_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        self._digests: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _data_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.part")
+
+    def _meta_path(self, upload_id: str) -> str:
+        return os.path.join(self.directory, f"{upload_id}.json")
+
+    def lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    def _write_meta(self, upload: dict):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._meta_path(upload["id"]) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(upload, f)
+        os.replace(tmp_path, self._meta_path(upload["id"]))
+
+    def _read_meta(self, upload_id: str) -> Optional[dict]:
+        try:
+            with open(self._meta_path(upload_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def offset(self, upload_id: str) -> int:
+        try:
+            return os.path.getsize(self._data_path(upload_id))
+        except FileNotFoundError:
+            return 0
+
+    def create(self, user_id: str, length: int, filename: Optional[str] = None) -> dict:
+        self.cleanup_expired()
+        upload = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "length": length,
+            "filename": filename,
+            "expires_at": time.time() + self.ttl,
+        }
+        self._write_meta(upload)
+        open(self._data_path(upload["id"]), "wb").close()
+        self._digests[upload["id"]] = (0, hashlib.sha256())
+        return {**upload, "offset": 0}
+
+    def get(self, upload_id: str, user_id: str) -> Optional[dict]:
+        """L'upload s'il existe, n'a pas expiré et appartient à l'utilisateur."""
+        try:
+            uuid.UUID(upload_id)
+        except ValueError:
+            return None
+        upload = self._read_meta(upload_id)
+        if upload is None or upload["user_id"] != user_id or upload["expires_at"] < time.time():
+            return None
+        return {**upload, "offset": self.offset(upload_id)}
+
+    async def append(self, upload: dict, offset: int, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Ajoute les blocs reçus à partir de offset, sans dépasser la taille annoncée.
+        Retourne le nouvel offset (aussi en cas d'interruption : ce qui est écrit est gardé).
+        """
+        upload_id = upload["id"]
+        current = self.offset(upload_id)
+        if offset != current:
+            raise OffsetMismatch(current)
+
+        hashed_offset, digest = self._digests.get(upload_id, (-1, None))
+        if hashed_offset != current:
+            digest = None
+        with open(self._data_path(upload_id), "ab") as f:
+            try:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if current + len(chunk) > upload["length"]:
+                        raise ValueError("Données au-delà de la taille annoncée")
+                    await asyncio.to_thread(f.write, chunk)
+                    current += len(chunk)
+                    if digest is not None:
+                        digest.update(chunk)
+            finally:
+                await asyncio.to_thread(f.flush)
+                if digest is not None:
+                    self._digests[upload_id] = (current, digest)
+        return current
+
+    def sha256(self, upload_id: str) -> str:
+        """Empreinte du fichier complet (relu seulement si l'état en mémoire est perdu)."""
+        offset = self.offset(upload_id)
+        hashed_offset, digest = self._digests.get(upload_id, (-1, None))
+        if digest is not None and hashed_offset == offset:
+            return digest.hexdigest()
+        digest = hashlib.sha256()
+        with open(self._data_path(upload_id), "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def read_head(self, upload_id: str, size: int = 1024) -> bytes:
+        with open(self._data_path(upload_id), "rb") as f:
+            return f.read(size)
+
+    def move_data(self, upload_id: str, dest_path: str):
+        """Déplace le fichier complet (même disque : simple renommage)."""
+        os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+        os.replace(self._data_path(upload_id), dest_path)
+
+    def remove(self, upload_id: str):
+        for path in (self._data_path(upload_id), self._meta_path(upload_id)):
+            if os.path.exists(path):
+                os.remove(path)
+        self._digests.pop(upload_id, None)
+        self._locks.pop(upload_id, None)
+
+    def cleanup_expired(self):
+        if not os.path.isdir(self.directory):
+            return
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            upload_id = name[:-len(".json")]
+            upload = self._read_meta(upload_id)
+            if upload is None or upload["expires_at"] < now:
+                self.remove(upload_id)
+
+
+resumable_uploads = ResumableUploadStore()
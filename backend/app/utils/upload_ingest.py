@@ -0,0 +1,204 @@
+# app/utils/upload_ingest.py
+import asyncio
+import hashlib
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException, Request
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from .pdf_raster import get_pdf_info
+
+# Taille maximale d'un PDF uploadé (octets) et nombre maximal de pages
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))
+MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", 500))
+# Taille des blocs écrits dans le spool (les données reçues sont regroupées jusque-là)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", 1024 * 1024))
+# Marge pour les en-têtes et délimiteurs multipart dans le Content-Length annoncé
+_MULTIPART_OVERHEAD = 64 * 1024
+
+# L'en-tête %PDF- doit apparaître dans le premier kilo-octet du fichier
+_PDF_HEADER = b"%PDF-"
+_PDF_HEADER_WINDOW = 1024
+
+
+class SpooledPdf(NamedTuple):
+    path: str
+    size: int
+    content_hash: str
+    total_pages: int
+
+
+def _remove(path: str):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _count_pages(path: str) -> int:
+    try:
+        return int(get_pdf_info(path).get("Pages", 0))
+    except Exception:
+        return 0
+
+
+def check_pdf_header(first_bytes: bytes):
+    if _PDF_HEADER not in first_bytes[:_PDF_HEADER_WINDOW]:
+        raise HTTPException(status_code=400, detail="Le fichier n'est pas un PDF valide")
+
+
+def check_upload_size(size: int, max_size: int = MAX_UPLOAD_SIZE):
+    if size > max_size:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Fichier trop volumineux (maximum {max_size // (1024 * 1024)} Mo)"
+        )
+
+
+async def check_pdf_pages(path: str, max_pages: int = MAX_PDF_PAGES) -> int:
+    """Nombre de pages du PDF complet, ou 400 / 413 s'il est illisible ou trop long."""
+    total_pages = await asyncio.to_thread(_count_pages, path)
+    if total_pages == 0:
+        raise HTTPException(status_code=400, detail="PDF illisible ou sans page")
+    if total_pages > max_pages:
+        raise HTTPException(status_code=413, detail=f"Trop de pages (maximum {max_pages})")
+    return total_pages
+
+
+class _FilePartEvents:
+    """
+    Callbacks du parseur multipart : ne garde que la partie du champ field, sous
+    forme d'événements ("begin", content_type), ("data", octets), ("end", None)
+    consommés par spool_upload entre deux blocs reçus.
+    """
+
+    def __init__(self, field: str):
+        self.field = field.encode()
+        self.events: List[Tuple[str, Optional[bytes]]] = []
+        self._in_field = False
+        self._headers = {}
+        self._header_field = b""
+        self._header_value = b""
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._part_begin,
+            "on_header_field": self._header_field_data,
+            "on_header_value": self._header_value_data,
+            "on_header_end": self._header_end,
+            "on_headers_finished": self._headers_finished,
+            "on_part_data": self._part_data,
+            "on_part_end": self._part_end,
+        }
+
+    def drain(self) -> List[Tuple[str, Optional[bytes]]]:
+        events, self.events = self.events, []
+        return events
+
+    def _part_begin(self):
+        self._headers = {}
+
+    def _header_field_data(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _header_value_data(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = self._header_value = b""
+
+    def _headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        self._in_field = options.get(b"name") == self.field
+        if self._in_field:
+            content_type, _ = parse_options_header(self._headers.get(b"content-type", b""))
+            self.events.append(("begin", content_type))
+
+    def _part_data(self, data: bytes, start: int, end: int):
+        if self._in_field:
+            self.events.append(("data", data[start:end]))
+
+    def _part_end(self):
+        if self._in_field:
+            self.events.append(("end", None))
+            self._in_field = False
+
+
+def _multipart_boundary(request: Request) -> bytes:
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or not options.get(b"boundary"):
+        raise HTTPException(status_code=400, detail="Corps multipart/form-data attendu")
+    return options[b"boundary"]
+
+
+def check_request_size(request: Request, max_size: int = MAX_UPLOAD_SIZE):
+    """Refus (413) sur le Content-Length annoncé, avant de lire le corps."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        check_upload_size(int(content_length) - _MULTIPART_OVERHEAD, max_size)
+
+
+async def spool_upload(request: Request, dest_path: str, field: str = "file",
+                       max_size: int = MAX_UPLOAD_SIZE, max_pages: int = MAX_PDF_PAGES) -> SpooledPdf:
+    """
+    Lit le corps multipart au fil de sa réception (request.stream()) et copie la
+    partie field dans dest_path en calculant son SHA-256 : un seul passage sur
+    disque, sans le fichier temporaire de Starlette ni le fichier entier en mémoire.
+    Le type de la partie, l'en-tête PDF et la taille sont vérifiés dès leur arrivée
+    (400 / 413) et la lecture s'arrête aussitôt ; le nombre de pages l'est à la fin.
+    Le fichier partiel est supprimé en cas de refus.
+    """
+    parts = _FilePartEvents(field)
+    parser = MultipartParser(_multipart_boundary(request), parts.callbacks())
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    part_path = f"{dest_path}.part"
+    digest = hashlib.sha256()
+    size = 0
+    head = b""
+    buffer = bytearray()
+    found = finished = False
+    try:
+        with open(part_path, "wb") as f:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                for kind, value in parts.drain():
+                    if kind == "begin":
+                        if value != b"application/pdf":
+                            raise HTTPException(status_code=400, detail="Le fichier doit être un PDF")
+                        found = True
+                    elif kind == "data":
+                        if len(head) < _PDF_HEADER_WINDOW:
+                            head += value[:_PDF_HEADER_WINDOW - len(head)]
+                            if len(head) >= _PDF_HEADER_WINDOW:
+                                check_pdf_header(head)
+                        size += len(value)
+                        check_upload_size(size, max_size)
+                        digest.update(value)
+                        buffer += value
+                        if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                            await asyncio.to_thread(f.write, bytes(buffer))
+                            buffer.clear()
+                    else:
+                        finished = True
+                if finished:
+                    # Les champs suivants éventuels ne sont pas lus
+                    break
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+
+        if not found:
+            raise HTTPException(status_code=400, detail=f"Champ '{field}' manquant")
+        if not finished:
+            raise HTTPException(status_code=400, detail="Upload interrompu")
+        if size == 0:
+            raise HTTPException(status_code=400, detail="Fichier vide")
+        if len(head) < _PDF_HEADER_WINDOW:
+            check_pdf_header(head)
+
+        total_pages = await check_pdf_pages(part_path, max_pages)
+
+        os.replace(part_path, dest_path)
+        return SpooledPdf(dest_path, size, digest.hexdigest(), total_pages)
+    except BaseException:
+        await asyncio.to_thread(_remove, part_path)
+        raise
@@ -1,14 +1,17 @@
-from app.config.supabase_connection import db
+from app.repositories.users_repository import users_repository
+from app.utils.auth_cache import principal_cache, JWT_EMBED_CLAIMS
 from datetime import datetime
-from fastapi import HTTPException, Depends
+from fastapi import HTTPException, Depends, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
 import os
+from typing import Optional
 
 # Schéma d'authentification Bearer
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
-def create_user_if_not_exists(npi, phone_number, first_name, last_name, sex, date_of_birth, email, address, profession):
+async def create_user_if_not_exists(npi, phone_number, first_name, last_name, sex, date_of_birth, email, address, profession):
     """
     Crée un utilisateur dans Supabase s'il n'existe pas déjà
     """
@@ -19,11 +22,11 @@ def create_user_if_not_exists(npi, phone_number, first_name, last_name, sex, dat
         logging.info(f"Vérification de l'existence de l'utilisateur avec NPI: {npi}")
         
         # Vérifier si l'utilisateur existe déjà - SYNTAXE SUPABASE
-        existing_user = db.table("users").select("*").eq("npi", npi).limit(1).execute()
+        existing_user = await users_repository.get_by_npi(npi)
         
-        if existing_user.data and len(existing_user.data) > 0:
+        if existing_user:
             # L'utilisateur existe déjà, retourner son ID
-            user_id = existing_user.data[0]["id"]
+            user_id = existing_user["id"]
             logging.info(f"Utilisateur existant trouvé avec ID: {user_id}")
             return user_id
         
@@ -47,9 +50,9 @@ def create_user_if_not_exists(npi, phone_number, first_name, last_name, sex, dat
         }
         
         # Insérer dans la base de données - SYNTAXE SUPABASE
-        result = db.table("users").insert(user_data).execute()
+        created = await users_repository.insert(user_data)
         
-        if not result.data:
+        if not created:
             logging.error(f"Échec de la création de l'utilisateur pour NPI: {npi}")
             raise HTTPException(status_code=500, detail="Erreur lors de la création de l'utilisateur")
         
@@ -62,17 +65,37 @@ def create_user_if_not_exists(npi, phone_number, first_name, last_name, sex, dat
         logging.error(f"Erreur create_user_if_not_exists: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur base de données: {str(e)}")
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """
     Récupère l'utilisateur actuel à partir du token JWT dans l'en-tête Authorization
     """
+    # Récupérer le token depuis les credentials
+    return await authenticate_token(credentials.credentials)
+
+async def get_current_user_from_query(
+    token: Optional[str] = Query(None),
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+):
+    """
+    Variante pour EventSource / WebSocket, qui ne peuvent pas toujours envoyer
+    d'en-tête Authorization : le token peut aussi être passé en ?token=
+    """
+    if credentials:
+        return await authenticate_token(credentials.credentials)
+    if token:
+        return await authenticate_token(token)
+    raise HTTPException(
+        status_code=401,
+        detail="Not authenticated",
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+async def authenticate_token(token: str) -> dict:
+    """Vérifie le token JWT et retourne l'utilisateur correspondant"""
     SECRET_KEY = os.getenv("SECRET_KEY")
     ALGORITHM = os.getenv("ALGORITHM", "HS256")
     
     try:
-        # Récupérer le token depuis les credentials
-        token = credentials.credentials
-        
         # Décoder le token
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
@@ -84,18 +107,28 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
                 headers={"WWW-Authenticate": "Bearer"}
             )
         
-        # Récupérer l'utilisateur depuis la base - SYNTAXE SUPABASE
-        user_result = db.table("users").select("*").eq("id", user_id).limit(1).execute()
-        
-        if not user_result.data or len(user_result.data) == 0:
-            raise HTTPException(
-                status_code=401,
-                detail="Utilisateur introuvable",
-                headers={"WWW-Authenticate": "Bearer"}
-            )
+        # Token avec informations embarquées : aucune requête en base
+        claims = payload.get("claims")
+        if JWT_EMBED_CLAIMS and claims:
+            return {"user_id": user_id, "id": user_id, **claims}
+
+        # Sinon, cache local avant de récupérer l'utilisateur depuis la base
+        user = principal_cache.get(user_id)
+        if user is None:
+            user = await users_repository.get_by_id(user_id)
+            
+            if not user:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Utilisateur introuvable",
+                    headers={"WWW-Authenticate": "Bearer"}
+                )
+            principal_cache.set(user_id, user)
         
-        return {"user_id": user_id, **user_result.data[0]}
+        return {"user_id": user_id, **user}
         
+    except HTTPException:
+        raise
     except JWTError:
         raise HTTPException(
             status_code=401,
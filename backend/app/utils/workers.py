@@ -0,0 +1,34 @@
+# app/utils/workers.py
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+# Nombre de pages d'un même PDF traitées simultanément
+PAGE_CONCURRENCY = int(os.getenv("PAGE_CONCURRENCY", 4))
+# Nombre de processus pour les étapes CPU (encodage, modèles, PDF de résumé)
+PROCESS_POOL_WORKERS = int(os.getenv("PROCESS_POOL_WORKERS", os.cpu_count() or 2))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Pool de processus partagé, créé au premier usage."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+    return _process_pool
+
+
+async def run_cpu(fn, *args, **kwargs):
+    """Exécute une fonction CPU dans le pool de processus sans bloquer la boucle."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), partial(fn, *args, **kwargs))
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
@@ -0,0 +1,175 @@
+# app/utils/zone_layers.py
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+import shapely
+from shapely import STRtree
+
+from .geometry import ParcelSet
+
+# Les 13 couches cadastrales, dans l'ordre des colonnes de la matrice de résultats
+ZONE_LAYERS = (
+    "air",
+    "air_proteges",
+    "dpl",
+    "dpm",
+    "enregistrement_personnel",
+    "litige",
+    "parcelles",
+    "restriction",
+    "tf_demande",
+    "tf_en_cours",
+    "tf_etat",
+    "titre_reconstitue",
+    "zone_inondable",
+)
+
+# Dossier contenant un fichier <couche>.geojson par couche (même système de coordonnées que les parcelles)
+LAYERS_DIR = Path(os.getenv("LAYERS_DIR", Path(__file__).parent.parent / "layers"))
+LAYER_INDEX_CACHE = LAYERS_DIR / ".layer_index.npz"
+
+
+def _read_geojson(path: Path) -> np.ndarray:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    features = data.get("features", [data])
+    geometries = [json.dumps(feature.get("geometry", feature)) for feature in features]
+    return shapely.from_geojson(geometries)
+
+
+class LayerIndex:
+    """
+    Index spatial unique (STRtree) de toutes les géométries des couches.
+
+    Chaque géométrie garde le numéro de sa couche : une seule requête
+    vectorisée donne les 13 indicateurs pour tout un lot de parcelles.
+    Les géométries sont mises en cache sur disque en WKB pour éviter de
+    re-parser le GeoJSON à chaque démarrage.
+    """
+
+    def __init__(self, layers_dir: Path = LAYERS_DIR, cache_path: Path = LAYER_INDEX_CACHE):
+        self._layers_dir = Path(layers_dir)
+        self._cache_path = Path(cache_path)
+        self._tree: Optional[STRtree] = None
+        self._layer_ids: Optional[np.ndarray] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        self.load()
+        return self._tree is not None
+
+    def _source_files(self) -> List[Path]:
+        return [self._layers_dir / f"{name}.geojson" for name in ZONE_LAYERS]
+
+    def _signature(self) -> np.ndarray:
+        """mtime de chaque fichier source (0 si absent), pour invalider le cache."""
+        return np.array([
+            path.stat().st_mtime if path.exists() else 0.0 for path in self._source_files()
+        ])
+
+    def _load_from_cache(self, signature: np.ndarray):
+        if not self._cache_path.exists():
+            return None
+        with np.load(self._cache_path, allow_pickle=False) as cache:
+            if not np.array_equal(cache["signature"], signature):
+                return None
+            buffer = cache["wkb"].tobytes()
+            offsets = cache["offsets"]
+            wkb = [buffer[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
+            return shapely.from_wkb(wkb), cache["layer_ids"]
+
+    def _load_from_sources(self):
+        geometries, layer_ids = [], []
+        for layer_id, path in enumerate(self._source_files()):
+            if not path.exists():
+                continue
+            layer_geometries = _read_geojson(path)
+            geometries.append(layer_geometries)
+            layer_ids.append(np.full(len(layer_geometries), layer_id, dtype=np.int16))
+        if not geometries:
+            return np.empty(0, dtype=object), np.empty(0, dtype=np.int16)
+        return np.concatenate(geometries), np.concatenate(layer_ids)
+
+    def _save_cache(self, signature: np.ndarray, geometries: np.ndarray, layer_ids: np.ndarray):
+        # Tous les WKB bout à bout + offsets : chargement sans pickle
+        wkb = shapely.to_wkb(geometries)
+        offsets = np.concatenate([[0], np.cumsum([len(item) for item in wkb])]).astype(np.int64)
+        buffer = np.frombuffer(b"".join(wkb), dtype=np.uint8)
+        try:
+            with open(self._cache_path, "wb") as f:
+                np.savez(f, signature=signature, wkb=buffer, offsets=offsets, layer_ids=layer_ids)
+        except OSError as e:
+            logging.warning(f"Cache de l'index des couches non écrit : {e}")
+
+    def load(self, force: bool = False):
+        if self._loaded and not force:
+            return
+        with self._lock:
+            if self._loaded and not force:
+                return
+            self._loaded = True
+            if not self._layers_dir.is_dir():
+                logging.info(f"Aucun dossier de couches ({self._layers_dir}), zones simulées")
+                return
+
+            signature = self._signature()
+            cached = self._load_from_cache(signature)
+            if cached is None:
+                geometries, layer_ids = self._load_from_sources()
+                self._save_cache(signature, geometries, layer_ids)
+            else:
+                geometries, layer_ids = cached
+
+            if len(geometries) == 0:
+                return
+            self._tree = STRtree(geometries)
+            self._layer_ids = layer_ids
+            logging.info(f"Index des couches chargé : {len(geometries)} géométries")
+
+    def flags(self, parcels: np.ndarray) -> np.ndarray:
+        """
+        Matrice booléenne (nombre de parcelles x 13) : True si la parcelle
+        intersecte au moins une géométrie de la couche.
+        """
+        self.load()
+        result = np.zeros((len(parcels), len(ZONE_LAYERS)), dtype=bool)
+        if self._tree is None or len(parcels) == 0:
+            return result
+        parcel_idx, geometry_idx = self._tree.query(parcels, predicate="intersects")
+        result[parcel_idx, self._layer_ids[geometry_idx]] = True
+        return result
+
+
+def _ring_geometry(points: np.ndarray):
+    if len(points) >= 3:
+        return shapely.make_valid(shapely.Polygon(points))
+    if len(points) == 2:
+        return shapely.LineString(points)
+    if len(points) == 1:
+        return shapely.Point(points[0])
+    return None
+
+
+def parcel_geometry(parcels: ParcelSet):
+    """Géométrie de la page : union (collection) des parcelles extraites."""
+    geometries = [_ring_geometry(parcels.ring(index)) for index in range(len(parcels))]
+    geometries = [geometry for geometry in geometries if geometry is not None]
+    if not geometries:
+        return None
+    if len(geometries) == 1:
+        return geometries[0]
+    return shapely.GeometryCollection(geometries)
+
+
+def flags_to_result(row: np.ndarray) -> dict:
+    return {name: "OUI" if flag else "NON" for name, flag in zip(ZONE_LAYERS, row)}
+
+
+layer_index = LayerIndex()
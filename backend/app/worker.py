@@ -0,0 +1,224 @@
+# app/worker.py
+"""
+Worker de traitement des PDF.
+
+    python -m app.worker                           consomme la file
+    python -m app.worker dead-letters [--limit N]  liste les tâches abandonnées
+    python -m app.worker requeue <job_id>...       les remet en file
+
+Consomme la file SQLite (utils/job_queue) et exécute le pipeline page par page,
+dans un processus distinct de l'API : la rasterisation et l'inférence ne prennent
+pas le CPU des requêtes.
+
+Un worker séparé nécessite EVENT_BUS_BACKEND=redis : la progression qu'il
+publie doit atteindre les abonnés SSE / WebSocket des processus de l'API.
+Sans Redis, JOB_WORKER_EMBEDDED vaut donc true par défaut et l'API traite
+elle-même les PDF.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import uuid
+
+from app.repositories.storage_repository import storage_repository
+from app.routes.routes_image import process_pdf_upload, resume_page_analysis
+from app.utils.component_metrics import register_component_metrics
+from app.utils.events import EVENT_BUS_BACKEND
+from app.utils.inference import inference_engine
+from app.utils.job_queue import JOB_LEASE_SECONDS, SQLiteJobQueue, job_queue
+from app.utils.logs import configure_logging
+from app.utils.metrics import JOBS_IN_FLIGHT, JOBS_TOTAL, start_metrics_server
+
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 1))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 1.0))
+# Port de GET /metrics du worker (histogrammes des étapes, tâches...) ; 0 = désactivé
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", 9101))
+# Worker intégré à l'API : par défaut seulement sans bus Redis, aucun worker séparé ne pouvant alors tourner
+JOB_WORKER_EMBEDDED = os.getenv(
+    "JOB_WORKER_EMBEDDED", "false" if EVENT_BUS_BACKEND == "redis" else "true"
+).lower() in ("1", "true", "yes")
+
+
+async def handle_process_pdf(payload: dict):
+    """
+    Tâche "process_pdf" : rasterise le PDF depuis le spool local ; s'il n'y est
+    plus (autre machine, spool purgé), il est d'abord téléchargé dans un fichier temporaire.
+    """
+    spool_path = payload.get("spool_path")
+    if spool_path and os.path.exists(spool_path):
+        await _process(payload, spool_path)
+        return
+
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        await storage_repository.download_to_file(payload["storage_path"], pdf_path)
+        await _process(payload, pdf_path)
+    finally:
+        os.remove(pdf_path)
+
+
+async def _process(payload: dict, pdf_path: str):
+    await process_pdf_upload(
+        user_id=payload["user_id"],
+        pdf_id=payload["pdf_id"],
+        pdf_path=pdf_path,
+        pdf_url=payload["pdf_url"]
+    )
+
+
+async def handle_retry_page(payload: dict):
+    """
+    Tâche "retry_page" (POST /images/{image_id}/retry) : reprend la page à sa
+    première étape non terminée. Un nouvel échec est relancé par la file, qui
+    réessaie plus tard à partir des étapes acquises entre-temps.
+    """
+    if not await resume_page_analysis(payload["user_id"], payload["image_id"]):
+        raise Exception(f"Relance de l'image {payload['image_id']} échouée")
+
+
+def _remove_spool(payload: dict):
+    spool_path = payload.get("spool_path")
+    if spool_path and os.path.exists(spool_path):
+        os.remove(spool_path)
+
+
+HANDLERS = {
+    "process_pdf": handle_process_pdf,
+    "retry_page": handle_retry_page,
+}
+
+
+async def _keep_lease(queue: SQLiteJobQueue, job_id: str, worker_id: str):
+    """Prolonge le bail tant que la tâche tourne."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await asyncio.to_thread(queue.extend_lease, job_id, worker_id)
+
+
+async def run_job(queue: SQLiteJobQueue, job: dict, worker_id: str):
+    lease_task = asyncio.create_task(_keep_lease(queue, job["id"], worker_id))
+    in_flight = JOBS_IN_FLIGHT.labels(job["kind"])
+    in_flight.inc()
+    try:
+        handler = HANDLERS[job["kind"]]
+        await handler(job["payload"])
+    except Exception as e:
+        status = await asyncio.to_thread(queue.nack, job["id"], worker_id, str(e))
+        JOBS_TOTAL.labels(job["kind"], "retry" if status == "queued" else status).inc()
+        logging.error(f"Tâche {job['id']} échouée (essai {job['attempts']}) : {e} -> {status}",
+                      extra={"job_id": job["id"], "kind": job["kind"], "attempts": job["attempts"]})
+        if status == "dead":
+            _remove_spool(job["payload"])
+    else:
+        if await asyncio.to_thread(queue.ack, job["id"], worker_id):
+            _remove_spool(job["payload"])
+            JOBS_TOTAL.labels(job["kind"], "done").inc()
+            logging.info(f"Tâche {job['id']} terminée", extra={"job_id": job["id"], "kind": job["kind"]})
+        else:
+            # Bail expiré et tâche reprise par un autre worker : c'est lui qui la clôturera
+            JOBS_TOTAL.labels(job["kind"], "lost").inc()
+            logging.warning(f"Tâche {job['id']} terminée après perte du bail",
+                            extra={"job_id": job["id"], "kind": job["kind"]})
+    finally:
+        in_flight.dec()
+        lease_task.cancel()
+
+
+async def worker_loop(queue: SQLiteJobQueue, worker_id: str, stop_event: asyncio.Event):
+    while not stop_event.is_set():
+        job = await asyncio.to_thread(queue.claim, worker_id)
+        if job is None:
+            try:
+                await asyncio.wait_for(stop_event.wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        await run_job(queue, job, worker_id)
+
+
+async def run_workers(queue: SQLiteJobQueue = job_queue, concurrency: int = JOB_WORKER_CONCURRENCY,
+                      stop_event: asyncio.Event = None):
+    stop_event = stop_event or asyncio.Event()
+    worker_prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    await asyncio.gather(*[
+        worker_loop(queue, f"{worker_prefix}-{i}", stop_event) for i in range(concurrency)
+    ])
+
+
+async def main():
+    # Un worker séparé publie la progression dans son propre processus : sans bus
+    # partagé, les abonnés SSE / WebSocket de l'API ne la recevraient jamais
+    if EVENT_BUS_BACKEND != "redis":
+        raise RuntimeError("Un worker séparé nécessite EVENT_BUS_BACKEND=redis (bus partagé avec l'API)")
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    await asyncio.to_thread(inference_engine.load)
+    metrics_server = None
+    if WORKER_METRICS_PORT:
+        # Les mesures du traitement sont prises dans ce processus : l'API ne les voit pas
+        register_component_metrics()
+        metrics_server = start_metrics_server(WORKER_METRICS_PORT)
+    logging.info(f"Worker démarré ({JOB_WORKER_CONCURRENCY} tâche(s) en parallèle)")
+    try:
+        await run_workers(stop_event=stop_event)
+    finally:
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+
+def dead_letters_command(queue: SQLiteJobQueue, limit: int) -> int:
+    """Une ligne JSON par tâche en dead-letter, de la plus récente à la plus ancienne."""
+    for job in queue.dead_letters(limit):
+        print(json.dumps({
+            "id": job["id"],
+            "kind": job["kind"],
+            "attempts": job["attempts"],
+            "last_error": job["last_error"],
+            "updated_at": job["updated_at"],
+            "payload": job["payload"],
+        }, ensure_ascii=False))
+    return 0
+
+
+def requeue_command(queue: SQLiteJobQueue, job_ids) -> int:
+    """Remet les tâches en file avec leurs essais remis à zéro ; 1 si l'une n'est pas en dead-letter."""
+    status = 0
+    for job_id in job_ids:
+        if queue.requeue_dead(job_id):
+            print(f"{job_id} : remise en file")
+        else:
+            print(f"{job_id} : introuvable en dead-letter", file=sys.stderr)
+            status = 1
+    return status
+
+
+def cli(argv=None, queue: SQLiteJobQueue = job_queue) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.worker", description="Worker de traitement des PDF")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="consomme la file (par défaut)")
+    dead = commands.add_parser("dead-letters", help="liste les tâches en dead-letter")
+    dead.add_argument("--limit", type=int, default=100)
+    requeue = commands.add_parser("requeue", help="remet en file des tâches en dead-letter")
+    requeue.add_argument("job_ids", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "dead-letters":
+        return dead_letters_command(queue, args.limit)
+    if args.command == "requeue":
+        return requeue_command(queue, args.job_ids)
+    configure_logging()
+    asyncio.run(main())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
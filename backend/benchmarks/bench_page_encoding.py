@@ -0,0 +1,93 @@
+# benchmarks/bench_page_encoding.py
+"""
+Compare les formats d'encodage des pages (temps et taille par page).
+
+    python -m benchmarks.bench_page_encoding levé1.pdf levé2.pdf
+    python -m benchmarks.bench_page_encoding --synthetic 5
+
+Les PDF sont rasterisés comme dans le pipeline (PDF_RASTER_DPI) ; sans PDF,
+des pages synthétiques de levé (A4, couleur, 100 dpi) sont générées.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from PIL import Image as PILImage, ImageDraw
+
+from app.utils.page_encoding import PAGE_ENCODERS, encode_page, encode_thumbnail
+from app.utils.pdf_raster import iter_pdf_pages_from_path
+
+
+def synthetic_page(seed: int, size=(827, 1169)) -> PILImage.Image:
+    """Page A4 à 100 dpi imitant un levé : fond légèrement bruité, polygones, cotes et quadrillage."""
+    rng = random.Random(seed)
+    image = PILImage.effect_noise(size, 12).convert("RGB")
+    image = PILImage.blend(image, PILImage.new("RGB", size, (246, 242, 230)), 0.85)
+    draw = ImageDraw.Draw(image)
+    for x in range(0, size[0], 50):
+        draw.line([(x, 0), (x, size[1])], fill=(200, 210, 220))
+    for y in range(0, size[1], 50):
+        draw.line([(0, y), (size[0], y)], fill=(200, 210, 220))
+    for _ in range(6):
+        points = [(rng.randint(50, size[0] - 50), rng.randint(50, size[1] - 50)) for _ in range(rng.randint(4, 9))]
+        draw.polygon(points, outline=(rng.randint(0, 120), 0, rng.randint(0, 200)), width=3)
+        for x, y in points:
+            draw.text((x + 4, y + 4), f"{x * 1.37:.2f};{y * 0.91:.2f}", fill=(20, 20, 20))
+    return image
+
+
+async def load_pages(pdf_paths, synthetic: int):
+    pages = []
+    for pdf_path in pdf_paths:
+        async for _, _, image in iter_pdf_pages_from_path(pdf_path):
+            pages.append(image.copy())
+    pages.extend(synthetic_page(seed) for seed in range(synthetic))
+    return pages
+
+
+def bench(pages, fmt: str, repeat: int) -> dict:
+    timings, sizes = [], []
+    for page in pages:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            encoded = encode_page(page, fmt) if fmt != "thumbnail" else encode_thumbnail(page)
+            timings.append(time.perf_counter() - start)
+        sizes.append(len(encoded.data))
+    return {
+        "format": fmt,
+        "pages": len(pages),
+        "encode_ms_mean": round(statistics.mean(timings) * 1000, 2),
+        "encode_ms_max": round(max(timings) * 1000, 2),
+        "bytes_per_page": int(statistics.mean(sizes)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("pdfs", nargs="*", help="PDF de levés à rasteriser")
+    parser.add_argument("--synthetic", type=int, default=None, help="nombre de pages synthétiques")
+    parser.add_argument("--repeat", type=int, default=3, help="encodages par page et par format")
+    parser.add_argument("--formats", default=",".join([*PAGE_ENCODERS, "thumbnail"]))
+    parser.add_argument("--json", action="store_true", help="sortie JSON")
+    args = parser.parse_args()
+
+    synthetic = args.synthetic if args.synthetic is not None else (0 if args.pdfs else 5)
+    pages = asyncio.run(load_pages(args.pdfs, synthetic))
+    if not pages:
+        parser.error("aucune page à encoder")
+
+    results = [bench(pages, fmt, args.repeat) for fmt in args.formats.split(",")]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'format':<15}{'ms/page':>10}{'ms max':>10}{'octets/page':>14}")
+    for result in results:
+        print(f"{result['format']:<15}{result['encode_ms_mean']:>10}{result['encode_ms_max']:>10}{result['bytes_per_page']:>14}")
+
+
+if __name__ == "__main__":
+    main()
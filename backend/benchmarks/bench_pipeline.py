@@ -0,0 +1,436 @@
+# benchmarks/bench_pipeline.py
+"""
+Benchmark de bout en bout de l'API, en processus, contre des remplaçants
+locaux de Supabase (base + stockage) et du serveur SMTP (benchmarks/stubs.py).
+
+    pip install -r benchmarks/requirements.txt
+    python -m benchmarks.bench_pipeline --output bench.json
+    python -m benchmarks.bench_pipeline --pages 1,10 --dpi 150,300 --baseline bench.json
+
+Scénarios (latences p50 / p95 / p99, débit, pic de mémoire résidente) :
+  processing   upload puis attente de la fin du traitement, par (pages, dpi)
+  upload       acceptation d'un upload de PDF (réponse 202)
+  status       GET /images/pdf-status/{pdf_id}?pages=true
+  results      GET /results/user/all
+  otp_login    POST /auth/request-otp, lecture de l'email, POST /auth/verify-otp
+
+upload et processing nécessitent poppler (pdfinfo / pdftoppm), comme l'API.
+La sortie JSON contient le commit testé : deux fichiers se comparent avec --baseline.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from .fixtures import anip_users, seed_results, synthetic_pdf, unique_variant, write_anip_file
+from .stubs import FakePostgrest, FakeStorage, ServerThread, SmtpSink, supabase_app
+
+# Clé au format JWT attendue par le client Supabase (jamais vérifiée par le remplaçant)
+STUB_SUPABASE_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.benchmark"
+TERMINAL_STATUSES = ("completed", "partial", "failed")
+OTP_PATTERN = re.compile(r"\b(\d{6})\b")
+
+
+# --- Mesures ---
+
+def _current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux : kilo-octets ; macOS : octets
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler:
+    """Pic de mémoire résidente pendant un scénario (échantillonné, le pic global étant monotone)."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self.peak = max(self.peak, _current_rss_mb())
+            await asyncio.sleep(self.interval)
+
+    async def __aenter__(self):
+        self.peak = _current_rss_mb()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self.peak = max(self.peak, _current_rss_mb())
+
+
+def _percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors: int, elapsed: float, peak_rss: float, **extra) -> dict:
+    values = sorted(latencies)
+    return {
+        "requests": len(values) + errors,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.mean(values) * 1000, 2) if values else 0.0,
+            "p50": round(_percentile(values, 0.50) * 1000, 2),
+            "p95": round(_percentile(values, 0.95) * 1000, 2),
+            "p99": round(_percentile(values, 0.99) * 1000, 2),
+            "max": round(values[-1] * 1000, 2) if values else 0.0,
+        },
+        "peak_rss_mb": round(peak_rss, 1),
+        **extra,
+    }
+
+
+async def run_load(operation, total: int, concurrency: int, **extra) -> dict:
+    """
+    Exécute operation(index, worker) total fois avec concurrency appels simultanés.
+    operation lève une exception en cas d'échec (compté dans errors).
+    """
+    latencies, errors = [], 0
+    counter = iter(range(total))
+
+    async def worker(worker_index: int):
+        nonlocal errors
+        for index in counter:
+            start = time.perf_counter()
+            try:
+                await operation(index, worker_index)
+            except Exception as e:
+                errors += 1
+                if errors <= 3:
+                    print(f"  erreur : {e}", file=sys.stderr)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    async with RssSampler() as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return summarize(latencies, errors, elapsed, rss.peak, concurrency=concurrency, **extra)
+
+
+def _check(response, expected=(200,)):
+    if response.status_code not in expected:
+        raise RuntimeError(f"{response.request.method} {response.request.url.path} : "
+                           f"HTTP {response.status_code} {response.text[:200]}")
+    return response
+
+
+# --- Environnement ---
+
+def configure_environment(args, supabase_url: str, smtp_port: int, workdir: str):
+    """Variables lues à l'import de l'application : à poser avant tout import de app."""
+    os.environ.update({
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_KEY": STUB_SUPABASE_KEY,
+        "SECRET_KEY": "benchmark-secret",
+        "SMTP_SERVER": "127.0.0.1",
+        "SMTP_PORT": str(smtp_port),
+        "SMTP_STARTTLS": "false",
+        "SENDER_EMAIL": "bench@example.test",
+        "SENDER_PASSWORD": "",
+        "OTP_BACKEND": "memory",
+        # Le scénario processing lance lui-même ses workers (run_workers) : l'erreur de
+        # démarrage de l'API sur JOB_WORKER_EMBEDDED=false sans Redis est attendue ici
+        "JOB_WORKER_EMBEDDED": "false",
+        "JOB_QUEUE_PATH": os.path.join(workdir, "jobs.sqlite3"),
+        "JOB_QUEUE_MAX_DEPTH": "1000000",
+        "JOB_SPOOL_DIR": os.path.join(workdir, "spool"),
+        "RESUMABLE_UPLOAD_DIR": os.path.join(workdir, "uploads"),
+        "SUMMARY_SPOOL_DIR": os.path.join(workdir, "summaries"),
+        "JOB_POLL_INTERVAL": "0.05",
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "WARNING"),
+    })
+    if args.raster_dpi:
+        os.environ["PDF_RASTER_DPI"] = str(args.raster_dpi)
+
+
+def git_revision() -> dict:
+    def git(*command):
+        try:
+            return subprocess.run(["git", *command], capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+# --- Scénarios ---
+
+class Bench:
+    def __init__(self, args, client, smtp: SmtpSink, users, tokens, pdf_ids):
+        self.args = args
+        self.client = client
+        self.smtp = smtp
+        self.users = users
+        self.tokens = tokens
+        self.pdf_ids = pdf_ids
+        self.user_ids = list(tokens)
+
+    def _headers(self, index: int) -> dict:
+        return {"Authorization": f"Bearer {self.tokens[self.user_ids[index % len(self.user_ids)]]}"}
+
+    async def _upload(self, index: int, content: bytes) -> str:
+        response = _check(await self.client.post(
+            "/images/upload-pdf",
+            files={"file": (f"leve_{index}.pdf", content, "application/pdf")},
+            headers=self._headers(index),
+        ), (200, 202))
+        return response.json()["pdf_id"]
+
+    async def _wait_done(self, index: int, pdf_id: str) -> dict:
+        deadline = time.monotonic() + self.args.processing_timeout
+        while time.monotonic() < deadline:
+            status = _check(await self.client.get(f"/images/pdf-status/{pdf_id}", headers=self._headers(index))).json()
+            if status.get("status") in TERMINAL_STATUSES:
+                if status["status"] != "completed":
+                    raise RuntimeError(f"PDF {pdf_id} : {status['status']}")
+                return status
+            await asyncio.sleep(self.args.poll_interval)
+        raise TimeoutError(f"PDF {pdf_id} non terminé après {self.args.processing_timeout} s")
+
+    async def processing(self) -> dict:
+        from app.utils.metrics import STAGE_SECONDS
+        from app.worker import run_workers
+
+        results = {}
+        stop_event = asyncio.Event()
+        workers = asyncio.create_task(run_workers(concurrency=self.args.workers, stop_event=stop_event))
+        try:
+            for pages in self.args.pages:
+                for dpi in self.args.dpi:
+                    base = synthetic_pdf(pages, dpi, seed=pages * 1000 + dpi)
+                    stages_before = _stage_totals(STAGE_SECONDS)
+
+                    async def operation(index, worker, base=base, pages=pages, dpi=dpi):
+                        pdf_id = await self._upload(index, unique_variant(base, f"processing-{pages}-{dpi}-{index}"))
+                        await self._wait_done(index, pdf_id)
+
+                    result = await run_load(operation, self.args.pdfs, min(self.args.workers, self.args.pdfs),
+                                            pages=pages, dpi=dpi, pdf_bytes=len(base))
+                    result["pages_per_s"] = round(result["throughput_rps"] * pages, 2)
+                    result["stages_ms_mean"] = _stage_means(_stage_totals(STAGE_SECONDS), stages_before)
+                    results[f"processing_{pages}p_{dpi}dpi"] = result
+        finally:
+            stop_event.set()
+            await workers
+        return results
+
+    async def upload(self) -> dict:
+        base = synthetic_pdf(self.args.upload_pages, self.args.dpi[0], seed=42)
+
+        async def operation(index, worker):
+            await self._upload(index, unique_variant(base, f"upload-{index}"))
+
+        return {"upload": await run_load(operation, self.args.requests, self.args.concurrency,
+                                         pages=self.args.upload_pages, pdf_bytes=len(base))}
+
+    async def status(self) -> dict:
+        async def operation(index, worker):
+            user_id = self.user_ids[index % len(self.user_ids)]
+            pdf_id = self.pdf_ids[user_id][index % len(self.pdf_ids[user_id])]
+            _check(await self.client.get(f"/images/pdf-status/{pdf_id}", params={"pages": "true"},
+                                         headers=self._headers(index)))
+
+        return {"status": await run_load(operation, self.args.requests, self.args.concurrency)}
+
+    async def results(self) -> dict:
+        async def operation(index, worker):
+            _check(await self.client.get("/results/user/all", params={"limit": self.args.page_size},
+                                         headers=self._headers(index)))
+
+        return {"results": await run_load(operation, self.args.requests, self.args.concurrency,
+                                          page_size=self.args.page_size)}
+
+    async def otp_login(self) -> dict:
+        async def operation(index, worker):
+            # Un utilisateur par worker : deux demandes simultanées pour le même NPI s'écraseraient
+            user = self.users[worker % len(self.users)]
+            already_received = len(self.smtp.messages)
+            _check(await self.client.post("/auth/request-otp", json={"npi": user["npi"], "email": user["email"]}))
+            message = await self.smtp.wait_for(user["email"], already_received)
+            if message is None:
+                raise TimeoutError(f"Aucun email reçu pour {user['email']}")
+            otp = OTP_PATTERN.search(message["body"]).group(1)
+            _check(await self.client.post("/auth/verify-otp", json={"npi": user["npi"], "otp": otp}))
+
+        concurrency = min(self.args.concurrency, len(self.users))
+        return {"otp_login": await run_load(operation, self.args.login_requests, concurrency)}
+
+
+def _stage_totals(histogram) -> dict:
+    totals = {}
+    for labels, value in histogram.collect().samples:
+        suffix = labels.get("__suffix__")
+        if suffix in ("_sum", "_count"):
+            totals.setdefault(labels["stage"], {})[suffix] = value
+    return totals
+
+
+def _stage_means(after: dict, before: dict) -> dict:
+    means = {}
+    for stage, values in after.items():
+        count = values["_count"] - before.get(stage, {}).get("_count", 0)
+        total = values["_sum"] - before.get(stage, {}).get("_sum", 0.0)
+        if count:
+            means[stage] = round(total / count * 1000, 2)
+    return means
+
+
+async def run(args) -> dict:
+    workdir = tempfile.mkdtemp(prefix="ayikungban_bench_")
+    db = FakePostgrest(latency=args.db_latency_ms / 1000)
+    storage = FakeStorage(latency=args.storage_latency_ms / 1000)
+    supabase = ServerThread(supabase_app(db, storage)).start()
+    smtp = SmtpSink().start()
+    configure_environment(args, supabase.url, smtp.port, workdir)
+
+    # Import après configuration : les modules lisent leur configuration à l'import
+    import httpx
+    from app.anip import anip_service
+    from app.main import app
+    from app.routes.routes_auth import create_access_token
+
+    users = anip_users(args.users)
+    anip_path = os.path.join(workdir, "anip.json")
+    write_anip_file(anip_path, users)
+    anip_service.anip_registry = anip_service.AnipRegistry(anip_path)
+
+    pdf_ids = seed_results(db, users, args.seed_pdfs, args.seed_pages)
+    tokens = {user_id: create_access_token(user_id) for user_id in pdf_ids}
+
+    poppler = bool(shutil.which("pdfinfo") and shutil.which("pdftoppm"))
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    report = {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "poppler": poppler,
+            "args": vars(args),
+        },
+        "scenarios": {},
+        "skipped": {},
+    }
+
+    await app.router.startup()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=args.processing_timeout) as client:
+            bench = Bench(args, client, smtp, users, tokens, pdf_ids)
+            for name in scenarios:
+                if name in ("processing", "upload") and not poppler:
+                    report["skipped"][name] = "poppler (pdfinfo / pdftoppm) introuvable"
+                    continue
+                print(f"scénario {name}...", file=sys.stderr)
+                report["scenarios"].update(await getattr(bench, name)())
+    finally:
+        await app.router.shutdown()
+        smtp.stop()
+        supabase.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report["meta"]["peak_rss_mb"] = round(_peak_rss_mb(), 1)
+    report["meta"]["stub_calls"] = {"db": db.calls, "storage_bytes": storage.bytes_received}
+    return report
+
+
+def compare(report: dict, baseline: dict):
+    """Écarts de débit et de latence p95 par rapport à un rapport précédent."""
+    print(f"\ncomparaison avec {baseline['meta'].get('commit') or '?'}")
+    print(f"{'scénario':<28}{'débit':>12}{'Δ':>9}{'p95 ms':>12}{'Δ':>9}")
+    for name, result in report["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+
+        def delta(new, old):
+            return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+        print(f"{name:<28}{result['throughput_rps']:>12}{delta(result['throughput_rps'], previous['throughput_rps']):>9}"
+              f"{result['latency_ms']['p95']:>12}{delta(result['latency_ms']['p95'], previous['latency_ms']['p95']):>9}")
+
+
+def print_table(report: dict):
+    print(f"{'scénario':<28}{'req':>6}{'err':>5}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS Mo':>9}")
+    for name, result in report["scenarios"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<28}{result['requests']:>6}{result['errors']:>5}{result['throughput_rps']:>10}"
+              f"{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}{result['peak_rss_mb']:>9}")
+    for name, reason in report["skipped"].items():
+        print(f"{name:<28}ignoré : {reason}")
+
+
+def _int_list(value: str):
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="processing,upload,status,results,otp_login")
+    parser.add_argument("--pages", type=_int_list, default=[1, 5], help="pages des PDF synthétiques (processing)")
+    parser.add_argument("--dpi", type=_int_list, default=[150, 300], help="résolution de scan des PDF synthétiques")
+    parser.add_argument("--raster-dpi", type=int, default=None, help="PDF_RASTER_DPI de l'application")
+    parser.add_argument("--pdfs", type=int, default=4, help="PDF traités par combinaison (pages, dpi)")
+    parser.add_argument("--workers", type=int, default=2, help="tâches de traitement en parallèle")
+    parser.add_argument("--upload-pages", type=int, default=5, help="pages du PDF du scénario upload")
+    parser.add_argument("--requests", type=int, default=200, help="requêtes par scénario upload / status / results")
+    parser.add_argument("--login-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--seed-pdfs", type=int, default=25, help="PDF déjà traités par utilisateur")
+    parser.add_argument("--seed-pages", type=int, default=4, help="pages par PDF déjà traité")
+    parser.add_argument("--page-size", type=int, default=50, help="limit de GET /results/user/all")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="latence ajoutée à chaque appel PostgREST")
+    parser.add_argument("--storage-latency-ms", type=float, default=0.0, help="latence ajoutée à chaque appel Storage")
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--processing-timeout", type=float, default=600.0)
+    parser.add_argument("--output", help="fichier JSON du rapport (sinon sur la sortie standard)")
+    parser.add_argument("--baseline", help="rapport JSON précédent à comparer")
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print_table(report)
+    else:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+# benchmarks/fixtures.py
+"""Données synthétiques des benchmarks : PDF de levés, utilisateurs ANIP, résultats en base."""
+import io
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from .bench_page_encoding import synthetic_page
+
+A4_INCHES = (8.27, 11.69)
+
+
+def synthetic_pdf(pages: int, dpi: int, seed: int = 0) -> bytes:
+    """
+    PDF de levé scanné : une image A4 par page, à la résolution de scan dpi.
+    La résolution fixe le coût de décodage lors de la rasterisation.
+    """
+    size = (int(A4_INCHES[0] * dpi), int(A4_INCHES[1] * dpi))
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    for page in range(pages):
+        image = synthetic_page(seed * 1000 + page, size=size)
+        pdf.drawImage(ImageReader(image), 0, 0, width=width, height=height)
+        pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+def unique_variant(pdf: bytes, marker: str) -> bytes:
+    """Même PDF avec un commentaire final différent : autre empreinte, pas de réutilisation du cache."""
+    return pdf + f"\n% bench {marker}\n".encode()
+
+
+def anip_users(count: int) -> List[dict]:
+    return [
+        {
+            "npi": f"9{index:07d}",
+            "phone_number": f"97{index:06d}",
+            "first_name": f"Bench{index}",
+            "last_name": "Utilisateur",
+            "sex": "F" if index % 2 else "M",
+            "date_of_birth": "1990-01-01",
+            "email": f"bench{index}@example.test",
+            "address": "Cotonou, Benin",
+            "profession": "Géomètre",
+        }
+        for index in range(count)
+    ]
+
+
+def write_anip_file(path: str, users: List[dict]):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(users, f)
+
+
+def seed_results(db, users: List[dict], pdfs_per_user: int, pages_per_pdf: int) -> Dict[str, List[str]]:
+    """
+    Utilisateurs, PDF terminés et pages avec résultats dans la base de remplacement.
+    Retourne user_id -> identifiants des PDF.
+    """
+    rng = random.Random(0)
+    zones = {key: "NON" for key in ("air", "dpl", "dpm", "litige", "restriction", "zone_inondable")}
+    start = datetime.utcnow() - timedelta(days=30)
+    pdf_ids: Dict[str, List[str]] = {}
+    user_rows, job_rows, image_rows = [], [], []
+    for user in users:
+        user_id = str(uuid.uuid4())
+        user_rows.append({"id": user_id, **user, "created_at": start.isoformat()})
+        pdf_ids[user_id] = []
+        for _ in range(pdfs_per_user):
+            pdf_id = str(uuid.uuid4())
+            created = start + timedelta(seconds=rng.randint(0, 30 * 24 * 3600))
+            pdf_ids[user_id].append(pdf_id)
+            job_rows.append({
+                "id": pdf_id,
+                "user_id": user_id,
+                "pdf_url": f"pdfs/{user_id}/{pdf_id}.pdf",
+                "status": "completed",
+                "total_pages": pages_per_pdf,
+                "completed_pages": pages_per_pdf,
+                "failed_pages": 0,
+                "summary_pdf": f"results/{user_id}/{pdf_id}/summary.pdf",
+                "created_at": created.isoformat(),
+                "started_at": created.isoformat(),
+                "finished_at": (created + timedelta(seconds=20)).isoformat(),
+            })
+            for page_number in range(1, pages_per_pdf + 1):
+                image_rows.append({
+                    "id": str(uuid.uuid4()),
+                    "user_id": user_id,
+                    "pdf_id": pdf_id,
+                    "page_number": page_number,
+                    "filename": f"{pdf_id}_page_{page_number}.png",
+                    "file_path": f"images/{user_id}/{pdf_id}_page_{page_number}.png",
+                    "processing_status": "completed",
+                    "zones_result": json.dumps({**zones, "original_pdf_url": f"pdfs/{user_id}/{pdf_id}.pdf"}),
+                    "result_summary_pdf": f"results/{user_id}/{pdf_id}/summary.pdf",
+                    "created_at": (created + timedelta(seconds=page_number)).isoformat(),
+                })
+    db.seed("users", user_rows)
+    db.seed("pdf_jobs", job_rows)
+    db.seed("images", image_rows)
+    return pdf_ids
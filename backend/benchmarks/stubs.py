@@ -0,0 +1,432 @@
+# benchmarks/stubs.py
+"""
+Remplaçants locaux des services externes, pour mesurer l'API sans réseau :
+
+- Supabase : sous-ensemble de PostgREST (/rest/v1) utilisé par app/repositories
+  (select / filtres eq, in, lt... / or / order / limit, insert, upsert, update,
+  delete, count exact, fonctions rpc des migrations) et de Storage (/storage/v1/object) ;
+- SMTP : serveur aiosmtpd qui garde les messages reçus (pour lire les OTP).
+
+Chaque service tourne dans un thread avec sa propre boucle ; une latence
+artificielle peut être ajoutée pour approcher un déploiement réel.
+"""
+import asyncio
+import json
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from email import message_from_bytes
+from typing import Dict, List, Optional
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- PostgREST ---
+
+def _split_top_level(text: str) -> List[str]:
+    """Découpe "a,b,and(c,d)" sur les virgules hors parenthèses et hors guillemets."""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    return value
+
+
+def _coerce(value: str, reference):
+    """Valeur de filtre (texte) convertie dans le type de la valeur stockée."""
+    if value == "null":
+        return None
+    if isinstance(reference, bool):
+        return value.lower() == "true"
+    if isinstance(reference, int):
+        return int(value)
+    if isinstance(reference, float):
+        return float(value)
+    return value
+
+
+def _compare(stored, operator: str, raw: str) -> bool:
+    negate = operator.startswith("not.")
+    if negate:
+        operator = operator[len("not."):]
+    if operator == "is":
+        expected = {"null": None, "true": True, "false": False}[raw.lower()]
+        result = stored is expected
+    elif operator == "in":
+        values = [_unquote(v) for v in _split_top_level(raw.strip("()"))]
+        result = any(stored == _coerce(v, stored) for v in values)
+    elif stored is None:
+        result = False
+    else:
+        value = _coerce(_unquote(raw), stored)
+        result = {
+            "eq": lambda: stored == value,
+            "neq": lambda: stored != value,
+            "lt": lambda: stored < value,
+            "lte": lambda: stored <= value,
+            "gt": lambda: stored > value,
+            "gte": lambda: stored >= value,
+        }[operator]()
+    return not result if negate else result
+
+
+def _condition(expression: str):
+    """Expression de or=(...) : "col.op.valeur", "and(...)" ou "or(...)"."""
+    for logic in ("and", "or"):
+        if expression.startswith(f"{logic}(") and expression.endswith(")"):
+            children = [_condition(part) for part in _split_top_level(expression[len(logic) + 1:-1])]
+            combine = all if logic == "and" else any
+            return lambda row: combine(child(row) for child in children)
+    column, rest = expression.split(".", 1)
+    operator, raw = rest.split(".", 1)
+    if operator == "not":
+        operator_tail, raw = raw.split(".", 1)
+        operator = f"not.{operator_tail}"
+    return lambda row: _compare(row.get(column), operator, raw)
+
+
+class FakePostgrest:
+    """Tables en mémoire (une liste de dicts par table) et fonctions rpc des migrations."""
+
+    RESERVED = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+    # Colonnes indexées : un filtre eq sur l'une d'elles évite de parcourir toute la table,
+    # pour que le coût du remplaçant reste négligeable devant celui de l'API
+    INDEXED = ("id", "pdf_id", "user_id", "npi")
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: Dict[str, List[dict]] = {}
+        self.calls = 0
+        self._indexes: Dict[str, Dict[str, Dict[str, List[dict]]]] = {}
+        self._lock = threading.Lock()
+
+    def seed(self, table: str, rows: List[dict]):
+        with self._lock:
+            for row in rows:
+                self._append(table, self._with_defaults(table, row))
+
+    def _append(self, table: str, row: dict):
+        self.tables.setdefault(table, []).append(row)
+        indexes = self._indexes.setdefault(table, {column: {} for column in self.INDEXED})
+        for column, index in indexes.items():
+            if row.get(column) is not None:
+                index.setdefault(str(row[column]), []).append(row)
+
+    def _reindex(self, table: str):
+        rows, self.tables[table] = self.tables.get(table, []), []
+        self._indexes.pop(table, None)
+        for row in rows:
+            self._append(table, row)
+
+    def _find(self, table: str, column: str, value) -> Optional[dict]:
+        if column in self.INDEXED:
+            rows = self._indexes.get(table, {}).get(column, {}).get(str(value), [])
+            return rows[0] if rows else None
+        return next((row for row in self.tables.get(table, []) if row.get(column) == value), None)
+
+    def _candidates(self, table: str, request: Request) -> List[dict]:
+        for column in self.INDEXED:
+            value = request.query_params.get(column)
+            if value is not None and value.startswith("eq."):
+                return list(self._indexes.get(table, {}).get(column, {}).get(_unquote(value[3:]), []))
+        return self.tables.get(table, [])
+
+    # Valeurs par défaut des colonnes (voir migrations/) en plus de id et created_at
+    DEFAULTS = {
+        "pdf_jobs": {"status": "queued", "total_pages": 0, "completed_pages": 0, "failed_pages": 0},
+        "notifications": {"read": False},
+    }
+
+    def _with_defaults(self, table: str, row: dict) -> dict:
+        now = datetime.utcnow().isoformat()
+        return {"id": str(uuid.uuid4()), "created_at": now, **self.DEFAULTS.get(table, {}), **row}
+
+    def _filters(self, request: Request):
+        conditions = []
+        for key, value in request.query_params.multi_items():
+            if key in self.RESERVED:
+                continue
+            if key in ("or", "and"):
+                conditions.append(_condition(f"{key}{value}"))
+            else:
+                operator, raw = value.split(".", 1)
+                if operator == "not":
+                    operator_tail, raw = raw.split(".", 1)
+                    operator = f"not.{operator_tail}"
+                conditions.append(lambda row, c=key, o=operator, r=raw: _compare(row.get(c), o, r))
+        return lambda row: all(condition(row) for condition in conditions)
+
+    @staticmethod
+    def _project(rows: List[dict], select: Optional[str]) -> List[dict]:
+        columns = [c.strip() for c in (select or "*").split(",") if c.strip()]
+        if not columns or "*" in columns:
+            return [dict(row) for row in rows]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    @staticmethod
+    def _order(rows: List[dict], order: Optional[str]) -> List[dict]:
+        if not order:
+            return rows
+        for term in reversed(order.split(",")):
+            column, *modifiers = term.strip().split(".")
+            descending = "desc" in modifiers
+            present = [row for row in rows if row.get(column) is not None]
+            missing = [row for row in rows if row.get(column) is None]
+            present.sort(key=lambda row: row[column], reverse=descending)
+            rows = present + missing
+        return rows
+
+    @staticmethod
+    def _prefer(request: Request) -> set:
+        return {p.strip() for p in request.headers.get("prefer", "").split(",") if p.strip()}
+
+    def _response(self, request: Request, rows: List[dict], status: int, total: int = None) -> Response:
+        prefer = self._prefer(request)
+        headers = {}
+        if "count=exact" in prefer:
+            count = len(rows) if total is None else total
+            headers["Content-Range"] = f"0-{max(len(rows) - 1, 0)}/{count}" if rows else f"*/{count}"
+        if request.method == "HEAD" or (request.method != "GET" and "return=representation" not in prefer):
+            return Response(status_code=204 if request.method != "POST" else 201, headers=headers)
+        return JSONResponse(self._project(rows, request.query_params.get("select")), status_code=status,
+                            headers=headers)
+
+    async def handle(self, request: Request) -> Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls += 1
+        target = request.path_params["target"]
+        body = await request.body()
+        payload = json.loads(body) if body else None
+        if target.startswith("rpc/"):
+            return self._rpc(target[len("rpc/"):], payload or {})
+
+        with self._lock:
+            table = self.tables.setdefault(target, [])
+            matches = self._filters(request)
+            if request.method in ("GET", "HEAD"):
+                matching = [row for row in self._candidates(target, request) if matches(row)]
+                total = len(matching)
+                matching = self._order(matching, request.query_params.get("order"))
+                offset = int(request.query_params.get("offset", 0))
+                limit = request.query_params.get("limit")
+                matching = matching[offset:offset + int(limit) if limit else None]
+                return self._response(request, matching, 200, total)
+
+            if request.method == "POST":
+                rows = payload if isinstance(payload, list) else [payload]
+                conflict = request.query_params.get("on_conflict")
+                merge = "resolution=merge-duplicates" in self._prefer(request)
+                written = []
+                for row in rows:
+                    existing = None
+                    if conflict and merge and row.get(conflict) is not None:
+                        existing = self._find(target, conflict, row[conflict])
+                    if existing is not None:
+                        existing.update(row)
+                        written.append(existing)
+                    else:
+                        new_row = self._with_defaults(target, row)
+                        self._append(target, new_row)
+                        written.append(new_row)
+                return self._response(request, written, 201)
+
+            if request.method == "PATCH":
+                updated = [row for row in self._candidates(target, request) if matches(row)]
+                for row in updated:
+                    row.update(payload or {})
+                if updated and set(payload or {}) & set(self.INDEXED):
+                    self._reindex(target)
+                return self._response(request, updated, 200)
+
+            if request.method == "DELETE":
+                deleted = [row for row in self._candidates(target, request) if matches(row)]
+                if deleted:
+                    deleted_ids = {id(row) for row in deleted}
+                    self.tables[target] = [row for row in table if id(row) not in deleted_ids]
+                    self._reindex(target)
+                return self._response(request, deleted, 200)
+
+        return JSONResponse({"message": "méthode non gérée"}, status_code=405)
+
+    def _rpc(self, name: str, params: dict) -> Response:
+        if name == "pdf_job_pages_done":
+            return self._pages_done(params["p_job_id"], params["p_completed"], params["p_failed"])
+        return JSONResponse({"message": f"fonction {name} inconnue"}, status_code=404)
+
+    def _pages_done(self, job_id: str, completed: int, failed: int) -> Response:
+        """Même calcul que migrations/007_batched_page_writes.sql."""
+        with self._lock:
+            job = self._find("pdf_jobs", "id", job_id)
+            if job is None:
+                return JSONResponse([])
+            job["completed_pages"] = job.get("completed_pages", 0) + completed
+            job["failed_pages"] = job.get("failed_pages", 0) + failed
+            done = job["completed_pages"] + job["failed_pages"]
+            if done < job.get("total_pages", 0):
+                job["status"] = "processing"
+            elif job["failed_pages"] == 0:
+                job["status"] = "completed"
+            elif job["completed_pages"] == 0:
+                job["status"] = "failed"
+            else:
+                job["status"] = "partial"
+            if done >= job.get("total_pages", 0):
+                job["finished_at"] = datetime.utcnow().isoformat()
+            return JSONResponse([dict(job)])
+
+
+class FakeStorage:
+    """Objets en mémoire, adressés comme Supabase Storage (/object/{bucket}/{chemin})."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.objects: Dict[str, bytes] = {}
+        self.bytes_received = 0
+
+    async def upload(self, request: Request) -> Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        chunks = []
+        async for chunk in request.stream():
+            chunks.append(chunk)
+        self.objects[key] = b"".join(chunks)
+        self.bytes_received += len(self.objects[key])
+        return JSONResponse({"Key": key})
+
+    async def download(self, request: Request) -> Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        key = f"{request.path_params['bucket']}/{request.path_params['path']}"
+        content = self.objects.get(key)
+        if content is None:
+            return JSONResponse({"message": "Object not found"}, status_code=404)
+        return Response(content, media_type="application/octet-stream")
+
+
+def supabase_app(db: FakePostgrest, storage: FakeStorage) -> Starlette:
+    methods = ["GET", "HEAD", "POST", "PATCH", "DELETE"]
+    return Starlette(routes=[
+        Route("/rest/v1/{target:path}", db.handle, methods=methods),
+        Route("/storage/v1/object/public/{bucket}/{path:path}", storage.download, methods=["GET"]),
+        Route("/storage/v1/object/{bucket}/{path:path}", storage.upload, methods=["POST", "PUT"]),
+        Route("/storage/v1/object/{bucket}/{path:path}", storage.download, methods=["GET"]),
+    ])
+
+
+class ServerThread:
+    """Serveur uvicorn dans un thread (sa propre boucle), arrêté par stop()."""
+
+    def __init__(self, app, port: int = None):
+        self.port = port or free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self._server = uvicorn.Server(uvicorn.Config(
+            app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False, lifespan="off"
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def start(self) -> "ServerThread":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Serveur local non démarré sur le port {self.port}")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+# --- SMTP ---
+
+class SmtpSink:
+    """Serveur SMTP local (aiosmtpd) qui garde les messages reçus."""
+
+    def __init__(self, port: int = None):
+        try:
+            from aiosmtpd.controller import Controller
+        except ImportError:
+            raise RuntimeError("Le serveur SMTP local nécessite aiosmtpd : pip install -r benchmarks/requirements.txt")
+
+        self.port = port or free_port()
+        self.messages: List[dict] = []
+        self._lock = threading.Lock()
+        self._waiters: List[tuple] = []
+        self._controller = Controller(self, hostname="127.0.0.1", port=self.port)
+
+    async def handle_DATA(self, server, session, envelope):
+        message = message_from_bytes(envelope.content)
+        body = message.get_payload(decode=True) if not message.is_multipart() \
+            else message.get_payload(0).get_payload(decode=True)
+        received = {
+            "to": list(envelope.rcpt_tos),
+            "subject": message["Subject"],
+            "body": (body or b"").decode("utf-8", errors="replace"),
+        }
+        with self._lock:
+            self.messages.append(received)
+            waiters = [w for w in self._waiters if w[0] in received["to"]]
+            self._waiters = [w for w in self._waiters if w not in waiters]
+        # Réveille les attentes de la boucle du benchmark (autre thread)
+        for _, loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(received))
+        return "250 OK"
+
+    def start(self) -> "SmtpSink":
+        self._controller.start()
+        return self
+
+    def stop(self):
+        self._controller.stop()
+
+    async def wait_for(self, recipient: str, after: int, timeout: float = 10.0) -> Optional[dict]:
+        """Premier message pour recipient parmi ceux reçus après les `after` premiers."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            for message in self.messages[after:]:
+                if recipient in message["to"]:
+                    return message
+            waiter = (recipient, loop, future)
+            self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            with self._lock:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
@@ -0,0 +1,3 @@
+-- Pagination par clé de GET /results/user/all : (user_id, created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS images_user_created_id_idx
+    ON images (user_id, created_at DESC, id DESC);
@@ -0,0 +1,45 @@
+-- Suivi du traitement par PDF uploadé (GET /images/pdf-status/{pdf_id})
+CREATE TABLE IF NOT EXISTS pdf_jobs (
+    id uuid PRIMARY KEY,
+    user_id uuid NOT NULL,
+    pdf_url text,
+    status text NOT NULL DEFAULT 'queued',
+    total_pages integer NOT NULL DEFAULT 0,
+    completed_pages integer NOT NULL DEFAULT 0,
+    failed_pages integer NOT NULL DEFAULT 0,
+    error text,
+    created_at timestamptz NOT NULL DEFAULT now(),
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    started_at timestamptz,
+    finished_at timestamptz
+);
+
+CREATE INDEX IF NOT EXISTS pdf_jobs_user_idx ON pdf_jobs (user_id, created_at DESC);
+
+-- Rattachement des pages à leur PDF
+ALTER TABLE images ADD COLUMN IF NOT EXISTS pdf_id uuid;
+ALTER TABLE images ADD COLUMN IF NOT EXISTS page_number integer;
+CREATE INDEX IF NOT EXISTS images_pdf_id_idx ON images (pdf_id);
+
+-- Comptabilise une page terminée de façon atomique et calcule le statut global
+CREATE OR REPLACE FUNCTION pdf_job_page_done(p_job_id uuid, p_succeeded boolean)
+RETURNS SETOF pdf_jobs
+LANGUAGE sql
+AS $$
+    UPDATE pdf_jobs SET
+        completed_pages = completed_pages + CASE WHEN p_succeeded THEN 1 ELSE 0 END,
+        failed_pages = failed_pages + CASE WHEN p_succeeded THEN 0 ELSE 1 END,
+        status = CASE
+            WHEN completed_pages + failed_pages + 1 < total_pages THEN 'processing'
+            WHEN failed_pages + CASE WHEN p_succeeded THEN 0 ELSE 1 END = 0 THEN 'completed'
+            WHEN completed_pages + CASE WHEN p_succeeded THEN 1 ELSE 0 END = 0 THEN 'failed'
+            ELSE 'partial'
+        END,
+        finished_at = CASE
+            WHEN completed_pages + failed_pages + 1 >= total_pages THEN now()
+            ELSE finished_at
+        END,
+        updated_at = now()
+    WHERE id = p_job_id
+    RETURNING *;
+$$;
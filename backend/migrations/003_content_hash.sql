@@ -0,0 +1,6 @@
+-- Déduplication des PDF et des pages ré-uploadés (SHA-256 du contenu)
+ALTER TABLE pdf_jobs ADD COLUMN IF NOT EXISTS content_hash text;
+CREATE INDEX IF NOT EXISTS pdf_jobs_user_hash_idx ON pdf_jobs (user_id, content_hash);
+
+ALTER TABLE images ADD COLUMN IF NOT EXISTS content_hash text;
+CREATE INDEX IF NOT EXISTS images_user_hash_idx ON images (user_id, content_hash);
@@ -0,0 +1,3 @@
+-- Parcelles extraites en binaire compact (base64) : offsets int64, sommets float64,
+-- puis surface / périmètre / centroïde / emprise précalculés (voir app/utils/geometry.py)
+ALTER TABLE images ADD COLUMN IF NOT EXISTS parcels_data text;
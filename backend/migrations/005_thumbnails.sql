@@ -0,0 +1,2 @@
+-- Vignette de chaque page (URL publique dans le stockage)
+ALTER TABLE images ADD COLUMN IF NOT EXISTS thumbnail_path text;
@@ -0,0 +1,2 @@
+-- Résumé combiné (un seul PDF multi-pages) par PDF uploadé
+ALTER TABLE pdf_jobs ADD COLUMN IF NOT EXISTS summary_pdf text;
@@ -0,0 +1,25 @@
+-- Avancement d'un PDF par lots de pages (app/repositories/page_writer.py)
+CREATE OR REPLACE FUNCTION pdf_job_pages_done(p_job_id uuid, p_completed integer, p_failed integer)
+RETURNS SETOF pdf_jobs
+LANGUAGE sql
+AS $$
+    UPDATE pdf_jobs SET
+        completed_pages = completed_pages + p_completed,
+        failed_pages = failed_pages + p_failed,
+        status = CASE
+            WHEN completed_pages + failed_pages + p_completed + p_failed < total_pages THEN 'processing'
+            WHEN failed_pages + p_failed = 0 THEN 'completed'
+            WHEN completed_pages + p_completed = 0 THEN 'failed'
+            ELSE 'partial'
+        END,
+        finished_at = CASE
+            WHEN completed_pages + failed_pages + p_completed + p_failed >= total_pages THEN now()
+            ELSE finished_at
+        END,
+        updated_at = now()
+    WHERE id = p_job_id
+    RETURNING *;
+$$;
+
+-- Remplacée par pdf_job_pages_done (une page = un lot de taille 1)
+DROP FUNCTION IF EXISTS pdf_job_page_done(uuid, boolean);
@@ -0,0 +1,8 @@
+-- Pagination par clé de GET /notifications/ : (user_id, created_at DESC, id DESC)
+CREATE INDEX IF NOT EXISTS notifications_user_created_id_idx
+    ON notifications (user_id, created_at DESC, id DESC);
+
+-- GET /notifications/unread_count et la liste unread_only : index partiel limité aux non lues
+CREATE INDEX IF NOT EXISTS notifications_user_unread_idx
+    ON notifications (user_id, created_at DESC, id DESC)
+    WHERE NOT read;
@@ -0,0 +1,4 @@
+-- Étapes terminées de l'analyse d'une page (app/utils/page_pipeline.py) :
+-- {"completed": ["extract", "zones", "summary"], "failed_stage": ..., "error": ...}
+-- POST /images/{image_id}/retry reprend à la première étape manquante.
+ALTER TABLE images ADD COLUMN IF NOT EXISTS pipeline_state jsonb;
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+
+# Variables lues à l'import de app : valeurs factices, aucun appel réseau dans les tests
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("SENDER_EMAIL", "noreply@example.test")
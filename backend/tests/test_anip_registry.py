@@ -0,0 +1,67 @@
+# tests/test_anip_registry.py
+import json
+import os
+
+from app.anip.anip_service import AnipRegistry
+
+
+def _user(npi: str, **fields) -> dict:
+    return {"npi": npi, "first_name": f"Prénom {npi}", "email": f"{npi}@example.test", **fields}
+
+
+def _write(path, users, mtime: float):
+    path.write_text(json.dumps(users, indent=2, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, (mtime, mtime))
+
+
+def test_lookup_and_batch_lookup(tmp_path):
+    path = tmp_path / "anip.json"
+    _write(path, [_user("1"), _user("2")], 1000)
+    registry = AnipRegistry(path, check_interval=0)
+
+    assert registry.get("1")["email"] == "1@example.test"
+    assert registry.get("3") is None
+    assert registry.get_many(["2", "3"]) == {"2": _user("2"), "3": None}
+    assert len(registry) == 2
+
+
+def test_appended_records_are_indexed_without_rebuild(tmp_path, monkeypatch):
+    path = tmp_path / "anip.json"
+    _write(path, [_user("1"), _user("2")], 1000)
+    registry = AnipRegistry(path, check_interval=0)
+    first = registry.get("1")
+
+    def no_rebuild(raw):
+        raise AssertionError("index reconstruit au lieu d'être complété")
+
+    monkeypatch.setattr(registry, "_build_index", no_rebuild)
+    _write(path, [_user("1"), _user("2"), _user("3"), _user("2", email="nouveau@example.test")], 2000)
+
+    assert registry.get("3")["email"] == "3@example.test"
+    # Un NPI présent plus loin dans le fichier remplace le précédent, comme à la reconstruction
+    assert registry.get("2")["email"] == "nouveau@example.test"
+    # Les enregistrements déjà indexés ne sont pas décodés à nouveau
+    assert registry.get("1") is first
+
+
+def test_modified_records_rebuild_the_index(tmp_path):
+    path = tmp_path / "anip.json"
+    _write(path, [_user("1"), _user("2")], 1000)
+    registry = AnipRegistry(path, check_interval=0)
+    assert registry.get("2") is not None
+
+    _write(path, [_user("1", email="modifie@example.test")], 2000)
+
+    assert registry.get("1")["email"] == "modifie@example.test"
+    assert registry.get("2") is None
+
+
+def test_empty_registry_then_append(tmp_path):
+    path = tmp_path / "anip.json"
+    _write(path, [], 1000)
+    registry = AnipRegistry(path, check_interval=0)
+    assert len(registry) == 0
+
+    _write(path, [_user("7")], 2000)
+
+    assert registry.get("7") is not None
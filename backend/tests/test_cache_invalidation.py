@@ -0,0 +1,63 @@
+# tests/test_cache_invalidation.py
+import asyncio
+
+import pytest
+
+from app.utils import cache_invalidation
+from app.utils.auth_cache import PrincipalCache
+from app.utils.events import EventBus, MemoryEventBackend
+from app.utils.notification_cache import UnreadCountCache
+
+
+@pytest.fixture
+def caches(monkeypatch):
+    bus = EventBus(MemoryEventBackend())
+    caches = {"principal": PrincipalCache(), "unread_count": UnreadCountCache()}
+    monkeypatch.setattr(cache_invalidation, "event_bus", bus)
+    monkeypatch.setattr(cache_invalidation, "CACHES", caches)
+    return bus, caches
+
+
+async def _with_listener(scenario):
+    listener = asyncio.create_task(cache_invalidation.listen_invalidations())
+    await asyncio.sleep(0)
+    try:
+        await scenario()
+        await asyncio.sleep(0)
+    finally:
+        listener.cancel()
+        await asyncio.gather(listener, return_exceptions=True)
+
+
+def test_invalidation_published_by_another_process_is_applied(caches):
+    bus, caches = caches
+    caches["unread_count"].set("u1", 3)
+    caches["unread_count"].set("u2", 5)
+    caches["principal"].set("u1", {"id": "u1"})
+
+    async def scenario():
+        # Publication d'un autre processus (worker) : seule la diffusion arrive ici
+        await bus.publish_invalidation("unread_count", "u1")
+        await bus.publish_invalidation("inconnu", "u1")
+
+    asyncio.run(_with_listener(scenario))
+
+    assert caches["unread_count"].get("u1") is None
+    assert caches["unread_count"].get("u2") == 5
+    assert caches["principal"].get("u1") == {"id": "u1"}
+
+
+def test_invalidate_cache_is_local_and_published(caches):
+    bus, caches = caches
+    caches["principal"].set("u1", {"id": "u1"})
+    received = []
+
+    async def scenario():
+        async with bus.subscribe_invalidations() as events:
+            await cache_invalidation.invalidate_cache("principal", "u1")
+            received.append(await asyncio.wait_for(events.__anext__(), 1))
+
+    asyncio.run(scenario())
+
+    assert caches["principal"].get("u1") is None
+    assert received == [{"cache": "principal", "key": "u1"}]
@@ -0,0 +1,70 @@
+# tests/test_geometry.py
+import numpy as np
+import pytest
+
+from app.utils.geometry import ParcelSet
+
+SQUARE = [(0, 0), (4, 0), (4, 4), (0, 4)]
+TRIANGLE = [(10, 10), (16, 10), (10, 13)]
+# Parcelle dégénérée (segment) : surface nulle, centroïde = moyenne des sommets
+SEGMENT = [(1, 1), (3, 1)]
+
+
+@pytest.fixture
+def parcels():
+    return ParcelSet.from_rings([SQUARE, [], TRIANGLE, SEGMENT])
+
+
+def test_empty_rings_are_skipped(parcels):
+    assert len(parcels) == 3
+    assert parcels.offsets.tolist() == [0, 4, 7, 9]
+    assert parcels.ring(1).tolist() == [[10, 10], [16, 10], [10, 13]]
+
+
+def test_metrics(parcels):
+    metrics = parcels.metrics
+    assert metrics["area"].tolist() == pytest.approx([16, 9, 0])
+    assert metrics["perimeter"].tolist() == pytest.approx([16, 6 + 3 + np.hypot(6, 3), 4])
+    assert metrics["centroid_x"].tolist() == pytest.approx([2, 12, 2])
+    assert metrics["centroid_y"].tolist() == pytest.approx([2, 11, 1])
+    assert [tuple(metrics[i][["min_x", "min_y", "max_x", "max_y"]]) for i in range(3)] == [
+        (0, 0, 4, 4), (10, 10, 16, 13), (1, 1, 3, 1)
+    ]
+
+
+def test_area_does_not_depend_on_orientation():
+    clockwise = ParcelSet.from_rings([SQUARE[::-1]])
+    assert clockwise.metrics["area"][0] == pytest.approx(16)
+    assert clockwise.metrics["centroid_x"][0] == pytest.approx(2)
+
+
+def test_base64_round_trip(parcels):
+    restored = ParcelSet.from_base64(parcels.to_base64())
+
+    np.testing.assert_array_equal(restored.offsets, parcels.offsets)
+    np.testing.assert_array_equal(restored.coords, parcels.coords)
+    np.testing.assert_array_equal(restored.metrics, parcels.metrics)
+    assert restored.to_api() == parcels.to_api()
+
+
+def test_empty_set_round_trip():
+    empty = ParcelSet.from_rings([])
+    restored = ParcelSet.from_bytes(empty.to_bytes())
+    assert len(restored) == 0
+    assert restored.to_api() == []
+
+
+def test_unknown_format_is_rejected(parcels):
+    with pytest.raises(ValueError):
+        ParcelSet.from_bytes(b"XXXX" + parcels.to_bytes()[4:])
+
+
+def test_to_api_and_legacy_points():
+    parcel = ParcelSet.from_points([{"x": 0, "y": 0}, {"x": 4, "y": 0}, {"x": 4, "y": 4}, {"x": 0, "y": 4}])
+    assert parcel.to_api() == [{
+        "coordonnees": [{"x": 0.0, "y": 0.0}, {"x": 4.0, "y": 0.0}, {"x": 4.0, "y": 4.0}, {"x": 0.0, "y": 4.0}],
+        "surface": 16.0,
+        "perimetre": 16.0,
+        "centroide": {"x": 2.0, "y": 2.0},
+        "bbox": [0.0, 0.0, 4.0, 4.0],
+    }]
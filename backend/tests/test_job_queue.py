@@ -0,0 +1,159 @@
+# tests/test_job_queue.py
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.utils import job_queue as job_queue_module
+from app.utils.job_queue import SQLiteJobQueue
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(job_queue_module.time, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_claim_in_order_and_ack(queue, clock):
+    first = queue.enqueue("process_pdf", {"pdf_id": "a"})
+    clock.now += 1
+    second = queue.enqueue("process_pdf", {"pdf_id": "b"})
+
+    job = queue.claim("w1")
+    assert (job["id"], job["payload"], job["attempts"]) == (first, {"pdf_id": "a"}, 1)
+    assert queue.claim("w2")["id"] == second
+    assert queue.claim("w3") is None
+    assert queue.depth() == 2
+
+    assert queue.ack(first, "w1")
+    assert queue.depth() == 1
+
+
+def test_expired_lease_is_reclaimed(queue, clock):
+    job_id = queue.enqueue("process_pdf", {}, max_attempts=3)
+    queue.claim("w1", lease_seconds=30)
+
+    clock.now += 10
+    assert queue.extend_lease(job_id, "w1", lease_seconds=30)
+    clock.now += 25
+    assert queue.claim("w2") is None
+
+    clock.now += 10
+    job = queue.claim("w2")
+    assert (job["id"], job["attempts"]) == (job_id, 2)
+    # Le premier worker a perdu le bail : ni prolongation, ni ack, ni nack
+    assert not queue.extend_lease(job_id, "w1")
+    assert not queue.ack(job_id, "w1")
+    assert queue.nack(job_id, "w1", "erreur") == "lost"
+    assert queue.ack(job_id, "w2")
+
+
+def test_nack_backs_off_exponentially_then_dead_letters(queue, clock):
+    job_id = queue.enqueue("process_pdf", {}, max_attempts=3)
+
+    queue.claim("w1")
+    assert queue.nack(job_id, "w1", "essai 1", base_delay=10) == "queued"
+    clock.now += 9
+    assert queue.claim("w1") is None
+    clock.now += 1
+    assert queue.claim("w1")["attempts"] == 2
+
+    assert queue.nack(job_id, "w1", "essai 2", base_delay=10) == "queued"
+    clock.now += 19
+    assert queue.claim("w1") is None
+    clock.now += 1
+    assert queue.claim("w1")["attempts"] == 3
+
+    assert queue.nack(job_id, "w1", "essai 3", base_delay=10) == "dead"
+    clock.now += 1000
+    assert queue.claim("w1") is None
+    assert queue.depth() == 0
+    dead = queue.dead_letters()
+    assert [(job["id"], job["last_error"]) for job in dead] == [(job_id, "essai 3")]
+
+
+def test_expired_lease_on_last_attempt_goes_to_dead_letter(queue, clock):
+    job_id = queue.enqueue("process_pdf", {}, max_attempts=2)
+    queue.claim("w1", lease_seconds=30)
+    clock.now += 31
+    queue.claim("w2", lease_seconds=30)
+    # Le worker meurt encore (OOM) : plus de reprise
+    clock.now += 31
+
+    assert queue.claim("w3") is None
+    assert [job["id"] for job in queue.dead_letters()] == [job_id]
+
+
+def test_requeue_dead_resets_attempts(queue, clock):
+    job_id = queue.enqueue("process_pdf", {}, max_attempts=1)
+    queue.claim("w1")
+    assert queue.nack(job_id, "w1", "erreur") == "dead"
+
+    assert queue.requeue_dead(job_id)
+    assert not queue.requeue_dead(job_id)
+    assert queue.claim("w1")["attempts"] == 1
+
+
+def test_worker_cli_lists_and_requeues_dead_letters(queue, capsys):
+    from app.worker import cli
+
+    job_id = queue.enqueue("retry_page", {"image_id": "i"}, max_attempts=1)
+    queue.claim("w1")
+    queue.nack(job_id, "w1", "erreur")
+
+    assert cli(["dead-letters"], queue=queue) == 0
+    assert f'"id": "{job_id}"' in capsys.readouterr().out
+    assert cli(["requeue", job_id], queue=queue) == 0
+    assert cli(["requeue", job_id], queue=queue) == 1
+    assert queue.depth() == 1
+
+
+def test_admission_rejects_when_queue_is_full(queue, monkeypatch):
+    from app.main import app
+    from app.routes import routes_image
+    from app.utils.user import get_current_user
+
+    monkeypatch.setattr(routes_image, "job_queue", queue)
+    monkeypatch.setattr(routes_image, "JOB_QUEUE_MAX_DEPTH", 2)
+    monkeypatch.setattr(routes_image, "UPLOAD_RETRY_AFTER", 45)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u"}
+    queue.enqueue("process_pdf", {})
+    queue.enqueue("process_pdf", {})
+    body_read = []
+
+    async def body():
+        body_read.append(True)
+        yield b"--b\r\n"
+
+    async def scenario():
+        with pytest.raises(HTTPException) as rejected:
+            await routes_image.check_admission()
+        assert rejected.value.status_code == 429
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            return await client.post("/images/upload-pdf", content=body(),
+                                     headers={"content-type": "multipart/form-data; boundary=b"})
+
+    try:
+        response = asyncio.run(scenario())
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "45"
+    # Refus avant la lecture du fichier
+    assert not body_read
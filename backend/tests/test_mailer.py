@@ -0,0 +1,152 @@
+# tests/test_mailer.py
+import asyncio
+import socket
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+from aiosmtpd.controller import Controller
+
+from app.utils.mailer import EmailDispatcher, SMTPConnectionPool
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class Sink:
+    """Serveur aiosmtpd : garde les messages ; refuse (451) les fail_next premiers envois."""
+
+    def __init__(self, fail_next: int = 0):
+        self.messages = []
+        self.fail_next = fail_next
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail_next:
+            self.fail_next -= 1
+            return "451 Réessayez plus tard"
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+@pytest.fixture
+def smtp():
+    sink = Sink()
+    controller = Controller(sink, hostname="127.0.0.1", port=_free_port())
+    controller.start()
+    yield sink, controller
+    controller.stop()
+
+
+def _dispatcher(port: int, **kwargs) -> EmailDispatcher:
+    pool = SMTPConnectionPool(size=2, host="127.0.0.1", port=port, starttls=False, username=None, password=None)
+    options = {"workers": 2, "max_retries": 2, "retry_base_delay": 0.01, **kwargs}
+    return EmailDispatcher(pool=pool, **options)
+
+
+def test_delivery_and_metrics(smtp):
+    sink, controller = smtp
+    dispatcher = _dispatcher(controller.port)
+
+    async def scenario():
+        for index in range(3):
+            assert dispatcher.enqueue(f"user{index}@example.test", "Votre code OTP", f"code {index}")
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+
+    assert sorted(m.rcpt_tos[0] for m in sink.messages) == [f"user{i}@example.test" for i in range(3)]
+    assert b"Subject: Votre code OTP" in sink.messages[0].content
+    metrics = dispatcher.metrics()
+    assert metrics["enqueued"] == 3
+    assert metrics["sent"] == 3
+    assert metrics["failed"] == metrics["retries"] == metrics["rejected"] == 0
+    assert metrics["queue_depth"] == 0
+    assert metrics["avg_delivery_seconds"] > 0
+
+
+def test_pooled_connection_is_reused_then_replaced_after_server_restart():
+    sink, port = Sink(), _free_port()
+    controller = Controller(sink, hostname="127.0.0.1", port=port)
+    controller.start()
+    pool = SMTPConnectionPool(size=1, host="127.0.0.1", port=port, starttls=False, username=None, password=None)
+    dispatcher = EmailDispatcher(pool=pool, workers=1, max_retries=0)
+    try:
+        dispatcher.send("a@example.test", "s", "premier")
+        with pool.connection() as first:
+            pass
+        dispatcher.send("a@example.test", "s", "deuxième")
+        with pool.connection() as second:
+            assert second is first
+
+        # Le serveur redémarre : la connexion gardée est fermée côté serveur
+        controller.stop()
+        controller = Controller(sink, hostname="127.0.0.1", port=port)
+        controller.start()
+        dispatcher.send("a@example.test", "s", "après redémarrage")
+        with pool.connection() as third:
+            assert third is not first
+    finally:
+        pool.close()
+        controller.stop()
+
+    assert len(sink.messages) == 3
+
+
+def test_transient_failure_is_retried(smtp, monkeypatch):
+    sink, controller = smtp
+    sink.fail_next = 1
+    dispatcher = _dispatcher(controller.port, workers=1)
+    failures = []
+
+    async def scenario():
+        dispatcher.enqueue("a@example.test", "s", "b", on_failure=lambda: failures.append(True))
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+
+    assert len(sink.messages) == 1
+    assert not failures
+    metrics = dispatcher.metrics()
+    assert (metrics["sent"], metrics["retries"], metrics["failed"]) == (1, 1, 0)
+
+
+def test_gives_up_after_retries_with_backoff(monkeypatch):
+    # Aucun serveur à l'écoute : chaque essai échoue à la connexion
+    dispatcher = _dispatcher(_free_port(), workers=1, max_retries=3, retry_base_delay=0.5)
+    delays, failures = [], []
+    real_sleep = asyncio.sleep
+
+    async def recorded_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+
+    async def scenario():
+        monkeypatch.setattr("app.utils.mailer.asyncio.sleep", recorded_sleep)
+        dispatcher.enqueue("a@example.test", "s", "b", on_failure=lambda: failures.append(True))
+        await dispatcher._queue.join()
+        monkeypatch.undo()
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+
+    assert delays == [0.5, 1.0, 2.0]
+    assert failures == [True]
+    metrics = dispatcher.metrics()
+    assert (metrics["sent"], metrics["retries"], metrics["failed"]) == (0, 3, 1)
+
+
+def test_full_queue_is_rejected(smtp):
+    _, controller = smtp
+    dispatcher = _dispatcher(controller.port, maxsize=1)
+
+    async def scenario():
+        accepted = [dispatcher.enqueue(f"u{i}@example.test", "s", "b") for i in range(3)]
+        await dispatcher.stop()
+        return accepted
+
+    assert asyncio.run(scenario()) == [True, False, False]
+    assert dispatcher.metrics()["rejected"] == 2
+    assert dispatcher.metrics()["enqueued"] == 1
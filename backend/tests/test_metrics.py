@@ -0,0 +1,87 @@
+# tests/test_metrics.py
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app.utils import component_metrics
+from app.utils.job_queue import SQLiteJobQueue
+from app.utils.metrics import MetricsRegistry, registry, start_metrics_server
+
+
+def _lines(text: str, name: str):
+    return [line for line in text.splitlines() if line.startswith(name)]
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    metrics = MetricsRegistry()
+    histogram = metrics.histogram("stage_seconds", "Durée", ("stage",), buckets=(1.0, 0.1))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.labels("inference").observe(value)
+
+    text = metrics.render()
+
+    assert "# TYPE stage_seconds histogram" in text
+    assert _lines(text, "stage_seconds") == [
+        'stage_seconds_bucket{stage="inference",le="0.1"} 2',
+        'stage_seconds_bucket{stage="inference",le="1"} 3',
+        'stage_seconds_bucket{stage="inference",le="+Inf"} 4',
+        'stage_seconds_sum{stage="inference"} 2.65',
+        'stage_seconds_count{stage="inference"} 4',
+    ]
+
+
+def test_counters_gauges_and_label_escaping():
+    metrics = MetricsRegistry()
+    jobs = metrics.counter("jobs_total", "Tâches", ("kind", "outcome"))
+    depth = metrics.gauge("queue_depth", "Profondeur")
+    jobs.labels("process_pdf", "done").inc()
+    jobs.labels("process_pdf", "done").inc(2)
+    jobs.labels('a"b\\c', "dead").inc()
+    depth.set(5)
+    depth.dec()
+
+    text = metrics.render()
+
+    assert _lines(text, "jobs_total") == [
+        'jobs_total{kind="process_pdf",outcome="done"} 3',
+        'jobs_total{kind="a\\"b\\\\c",outcome="dead"} 1',
+    ]
+    assert _lines(text, "queue_depth") == ["queue_depth 4"]
+    with pytest.raises(ValueError):
+        jobs.labels("process_pdf")
+
+
+def _get(url: str, token: str = None):
+    request = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"} if token else {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, response.headers["Content-Type"], response.read().decode()
+    except urllib.error.HTTPError as e:
+        return e.code, None, None
+
+
+def test_worker_metrics_server(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(str(tmp_path / "jobs.sqlite3"))
+    queue.enqueue("process_pdf", {})
+    monkeypatch.setattr(component_metrics, "job_queue", queue)
+    component_metrics.register_component_metrics()
+    component_metrics.register_component_metrics()
+    registry.histogram("ayikungban_pipeline_stage_seconds", "").labels("test_stage").observe(0.2)
+
+    server = start_metrics_server(0, host="127.0.0.1", token="secret")
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        assert _get(f"{base}/metrics")[0] == 401
+        assert _get(f"{base}/autre", token="secret")[0] == 404
+        status, content_type, text = _get(f"{base}/metrics", token="secret")
+    finally:
+        server.shutdown()
+
+    assert status == 200
+    assert content_type.startswith("text/plain; version=0.0.4")
+    assert 'ayikungban_pipeline_stage_seconds_bucket{stage="test_stage",le="0.25"}' in text
+    assert 'ayikungban_pipeline_stage_seconds_count{stage="test_stage"}' in text
+    assert "ayikungban_job_queue_depth 1" in text
+    # Collecteur enregistré une seule fois
+    assert text.count("# TYPE ayikungban_cache_total counter") == 1
@@ -0,0 +1,120 @@
+# tests/test_otp_store.py
+import pytest
+
+from app.utils import otp_store
+from app.utils.otp_store import MemoryOTPBackend, SQLiteOTPBackend
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(otp_store.time, "time", clock)
+    monkeypatch.setattr(otp_store, "OTP_TTL_SECONDS", 300)
+    monkeypatch.setattr(otp_store, "OTP_MAX_ATTEMPTS", 3)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path, clock):
+    if request.param == "memory":
+        return MemoryOTPBackend()
+    return SQLiteOTPBackend(str(tmp_path / "otp.sqlite3"))
+
+
+def test_verify_and_remove(store):
+    store.add("1", "123456", "a@example.test")
+
+    assert store.verify("1", "123456")
+    assert store.get_email("1") == "a@example.test"
+    store.remove("1")
+    assert not store.verify("1", "123456")
+
+
+def test_expired_otp_is_rejected(store, clock):
+    store.add("1", "123456", "a@example.test")
+    clock.now += 301
+
+    assert not store.verify("1", "123456")
+    # L'OTP expiré est supprimé à la vérification
+    assert store.get_email("1") is None
+
+
+def test_attempts_are_limited(store):
+    store.add("1", "123456", "a@example.test")
+
+    for _ in range(3):
+        assert not store.verify("1", "000000")
+    # Quatrième tentative : refusée même avec le bon code, et l'OTP est supprimé
+    assert not store.verify("1", "123456")
+    assert store.get_email("1") is None
+
+
+def test_new_code_resets_attempts(store):
+    store.add("1", "111111", "a@example.test")
+    for _ in range(3):
+        store.verify("1", "000000")
+    store.add("1", "222222", "a@example.test")
+
+    assert store.verify("1", "222222")
+
+
+def test_remove_only_matching_code(store):
+    store.add("1", "111111", "a@example.test")
+    store.add("1", "222222", "a@example.test")
+
+    store.remove("1", "111111")
+    assert store.verify("1", "222222")
+    store.remove("1", "222222")
+    assert store.get_email("1") is None
+
+
+def test_cleanup_evicts_only_expired(store, clock):
+    store.add("old", "111111", "old@example.test")
+    clock.now += 200
+    store.add("new", "222222", "new@example.test")
+    clock.now += 150
+
+    store.cleanup_expired()
+
+    assert store.get_email("old") is None
+    assert store.get_email("new") == "new@example.test"
+
+
+def test_memory_heap_skips_replaced_entries(clock):
+    store = MemoryOTPBackend()
+    store.add("1", "111111", "a@example.test")
+    clock.now += 200
+    # Nouveau code : l'entrée du tas pour l'ancien reste, mais ne doit pas l'évincer
+    store.add("1", "222222", "a@example.test")
+    clock.now += 150
+
+    store.cleanup_expired()
+
+    assert store.verify("1", "222222")
+    # Les entrées traitées sont retirées du tas ; seule reste celle du code actuel
+    assert len(store._expiry_heap) == 1
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path, clock):
+    path = str(tmp_path / "otp.sqlite3")
+    first, second = SQLiteOTPBackend(path), SQLiteOTPBackend(path)
+    first.add("1", "123456", "a@example.test")
+
+    assert not second.verify("1", "000000")
+    assert not first.verify("1", "000000")
+    assert not second.verify("1", "000000")
+    # Les tentatives sont comptées en base, quel que soit le worker
+    assert not first.verify("1", "123456")
+
+
+def test_unknown_backend():
+    with pytest.raises(RuntimeError):
+        otp_store.get_otp_store("redis")
@@ -0,0 +1,120 @@
+# tests/test_page_writer.py
+import asyncio
+
+from app.repositories import page_writer
+from app.repositories.page_writer import PageWriteBatcher
+
+PDF_ID = "6f1c2a4e-0b7d-4a55-9d3e-2f8a1c0e5b91"
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def _writer(monkeypatch):
+    """Batcher dont les upserts sont enregistrés dans une table en mémoire, par id."""
+    table = {}
+
+    async def upsert_many(rows):
+        for row in rows:
+            table[row["id"]] = {**table.get(row["id"], {}), **row}
+        return []
+
+    async def pages_done(job_id, completed, failed):
+        return None
+
+    monkeypatch.setattr(page_writer.images_repository, "upsert_many", upsert_many)
+    monkeypatch.setattr(page_writer.pdf_jobs_repository, "pages_done", pages_done)
+    # Pas d'écriture périodique : chaque flush est explicite
+    return PageWriteBatcher("user-1", PDF_ID, interval=3600), table
+
+
+def test_later_flushes_keep_previously_written_columns(monkeypatch):
+    writer, table = _writer(monkeypatch)
+
+    async def scenario():
+        await writer.insert_pages(2)
+        await writer.update(1, {"filename": f"{PDF_ID}_page_1.webp", "processing_status": "processing"})
+        await writer.flush()
+        await writer.update(1, {"parcels_data": "AAAA"})
+        await writer.flush()
+        await writer.update(1, {"processing_status": "completed"})
+        await writer.flush()
+        await writer.update(1, {"result_summary_pdf": "results/summary.pdf"})
+        await writer.close()
+
+    _run(scenario())
+
+    row = table[writer.image_id(1)]
+    assert row["filename"] == f"{PDF_ID}_page_1.webp"
+    assert row["parcels_data"] == "AAAA"
+    assert row["processing_status"] == "completed"
+    assert row["result_summary_pdf"] == "results/summary.pdf"
+    # La page non touchée garde sa ligne de création
+    assert table[writer.image_id(2)]["processing_status"] == "pending"
+
+
+def test_failed_flush_is_retried_with_the_same_columns(monkeypatch):
+    writer, table = _writer(monkeypatch)
+    original = page_writer.images_repository.upsert_many
+    calls = {"count": 0}
+
+    async def flaky_upsert_many(rows):
+        calls["count"] += 1
+        if calls["count"] == 2:
+            raise ConnectionError("base indisponible")
+        return await original(rows)
+
+    monkeypatch.setattr(page_writer.images_repository, "upsert_many", flaky_upsert_many)
+
+    async def scenario():
+        await writer.insert_pages(1)
+        await writer.update(1, {"processing_status": "completed"})
+        try:
+            await writer.flush()
+        except ConnectionError:
+            pass
+        await writer.update(1, {"zones_result": "{}"})
+        await writer.close()
+
+    _run(scenario())
+
+    row = table[writer.image_id(1)]
+    assert row["processing_status"] == "completed"
+    assert row["zones_result"] == "{}"
+
+
+def test_inference_checkpoint_is_written_before_the_next_batch(monkeypatch):
+    from app.routes import routes_image
+    from app.utils.geometry import ParcelSet
+    from app.utils.page_pipeline import load_state
+
+    writer, table = _writer(monkeypatch)
+    parcels = ParcelSet.from_rings([[(0, 0), (2, 0), (2, 2)]])
+
+    async def submit(image):
+        return parcels, {"ZONE_A": "NON"}
+
+    async def crash(*args, **kwargs):
+        raise MemoryError("rendu du résumé")
+
+    monkeypatch.setattr(routes_image.inference_batcher, "submit", submit)
+    monkeypatch.setattr(routes_image, "run_cpu", crash)
+    monkeypatch.setattr(routes_image, "NOTIFICATION_MODE", "per_pdf")
+
+    async def scenario():
+        await writer.insert_pages(1)
+        succeeded = await routes_image.process_full_analysis(
+            user_id="user-1", image_id=writer.image_id(1), image_url="", original_pdf_url="pdf",
+            image_data=b"image", pdf_id=PDF_ID, page_number=1, writer=writer
+        )
+        # Worker arrêté ici : le writer n'est jamais fermé
+        return succeeded
+
+    assert _run(scenario()) is False
+
+    row = table[writer.image_id(1)]
+    assert row["parcels_data"] == parcels.to_base64()
+    assert load_state(row["pipeline_state"])["completed"] == ["extract", "zones"]
+    # L'échec du résumé, lui, attend le lot suivant
+    assert row["processing_status"] == "pending"
@@ -0,0 +1,177 @@
+# tests/test_resumable_uploads.py
+import asyncio
+import hashlib
+import os
+
+import httpx
+import pytest
+from fastapi.responses import JSONResponse
+
+from app.routes import routes_upload
+from app.utils.resumable_uploads import OffsetMismatch, ResumableUploadStore
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 12 + b"\n%%EOF\n"
+
+
+async def _chunks(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+async def _failing_chunks(data):
+    yield data
+    raise ConnectionResetError("connexion coupée")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResumableUploadStore(str(tmp_path / "uploads"))
+
+
+def test_append_checks_offset_and_announced_length(store):
+    upload = store.create("u", 10)
+
+    async def scenario():
+        assert await store.append(upload, 0, _chunks(b"abc", b"", b"def")) == 6
+        with pytest.raises(OffsetMismatch) as mismatch:
+            await store.append(upload, 3, _chunks(b"xyz"))
+        assert mismatch.value.args == (6,)
+        with pytest.raises(ValueError):
+            await store.append(upload, 6, _chunks(b"gh", b"ijk"))
+
+    asyncio.run(scenario())
+
+    # Le bloc accepté avant le dépassement est gardé, pas le suivant
+    assert store.offset(upload["id"]) == 8
+    assert store.sha256(upload["id"]) == hashlib.sha256(b"abcdefgh").hexdigest()
+
+
+def test_interrupted_chunk_keeps_received_bytes(store):
+    upload = store.create("u", len(PDF))
+
+    async def scenario():
+        with pytest.raises(ConnectionResetError):
+            await store.append(upload, 0, _failing_chunks(PDF[:100]))
+        return await store.append(upload, store.offset(upload["id"]), _chunks(PDF[100:]))
+
+    assert asyncio.run(scenario()) == len(PDF)
+    assert store.sha256(upload["id"]) == hashlib.sha256(PDF).hexdigest()
+
+
+def test_digest_is_recomputed_after_a_process_switch(store):
+    upload = store.create("u", len(PDF))
+    asyncio.run(store.append(upload, 0, _chunks(PDF[:1000])))
+
+    # Reprise servie par un autre processus : même dossier, aucun état en mémoire
+    other = ResumableUploadStore(store.directory)
+    resumed = other.get(upload["id"], "u")
+    assert resumed["offset"] == 1000
+    assert asyncio.run(other.append(resumed, 1000, _chunks(PDF[1000:]))) == len(PDF)
+    assert other.sha256(upload["id"]) == hashlib.sha256(PDF).hexdigest()
+
+    # Le premier processus n'a haché que le début : il relit le fichier
+    assert store.sha256(upload["id"]) == hashlib.sha256(PDF).hexdigest()
+
+
+def test_get_checks_owner_and_expiry(store):
+    upload = store.create("u", 10)
+    assert store.get(upload["id"], "u")["offset"] == 0
+    assert store.get(upload["id"], "other") is None
+    assert store.get("not-a-uuid", "u") is None
+
+    store.ttl = -1
+    expired = store.create("u", 10)
+    assert store.get(expired["id"], "u") is None
+    # Nettoyé à la création suivante
+    store.create("u", 10)
+    assert not os.path.exists(os.path.join(store.directory, f"{expired['id']}.part"))
+
+
+@pytest.fixture
+def api(store, tmp_path, monkeypatch):
+    from app.main import app
+    from app.utils.user import get_current_user
+
+    accepted = []
+
+    async def no_admission():
+        return None
+
+    async def check_pdf_pages(path):
+        return 1
+
+    async def accept_spooled_pdf(user_id, pdf_id, spooled):
+        accepted.append((user_id, pdf_id, spooled))
+        return JSONResponse(status_code=202, content={"pdf_id": pdf_id})
+
+    monkeypatch.setattr(routes_upload, "resumable_uploads", store)
+    monkeypatch.setattr(routes_upload, "JOB_SPOOL_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(routes_upload, "check_admission", no_admission)
+    monkeypatch.setattr(routes_upload, "check_pdf_pages", check_pdf_pages)
+    monkeypatch.setattr(routes_upload, "accept_spooled_pdf", accept_spooled_pdf)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u"}
+    yield app, accepted
+    app.dependency_overrides.clear()
+
+
+def _patch(client, location, offset, data):
+    return client.patch(location, content=data, headers={
+        "Upload-Offset": str(offset), "Content-Type": routes_upload.UPLOAD_CONTENT_TYPE
+    })
+
+
+def test_upload_routes_enforce_offsets_then_finalize(api, store, tmp_path):
+    app, accepted = api
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            created = await client.post("/images/uploads", headers={"Upload-Length": str(len(PDF))})
+            assert created.status_code == 201
+            location = created.headers["Location"]
+
+            first = await _patch(client, location, 0, PDF[:1500])
+            assert (first.status_code, first.headers["Upload-Offset"]) == (204, "1500")
+
+            stale = await _patch(client, location, 0, PDF[:1500])
+            assert (stale.status_code, stale.headers["Upload-Offset"]) == (409, "1500")
+
+            incomplete = await client.post(f"{location}/finalize")
+            assert incomplete.status_code == 409
+
+            overflow = await _patch(client, location, 1500, PDF[1500:] + b"trop")
+            assert overflow.status_code == 413
+
+            head = await client.head(location)
+            resume_at = int(head.headers["Upload-Offset"])
+            last = await _patch(client, location, resume_at, PDF[resume_at:])
+            assert (last.status_code, last.headers["Upload-Offset"]) == (204, str(len(PDF)))
+
+            finalized = await client.post(f"{location}/finalize")
+            assert finalized.status_code == 202
+            after = await client.head(location)
+            assert after.status_code == 404
+            return created.json()["upload_id"]
+
+    upload_id = asyncio.run(scenario())
+
+    [(user_id, pdf_id, spooled)] = accepted
+    assert (user_id, pdf_id) == ("u", upload_id)
+    assert spooled.size == len(PDF)
+    assert spooled.content_hash == hashlib.sha256(PDF).hexdigest()
+    with open(spooled.path, "rb") as f:
+        assert f.read() == PDF
+    assert os.listdir(store.directory) == []
+
+
+def test_non_pdf_upload_is_rejected_early(api, store):
+    app, accepted = api
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as client:
+            created = await client.post("/images/uploads", headers={"Upload-Length": "4096"})
+            rejected = await _patch(client, created.headers["Location"], 0, b"\x00" * 2048)
+            assert rejected.status_code == 400
+            assert (await client.head(created.headers["Location"])).status_code == 404
+
+    asyncio.run(scenario())
+    assert accepted == []
@@ -0,0 +1,117 @@
+# tests/test_summary.py
+import asyncio
+from unittest import mock
+
+import pytest
+from reportlab import rl_config
+
+from app.routes import routes_image
+from app.utils import pdf
+from app.utils.geometry import ParcelSet
+from app.utils.page_pipeline import PIPELINE_STAGES, load_state
+from app.utils.pdf import SummaryCollector, SummaryPage
+
+PDF_ID = "6f1c2a4e-0b7d-4a55-9d3e-2f8a1c0e5b91"
+
+
+def _render(pages):
+    with mock.patch.object(pdf, "datetime") as clock:
+        clock.utcnow.return_value.replace.return_value.isoformat.return_value = "2026-01-01T00:00:00"
+        return pdf.render_summary(pages)
+
+
+def test_cached_template_renders_the_same_document(monkeypatch):
+    monkeypatch.setattr(rl_config, "invariant", 1)
+    pages = [SummaryPage(1, "a", {"ZONE_A": "OUI"}), SummaryPage(2, "b", {}, parcels_count=3, parcels_area=2.5)]
+
+    cached = _render(pages)
+    assert _render(pages) == cached
+    monkeypatch.setattr(pdf, "_add_template", pdf._draw_template)
+    assert _render(pages) == cached
+
+
+class RecordingWriter:
+    def __init__(self):
+        self.rows = {}
+
+    async def update(self, page_number: int, data: dict):
+        self.rows.setdefault(page_number, {}).update(data)
+
+    async def flush(self):
+        pass
+
+
+@pytest.fixture
+def combined(monkeypatch, tmp_path):
+    parcels = ParcelSet.from_rings([[(0, 0), (2, 0), (2, 2)]])
+
+    async def submit(image):
+        return parcels, {"ZONE_A": "NON"}
+
+    updates = []
+
+    async def update_many(image_ids, data):
+        updates.append((sorted(image_ids), data))
+        return []
+
+    async def noop(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(routes_image.inference_batcher, "submit", submit)
+    monkeypatch.setattr(routes_image.images_repository, "update_many", update_many)
+    monkeypatch.setattr(routes_image.pdf_jobs_repository, "update", noop)
+    monkeypatch.setattr(routes_image, "run_cpu", lambda fn, *args: noop())
+    monkeypatch.setattr(routes_image, "NOTIFICATION_MODE", "per_pdf")
+    return SummaryCollector(PDF_ID, spool_dir=str(tmp_path)), updates
+
+
+def _analyse(summary, writer, page_number):
+    return routes_image.process_full_analysis(
+        user_id="u", image_id=f"img-{page_number}", image_url="", original_pdf_url="pdf",
+        image_data=b"image", pdf_id=PDF_ID, page_number=page_number, summary=summary, writer=writer
+    )
+
+
+def test_summary_stage_is_done_only_once_the_combined_summary_is_stored(combined, monkeypatch):
+    summary, updates = combined
+    writer = RecordingWriter()
+
+    async def upload(path, data, content_type):
+        return f"https://storage/{path}"
+
+    monkeypatch.setattr(routes_image.storage_repository, "upload", upload)
+
+    async def scenario():
+        assert await _analyse(summary, writer, 1)
+        assert await _analyse(summary, writer, 2)
+        page_state = load_state(writer.rows[1]["pipeline_state"])
+        assert page_state["completed"] == ["extract", "zones"]
+        return await routes_image.publish_combined_summary("u", PDF_ID, summary)
+
+    summary_url = asyncio.run(scenario())
+
+    [(image_ids, data)] = updates
+    assert image_ids == ["img-1", "img-2"]
+    assert data["result_summary_pdf"] == summary_url
+    assert load_state(data["pipeline_state"])["completed"] == list(PIPELINE_STAGES)
+
+
+def test_failed_combined_summary_leaves_the_stage_open(combined, monkeypatch):
+    summary, updates = combined
+    writer = RecordingWriter()
+
+    async def upload(path, data, content_type):
+        raise ConnectionError("stockage indisponible")
+
+    monkeypatch.setattr(routes_image.storage_repository, "upload", upload)
+
+    async def scenario():
+        assert await _analyse(summary, writer, 1)
+        # L'erreur remonte : la file relance le PDF et le résumé est régénéré
+        with pytest.raises(ConnectionError):
+            await routes_image.publish_combined_summary("u", PDF_ID, summary)
+
+    asyncio.run(scenario())
+
+    assert updates == []
+    assert "summary" not in load_state(writer.rows[1]["pipeline_state"])["completed"]